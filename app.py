@@ -1,11 +1,11 @@
 from flask import Flask, render_template, request, jsonify, session, redirect, url_for
 from dotenv import load_dotenv
-from cachetools import cached, TTLCache  # NEW: Import for caching
 from werkzeug.middleware.proxy_fix import ProxyFix
 import secrets
 import os
 from google_auth_oauthlib.flow import Flow
 from google.auth.transport.requests import Request
+from googleapiclient.errors import HttpError
 import json
 
 # Load environment variables from a .env file before importing other modules
@@ -13,9 +13,16 @@ load_dotenv()
 
 import llm_client
 import calendar_client
+import async_calendar_client
+import event_cache
+import schedule_jobs
 import duration_feedback
 import auth
 from auth import login_required, get_current_user
+from interval_index import IntervalIndex
+import conflict_matrix
+import free_slots
+import batch_planner
 from datetime import datetime, timedelta
 
 app = Flask(__name__)
@@ -32,14 +39,18 @@ GOOGLE_CLIENT_SECRETS_FILE = "credentials.json"
 # Set preferred URL scheme for external URLs (fixes Cloudflare proxy issue)
 app.config['PREFERRED_URL_SCHEME'] = 'https'
 
-# NEW: Define a cache with max size 100 and TTL of 24 hours (86400 seconds) for daily updates
-cache = TTLCache(maxsize=100, ttl=86400)
+# Cached wrapper for fetching the current user's events (extended to 90 days
+# for recurring events). Our own writes are patched into the cache as they
+# happen; otherwise it refreshes after EVENT_CACHE_MAX_AGE_SECONDS.
+def get_cached_events(days_in_future=90):
+    return get_cached_window(days_in_future).events
 
-# NEW: Cached wrapper for fetching events (extended to 90 days for recurring events)
-@cached(cache)
-def get_cached_events():
-    print("Fetching fresh calendar events (cache miss)...")
-    return calendar_client.get_events_in_range(days_in_future=90)
+# The cached window itself, for callers that also want its IntervalIndex
+# (kept up to date with our writes instead of being rebuilt per request)
+def get_cached_window(days_in_future=90):
+    user = get_current_user()
+    user_key = user["email"] if user else None
+    return event_cache.get_event_cache().get_window(user_key, days_in_future)
 
 def build_recurrence_rule(recurrence_obj):
     """
@@ -259,6 +270,8 @@ def google_callback():
         # Save calendar credentials to token.json for calendar_client.py to use
         with open('token.json', 'w') as token_file:
             token_file.write(credentials.to_json())
+        calendar_client.invalidate_calendar_service()
+        event_cache.get_event_cache().invalidate()
         print(f"✅ Saved calendar credentials to token.json")
         
         # Check if user exists, if not create them
@@ -377,28 +390,89 @@ def schedule():
     """
     Receives a high-level task, generates a study plan, and schedules multiple events.
     Supports recurring events with user-confirmed recurrence parameters.
+
+    With "async": true in the body (or ?async=1), the work runs as a
+    background job: the response is 202 with a job ID to poll at
+    /schedule/jobs/<job_id>.
+
+    With "auto_repair": true, conflicting events the user didn't give an
+    exact time for are moved to the nearest free slot instead of being
+    returned as conflicts.
     """
     data = request.get_json()
     text_input = data.get('text')
     user_recurrence = data.get('recurrence')  # User-confirmed recurrence from popup
+    run_async = data.get('async') or request.args.get('async') == '1'
+    auto_repair = bool(data.get('auto_repair'))
 
     if not text_input:
         return jsonify({"error": "No text provided"}), 400
 
+    if run_async:
+        user = get_current_user()
+        job = schedule_jobs.get_job_queue().submit(
+            user["email"] if user else None, run_schedule, text_input, user_recurrence, auto_repair
+        )
+        return jsonify({
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": url_for('schedule_job_status', job_id=job.id),
+        }), 202
+
+    user = get_current_user()
+    result, status = run_schedule(
+        schedule_jobs.ScheduleJob(user["email"] if user else None),
+        text_input, user_recurrence, auto_repair,
+    )
+    return jsonify(result), status
+
+
+@app.route('/schedule/jobs/<job_id>', methods=['GET'])
+@login_required
+def schedule_job_status(job_id):
+    """
+    Reports a background scheduling job: each stage's status, the outcome of
+    every planned event and, once finished, the /schedule response.
+    """
+    user = get_current_user()
+    job = schedule_jobs.get_job_queue().get(job_id, user["email"] if user else None)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+
+def run_schedule(job, text_input, user_recurrence=None, auto_repair=False):
+    """
+    Plans and schedules a request, reporting progress on `job`. Runs in the
+    request thread or on a job worker.
+
+    With auto_repair, a conflicting event is moved to the nearest free slot
+    (see free_slots.nearest_free_slot) if it doesn't recur and the planner
+    says the user didn't ask for its exact time; other conflicts are
+    returned as before.
+
+    Returns:
+        (response dict, HTTP status) as /schedule returns them
+    """
     # 1. Fetch calendar context (extended to 90 days for recurring events)
+    # and the calendar metadata needed for the writes, concurrently
     print("Fetching calendar events to provide context to the planner...")
-    upcoming_events = calendar_client.get_events_in_range(days_in_future=90)
+    job.start_stage("context")
+    context = async_calendar_client.gather_schedule_context(days_in_future=90)
+    upcoming_events = context["events"]
+    time_zone = (context["metadata"] or {}).get("timeZone")
+    job.finish_stage("context", events=len(upcoming_events))
 
     # 2. Call the AI planner to generate a study plan
     print("Sending request to the AI planner...")
+    job.start_stage("planning")
     new_events_plan = llm_client.generate_study_plan(text_input, upcoming_events)
 
     if not new_events_plan:
-        return jsonify({"error": "The AI planner could not create a plan from your request."}), 500
+        return {"error": "The AI planner could not create a plan from your request."}, 500
 
-        # 3. Loop through the plan and create events
-    created_count = 0
-    conflicts_detected = []
+    # 3. Validate and sanitize the plan before checking it for conflicts
+    planned_events = []
     
     for event_details in new_events_plan:
         summary = event_details.get("summary")
@@ -407,6 +481,7 @@ def schedule():
 
         if not all([summary, start_time, end_time]):
             print(f"Skipping malformed event from LLM: {event_details}")
+            job.record_event(event_details, "failed", reason="Malformed event from the planner")
             continue
 
         # Validate and sanitize the data from the LLM before creating the event
@@ -428,23 +503,7 @@ def schedule():
                 end_time = end_time_dt.isoformat()
         except ValueError:
             print(f"Skipping event with invalid timestamp from LLM: {event_details}")
-            continue
-
-        # Enhanced conflict detection
-        conflicts = detect_conflicts(start_time_dt, end_time_dt, upcoming_events)
-        
-        if conflicts:
-            # Store conflict information for user resolution
-            conflict_info = {
-                'proposed_event': {
-                    'summary': summary,
-                    'start_time': start_time,
-                    'end_time': end_time
-                },
-                'conflicts': conflicts
-            }
-            conflicts_detected.append(conflict_info)
-            print(f"Conflict detected for event: {summary}")
+            job.record_event(event_details, "failed", reason="Invalid timestamp from the planner")
             continue
 
         # Check if this is a recurring event
@@ -454,28 +513,190 @@ def schedule():
             recurrence_rules = build_recurrence_rule(user_recurrence)
         elif 'recurrence' in event_details:
             recurrence_rules = build_recurrence_rule(event_details['recurrence'])
-        
-        # Create the event if no conflicts
-        created_event = calendar_client.create_event(summary, start_time, end_time, recurrence=recurrence_rules)
-        if created_event:
-            created_count += 1
+
+        planned_events.append({
+            "summary": summary,
+            "start_time": start_time,
+            "end_time": end_time,
+            "start_dt": start_time_dt,
+            "end_dt": end_time_dt,
+            "recurrence": recurrence_rules,
+            "occurrences": conflict_matrix.plan_occurrences(
+                start_time_dt, end_time_dt, recurrence_rules, time_zone
+            ),
+            # Only an explicit false from the planner lets an event be moved
+            "fixed_time": event_details.get("user_specified_time") is not False,
+        })
+
+    job.finish_stage("planning", planned_events=len(planned_events))
+
+    # Check every planned occurrence at once, against the calendar (local
+    # store if fresh, else FreeBusy queries) and against the rest of the plan
+    job.start_stage("conflicts")
+    try:
+        existing_events = async_calendar_client.get_conflict_candidates(
+            [occurrence for planned in planned_events for occurrence in planned["occurrences"]]
+        )
+    except (HttpError, calendar_client.FreeBusyError) as e:
+        # Creating the plan without a conflict check could double-book
+        return {"error": f"Could not check your calendar for conflicts: {e}"}, 502
+    plan_conflicts = conflict_matrix.plan_conflicts(planned_events, existing_events)
+    conflicts_detected = []
+    events_to_create = []
+    repaired_events = []
+
+    def report_conflict(planned, conflicts):
+        # Store conflict information for user resolution
+        conflicts_detected.append({
+            'proposed_event': {
+                'summary': planned["summary"],
+                'start_time': planned["start_time"],
+                'end_time': planned["end_time"]
+            },
+            'conflicts': conflicts
+        })
+        job.record_event(planned, "conflict", conflicts=conflicts)
+        print(f"Conflict detected for event: {planned['summary']}")
+
+    # Time taken by the rest of the plan, which repaired events must avoid
+    kept_events = [
+        planned for planned, conflicts in zip(planned_events, plan_conflicts) if not conflicts
+    ]
+    plan_busy = [
+        (occurrence_start.timestamp(), occurrence_end.timestamp())
+        for planned in kept_events
+        for occurrence_start, occurrence_end in planned["occurrences"]
+    ]
+    repair_index = None
+    candidate_busy = []
+    repairs = []  # (planned, original conflicts, moved copy of planned)
+
+    for planned, conflicts in zip(planned_events, plan_conflicts):
+        if conflicts and auto_repair and not planned["fixed_time"] and not planned["recurrence"]:
+            if repair_index is None:
+                # The user's cached window, plus the candidates just fetched,
+                # which may be newer (or FreeBusy blocks without details)
+                repair_index = event_cache.get_event_cache().get_index(job.owner, 90)
+                candidate_busy = [(event.start, event.end) for event in existing_events]
+            slot = free_slots.nearest_free_slot(
+                planned["start_dt"], planned["end_dt"], repair_index,
+                extra_busy=plan_busy + candidate_busy,
+            )
+            if slot and slot != (planned["start_dt"], planned["end_dt"]):
+                new_start, new_end = slot
+                plan_busy.append((new_start.timestamp(), new_end.timestamp()))
+                repairs.append((planned, conflicts, {
+                    **planned,
+                    "start_time": new_start.isoformat(),
+                    "end_time": new_end.isoformat(),
+                    "start_dt": new_start,
+                    "end_dt": new_end,
+                    "occurrences": [(new_start, new_end)],
+                }))
+                continue
+
+        if conflicts:
+            report_conflict(planned, conflicts)
+            continue
+
+        # Queue the event for creation if no conflicts
+        events_to_create.append({
+            "summary": planned["summary"],
+            "start_time": planned["start_time"],
+            "end_time": planned["end_time"],
+            "recurrence": planned["recurrence"],
+        })
+
+    if repairs:
+        # Check the new slots the way the plan was checked, against fresh
+        # candidates and the rest of the plan; a slot that still conflicts
+        # (e.g. the cached window was behind) is reported as a conflict
+        moved_events = [moved for _, _, moved in repairs]
+        try:
+            moved_candidates = async_calendar_client.get_conflict_candidates(
+                [(moved["start_dt"], moved["end_dt"]) for moved in moved_events]
+            )
+            moved_conflicts = conflict_matrix.plan_conflicts(
+                moved_events + kept_events, list(existing_events) + list(moved_candidates)
+            )[:len(moved_events)]
+        except (HttpError, calendar_client.FreeBusyError) as e:
+            print(f"Could not check repaired events for conflicts: {e}")
+            moved_conflicts = [True] * len(moved_events)
+
+        for (planned, conflicts, moved), still_conflicts in zip(repairs, moved_conflicts):
+            if still_conflicts:
+                report_conflict(planned, conflicts)
+                continue
+            repaired_events.append({
+                "summary": planned["summary"],
+                "original_start_time": planned["start_time"],
+                "original_end_time": planned["end_time"],
+                "start_time": moved["start_time"],
+                "end_time": moved["end_time"],
+            })
+            job.record_event(
+                planned, "repaired",
+                new_start_time=moved["start_time"], new_end_time=moved["end_time"],
+            )
+            print(f"Moved conflicting event {planned['summary']} to {moved['start_time']}")
+            events_to_create.append({
+                "summary": planned["summary"],
+                "start_time": moved["start_time"],
+                "end_time": moved["end_time"],
+                "recurrence": None,
+            })
+
+    job.finish_stage("conflicts", conflicts=len(conflicts_detected), repaired=len(repaired_events))
+
+    # 4. Create all conflict-free events in one batch request
+    job.start_stage("inserts")
+    results = calendar_client.create_events(events_to_create)
+    for queued, result in zip(events_to_create, results):
+        if result["ok"]:
+            job.record_event(queued, "created", event_id=(result["result"] or {}).get("id"))
+        else:
+            job.record_event(queued, "failed", reason=result["error"])
+    created_count = sum(1 for result in results if result["ok"])
+    job.finish_stage("inserts", created=created_count, failed=len(events_to_create) - created_count)
+    failed_events = [
+        {"event": {k: queued[k] for k in ("summary", "start_time", "end_time")}, "reason": result["error"]}
+        for queued, result in zip(events_to_create, results)
+        if not result["ok"]
+    ]
 
     # Return response with conflict information if any
     if conflicts_detected:
-        return jsonify({
+        response, status = {
             "conflicts": conflicts_detected,
             "created_count": created_count,
+            "failed_events": failed_events,
             "message": f"Successfully scheduled {created_count} event(s). {len(conflicts_detected)} conflict(s) detected."
-        }), 409  # 409 Conflict status code
+        }, 409  # 409 Conflict status code
+    elif created_count > 0 and failed_events:
+        response, status = {
+            "message": f"Scheduled {created_count} of {len(events_to_create)} event(s). {len(failed_events)} could not be created.",
+            "created_count": created_count,
+            "failed_events": failed_events
+        }, 207  # Multi-Status
     elif created_count > 0:
-        return jsonify({"message": f"Successfully scheduled {created_count} new event(s)!"})
+        response, status = {"message": f"Successfully scheduled {created_count} new event(s)!"}, 200
     else:
-        return jsonify({"error": "AI created a plan, but failed to schedule any events."}), 500
+        return {"error": "AI created a plan, but failed to schedule any events."}, 500
+
+    if repaired_events:
+        # Events moved off conflicts, so the user can see where they went
+        response["repaired_events"] = repaired_events
+        if status == 200:
+            response["message"] += f" {len(repaired_events)} moved to the nearest free time."
+    return response, status
 
 
 def detect_conflicts(new_start_dt, new_end_dt, existing_events):
     """
     Enhanced conflict detection that returns detailed conflict information.
+
+    existing_events is an IntervalIndex of Event objects (such as a cached
+    window's) or a short list of candidates for this slot, which is scanned.
     """
     conflicts = []
     
@@ -484,48 +705,34 @@ def detect_conflicts(new_start_dt, new_end_dt, existing_events):
         new_start_dt = new_start_dt.replace(tzinfo=datetime.now().astimezone().tzinfo)
     if new_end_dt.tzinfo is None:
         new_end_dt = new_end_dt.replace(tzinfo=datetime.now().astimezone().tzinfo)
-    
-    for existing in existing_events:
-        existing_start = existing.get('start', {}).get('dateTime') or existing.get('start', {}).get('date')
-        existing_end = existing.get('end', {}).get('dateTime') or existing.get('end', {}).get('date')
-        
-        if existing_start and existing_end:
-            try:
-                existing_start_dt = datetime.fromisoformat(existing_start)
-                existing_end_dt = datetime.fromisoformat(existing_end)
-                
-                # Ensure existing event times are timezone-aware
-                if existing_start_dt.tzinfo is None:
-                    existing_start_dt = existing_start_dt.replace(tzinfo=datetime.now().astimezone().tzinfo)
-                if existing_end_dt.tzinfo is None:
-                    existing_end_dt = existing_end_dt.replace(tzinfo=datetime.now().astimezone().tzinfo)
-                
-                # Convert all times to the same timezone for comparison
-                if new_start_dt.tzinfo != existing_start_dt.tzinfo:
-                    existing_start_dt = existing_start_dt.astimezone(new_start_dt.tzinfo)
-                    existing_end_dt = existing_end_dt.astimezone(new_end_dt.tzinfo)
-                
-                # Check for overlap
-                if (new_start_dt < existing_end_dt and new_end_dt > existing_start_dt):
-                    # Calculate overlap duration
-                    overlap_start = max(new_start_dt, existing_start_dt)
-                    overlap_end = min(new_end_dt, existing_end_dt)
-                    overlap_minutes = (overlap_end - overlap_start).total_seconds() / 60
-                    
-                    conflict = {
-                        'existing_event': {
-                            'summary': existing.get('summary', 'Untitled Event'),
-                            'start_time': existing_start,
-                            'end_time': existing_end,
-                            'id': existing.get('id')
-                        },
-                        'overlap_minutes': int(overlap_minutes),
-                        'severity': 'high' if overlap_minutes > 30 else 'low'
-                    }
-                    conflicts.append(conflict)
-            except ValueError as e:
-                print(f"Error parsing datetime in conflict detection: {e}")
-                continue
+
+    new_start = new_start_dt.timestamp()
+    new_end = new_end_dt.timestamp()
+    if isinstance(existing_events, IntervalIndex):
+        overlapping = existing_events.overlapping(new_start, new_end)
+    else:
+        overlapping = sorted(
+            (
+                (event.start, event.end, event) for event in existing_events
+                if event.start < new_end and event.end > new_start
+            ),
+            key=lambda entry: entry[0],
+        )
+    for existing_start, existing_end, existing in overlapping:
+        # Calculate overlap duration
+        overlap_minutes = (min(new_end, existing_end) - max(new_start, existing_start)) / 60
+
+        conflict = {
+            'existing_event': {
+                'summary': existing.summary or 'Untitled Event',
+                'start_time': existing.start_iso,
+                'end_time': existing.end_iso,
+                'id': existing.id
+            },
+            'overlap_minutes': int(overlap_minutes),
+            'severity': 'high' if overlap_minutes > 30 else 'low'
+        }
+        conflicts.append(conflict)
     
     return conflicts
 
@@ -562,7 +769,8 @@ def force_schedule():
 @login_required
 def get_alternatives():
     """
-    Get AI-generated alternative times for a conflicting event.
+    Get alternative times for a conflicting event, found in the free time of
+    the calendar (the AI is only asked if none can be found).
     """
     data = request.get_json()
     proposed_event = data.get('proposed_event')
@@ -572,14 +780,25 @@ def get_alternatives():
         return jsonify({"error": "No proposed event provided"}), 400
     
     # Get fresh calendar events for context
-    upcoming_events = get_cached_events()
+    window = get_cached_window()
+    upcoming_events = window.events
     
-    # Use LLM to suggest alternatives
-    alternatives = llm_client.suggest_alternative_times(
-        proposed_event, 
-        conflicts, 
-        upcoming_events
-    )
+    try:
+        alternatives = free_slots.suggest_alternative_times(proposed_event, conflicts, window.index())
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid proposed event: {e}"}), 400
+
+    if (
+        not alternatives["new_event_alternatives"]
+        and not alternatives["existing_event_alternatives"]
+        and free_slots.SUGGESTIONS_LLM_FALLBACK
+    ):
+        # Use LLM to suggest alternatives
+        alternatives = llm_client.suggest_alternative_times(
+            proposed_event, 
+            conflicts, 
+            upcoming_events
+        )
     
     return jsonify({"alternatives": alternatives})
 
@@ -613,8 +832,8 @@ def schedule_alternative():
             end_time = end_time_dt.isoformat()
         
         # Double-check for conflicts with current calendar
-        upcoming_events = get_cached_events()
-        conflicts = detect_conflicts(start_time_dt, end_time_dt, upcoming_events)
+        existing_events = async_calendar_client.get_conflict_candidates([(start_time_dt, end_time_dt)])
+        conflicts = detect_conflicts(start_time_dt, end_time_dt, existing_events)
         
         if conflicts:
             return jsonify({
@@ -624,6 +843,8 @@ def schedule_alternative():
         
     except ValueError:
         return jsonify({"error": "Invalid datetime format"}), 400
+    except (HttpError, calendar_client.FreeBusyError) as e:
+        return jsonify({"error": f"Could not check your calendar for conflicts: {e}"}), 502
     
     # Create the event at the alternative time
     created_event = calendar_client.create_event(summary, start_time, end_time)
@@ -664,11 +885,13 @@ def move_existing_event():
             new_end_time = end_time_dt.isoformat()
         
         # Check for conflicts with the new time for existing event
-        upcoming_events = get_cached_events()
-        conflicts = detect_conflicts(start_time_dt, end_time_dt, upcoming_events)
-        
-        # Filter out the event we're moving from conflicts
-        conflicts = [c for c in conflicts if c['existing_event']['id'] != existing_event_id]
+        # (needs event IDs, so that the event being moved can be filtered out)
+        existing_events = async_calendar_client.get_conflict_candidates(
+            [(start_time_dt, end_time_dt)], require_event_details=True
+        )
+        # The event we're moving can't conflict with itself
+        existing_events = [event for event in existing_events if event.id != existing_event_id]
+        conflicts = detect_conflicts(start_time_dt, end_time_dt, existing_events)
         
         if conflicts:
             return jsonify({
@@ -723,10 +946,24 @@ def suggest_split():
         return jsonify({"error": "No event data provided"}), 400
     
     # Get calendar context
-    upcoming_events = get_cached_events()
+    window = get_cached_window()
+    upcoming_events = window.events
     
-    # Get AI suggestion for splitting
-    split_suggestion = llm_client.suggest_task_split(proposed_event, upcoming_events)
+    try:
+        split_suggestion = free_slots.suggest_task_split(proposed_event, window.index())
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid proposed event: {e}"}), 400
+
+    if split_suggestion is None:
+        if free_slots.SUGGESTIONS_LLM_FALLBACK:
+            # Get AI suggestion for splitting
+            split_suggestion = llm_client.suggest_task_split(proposed_event, upcoming_events)
+        else:
+            split_suggestion = {
+                "recommendation": "single_block",
+                "reason": f"No free time found in the next {free_slots.SPLIT_SEARCH_DAYS} days, keeping the original request",
+                "suggested_events": [proposed_event]
+            }
     
     return jsonify(split_suggestion)
 
@@ -745,7 +982,7 @@ def schedule_split():
     
     created_count = 0
     failed_events = []
-    upcoming_events = get_cached_events()
+    parsed_events = []
     
     for event_data in split_events:
         summary = event_data.get('summary')
@@ -769,27 +1006,51 @@ def schedule_split():
                 end_time_dt = end_time_dt.replace(tzinfo=datetime.now().astimezone().tzinfo)
                 end_time = end_time_dt.isoformat()
             
-            # Check for conflicts
-            conflicts = detect_conflicts(start_time_dt, end_time_dt, upcoming_events)
-            
-            if conflicts:
-                failed_events.append({
-                    "event": event_data,
-                    "reason": "Conflicts detected",
-                    "conflicts": conflicts
-                })
-                continue
-            
-            # Create the event
-            created_event = calendar_client.create_event(summary, start_time, end_time)
-            if created_event:
-                created_count += 1
-            else:
-                failed_events.append({"event": event_data, "reason": "Failed to create event"})
+            parsed_events.append({
+                "summary": summary,
+                "start_time": start_time,
+                "end_time": end_time,
+                "start_dt": start_time_dt,
+                "end_dt": end_time_dt,
+                "event_data": event_data,
+                "occurrences": [(start_time_dt, end_time_dt)],
+            })
                 
         except ValueError as e:
             failed_events.append({"event": event_data, "reason": f"Invalid datetime: {str(e)}"})
     
+    # Check all blocks at once, against the calendar (local store if fresh,
+    # else FreeBusy queries) and against each other
+    try:
+        existing_events = async_calendar_client.get_conflict_candidates(
+            [(parsed["start_dt"], parsed["end_dt"]) for parsed in parsed_events]
+        )
+    except (HttpError, calendar_client.FreeBusyError) as e:
+        return jsonify({"error": f"Could not check your calendar for conflicts: {e}"}), 502
+    split_conflicts = conflict_matrix.plan_conflicts(parsed_events, existing_events)
+    events_to_create = []
+    
+    for parsed, conflicts in zip(parsed_events, split_conflicts):
+        
+        if conflicts:
+            failed_events.append({
+                "event": parsed["event_data"],
+                "reason": "Conflicts detected",
+                "conflicts": conflicts
+            })
+            continue
+        
+        # Queue the event for creation
+        events_to_create.append(parsed)
+    
+    # Create all conflict-free blocks in one batch request
+    results = calendar_client.create_events(events_to_create)
+    for queued, result in zip(events_to_create, results):
+        if result["ok"]:
+            created_count += 1
+        else:
+            failed_events.append({"event": queued["event_data"], "reason": "Failed to create event"})
+    
     if failed_events:
         return jsonify({
             "message": f"Scheduled {created_count} of {len(split_events)} events",
@@ -803,26 +1064,103 @@ def schedule_split():
         })
 
 
+@app.route('/plan_batch', methods=['POST'])
+@login_required
+def plan_batch():
+    """
+    Plans several tasks with due dates at once, locally and without
+    conflicts between them, and optionally creates the sessions.
+    """
+    data = request.get_json() or {}
+    tasks = data.get('tasks')
+
+    if not tasks or not isinstance(tasks, list):
+        return jsonify({"error": "No tasks provided"}), 400
+
+    window = get_cached_window(90)
+    # The conflict check counts all-day events as busy, so plan around them too
+    availability = window.availability().copy()
+    for event in window.events:
+        if event.all_day:
+            availability.reserve(event.start, event.end)
+    tzinfo = calendar_client.get_calendar_metadata()["tzinfo"]
+    try:
+        result = batch_planner.plan_batch(tasks, availability, tzinfo)
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": f"Invalid task: {str(e)}"}), 400
+
+    if not data.get('create'):
+        return jsonify(result)
+
+    # The cached window may be minutes old: check the sessions against the
+    # calendar (local store if fresh, else FreeBusy queries) before writing
+    planned = [
+        {
+            **event,
+            "occurrences": [(
+                datetime.fromisoformat(event["start_time"]),
+                datetime.fromisoformat(event["end_time"]),
+            )],
+        }
+        for task in result["plan"] for event in task["events"]
+    ]
+    try:
+        existing_events = async_calendar_client.get_conflict_candidates(
+            [occurrence for event in planned for occurrence in event["occurrences"]]
+        )
+    except (HttpError, calendar_client.FreeBusyError) as e:
+        return jsonify({"error": f"Could not check your calendar for conflicts: {e}"}), 502
+
+    result["failed_events"] = []
+    events_to_create = []
+    for event, conflicts in zip(planned, conflict_matrix.plan_conflicts(planned, existing_events)):
+        queued = {key: event[key] for key in ("summary", "start_time", "end_time")}
+        if conflicts:
+            result["failed_events"].append(
+                {"event": queued, "reason": "Conflicts detected", "conflicts": conflicts}
+            )
+        else:
+            events_to_create.append(queued)
+
+    # Create every conflict-free session in one batch request
+    results = calendar_client.create_events(events_to_create)
+    result["created_count"] = sum(1 for outcome in results if outcome["ok"])
+    result["failed_events"] += [
+        {"event": queued, "reason": outcome["error"]}
+        for queued, outcome in zip(events_to_create, results)
+        if not outcome["ok"]
+    ]
+    if result["failed_events"] or result["unscheduled"]:
+        result["message"] = (
+            f"Scheduled {result['created_count']} of {len(planned)} session(s); "
+            f"{len(result['unscheduled'])} task(s) could not be planned."
+        )
+        return jsonify(result), 207  # Multi-Status
+    result["message"] = f"Successfully scheduled {result['created_count']} session(s)!"
+    return jsonify(result)
+
+
 @app.route('/tasks', methods=['GET'])
 @login_required
 def get_tasks():
     """
     Fetches today's events from Google Calendar and returns them as a list.
     """
-    events = calendar_client.get_daily_events()
+    try:
+        events = calendar_client.get_daily_events()
+    except HttpError as e:
+        # Don't show a partial day as if it were the whole day
+        return jsonify({"error": f"Could not fetch today's events: {e}"}), 502
     tasks = []
     for event in events:
-        start = event['start'].get('dateTime', event['start'].get('date'))
         # Format the time nicely for display
-        try:
-            # For dateTime events
-            time_formatted = datetime.fromisoformat(start).strftime('%I:%M %p')
-        except ValueError:
-            # For all-day events
+        if event.all_day:
             time_formatted = "All Day"
+        else:
+            time_formatted = event.start_dt.strftime('%I:%M %p')
 
         tasks.append({
-            "summary": event['summary'],
+            "summary": event.summary or 'No Title',
             "start_time": time_formatted
         })
     return jsonify(tasks)
@@ -837,16 +1175,14 @@ def get_events():
     calendar_events = []
     
     for event in events:
-        start = event['start'].get('dateTime', event['start'].get('date'))
-        end = event['end'].get('dateTime', event['end'].get('date'))
-        
         # Convert to FullCalendar format
         calendar_event = {
-            'id': event.get('id'),
-            'title': event.get('summary', 'No Title'),
-            'start': start,
-            'end': end,
-            'allDay': 'date' in event['start']  # True if it's a date-only event
+            'id': event.id,
+            'title': event.summary or 'No Title',
+            'start': event.start_iso,
+            'end': event.end_iso,
+            'allDay': event.all_day,  # True if it's a date-only event
+            'calendarId': event.calendar_id
         }
         
         calendar_events.append(calendar_event)
@@ -854,6 +1190,24 @@ def get_events():
     return jsonify(calendar_events)
 
 
+@app.route('/calendar_stats', methods=['GET'])
+@login_required
+def calendar_stats():
+    """
+    Returns Google Calendar API call, retry and throttling counters for monitoring.
+    """
+    return jsonify(calendar_client.get_call_stats())
+
+
+@app.route('/cache_stats', methods=['GET'])
+@login_required
+def cache_stats():
+    """
+    Returns event cache hit/refresh counters and how stale served data is, for monitoring.
+    """
+    return jsonify(event_cache.get_event_cache().get_stats())
+
+
 @app.route('/feedback/duration', methods=['POST'])
 @login_required
 def add_duration_feedback():
@@ -1057,18 +1411,9 @@ def intelligent_delete():
     try:
         # STEP 2: User confirmed - actually delete the events
         if confirm and event_ids:
-            deleted_count = 0
-            failed_count = 0
-            
-            for event_id in event_ids:
-                success = calendar_client.delete_event(event_id)
-                if success:
-                    deleted_count += 1
-                else:
-                    failed_count += 1
-            
-            # Clear cache
-            cache.clear()
+            results = calendar_client.delete_events(event_ids)
+            deleted_count = sum(1 for result in results if result["ok"])
+            failed_count = len(results) - deleted_count
             
             return jsonify({
                 "message": f"Successfully deleted {deleted_count} event(s)",
@@ -1078,7 +1423,7 @@ def intelligent_delete():
             })
         
         # STEP 1: Analyze query and find matching events
-        events = calendar_client.get_events_in_range(days_in_future=90)
+        events = async_calendar_client.sync_events(days_in_future=90)
         
         if not events:
             return jsonify({
@@ -1091,11 +1436,11 @@ def intelligent_delete():
         events_summary = []
         for event in events:
             event_info = {
-                "id": event.get('id'),
-                "summary": event.get('summary', 'Untitled'),
-                "start": event.get('start', {}).get('dateTime', event.get('start', {}).get('date', '')),
-                "end": event.get('end', {}).get('dateTime', event.get('end', {}).get('date', '')),
-                "description": event.get('description', '')
+                "id": event.id,
+                "summary": event.summary or 'Untitled',
+                "start": event.start_iso,
+                "end": event.end_iso,
+                "description": event.raw.get('description', '')
             }
             events_summary.append(event_info)
         
@@ -1170,8 +1515,6 @@ def delete_event(event_id):
     success = calendar_client.delete_event(event_id)
     
     if success:
-        # Clear cache so next fetch gets updated list
-        cache.clear()
         return jsonify({"message": "Event deleted successfully"})
     else:
         return jsonify({"error": "Failed to delete event"}), 500
@@ -0,0 +1,401 @@
+"""
+Asyncio variant of the Google Calendar client, for running independent
+calendar calls concurrently over a pooled HTTP connection.
+
+The client lives on one background event loop, so its aiohttp connection pool
+is shared by every request. Flask handlers (which are synchronous) call into it
+through run() and gather(), or through the blocking wrappers at the bottom
+(sync_events, get_conflict_candidates, gather_schedule_context), which sync
+several calendars or query several FreeBusy spans at the same time.
+"""
+import asyncio
+import contextlib
+import datetime
+import threading
+from urllib.parse import quote
+
+import aiohttp
+
+import calendar_client
+import rate_limiter
+
+CALENDAR_API_ROOT = calendar_client.CALENDAR_API_ROOT + "calendar/v3"
+
+# Maximum simultaneous connections to the Calendar API
+CONNECTION_POOL_SIZE = 20
+REQUEST_TIMEOUT_SECONDS = 60
+
+# How often a sync waiting for another one on the same calendar checks again
+LOCK_POLL_SECONDS = 0.01
+
+
+class CalendarAPIError(Exception):
+    """A Calendar API call failed with a non-retryable error or ran out of retries."""
+
+    def __init__(self, status, message):
+        super().__init__(f"Calendar API error {status}: {message}")
+        self.status = status
+        self.message = message
+
+
+class AsyncCalendarClient:
+    """
+    Minimal asyncio client for the Calendar v3 endpoints the app uses:
+    events list/get/insert/patch/delete, calendarList get and freebusy.
+
+    Shares credentials, the client-side rate limiter, retry policy and call
+    counters with calendar_client.
+    """
+
+    def __init__(self, api_root=CALENDAR_API_ROOT, pool_size=CONNECTION_POOL_SIZE):
+        self.api_root = api_root.rstrip("/")
+        self.pool_size = pool_size
+        self._session = None
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT_SECONDS),
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _request(self, method, path, params=None, json=None, headers=None):
+        """
+        Sends one API request with rate limiting and retries, returning the
+        decoded JSON body (None for empty responses).
+        """
+        session = await self._get_session()
+        url = f"{self.api_root}/{path.lstrip('/')}"
+        params = {
+            # aiohttp only takes strings and numbers as query parameters
+            key: ("true" if value else "false") if isinstance(value, bool) else value
+            for key, value in (params or {}).items() if value is not None
+        }
+
+        for attempt in range(calendar_client.CALENDAR_MAX_RETRIES + 1):
+            # Credentials may refresh (blocking I/O) and the rate limiter may
+            # sleep, so neither runs on the event loop itself.
+            creds = await asyncio.to_thread(calendar_client.get_credentials)
+            await asyncio.to_thread(calendar_client.acquire_quota)
+
+            request_headers = {"Authorization": f"Bearer {creds.token}"}
+            if headers:
+                request_headers.update(headers)
+
+            async with session.request(
+                method, url, params=params, json=json, headers=request_headers
+            ) as response:
+                content = await response.read()
+                if response.status < 400:
+                    return await response.json() if content else None
+
+                calendar_client.call_stats.record_error(response.status)
+                retryable = calendar_client.is_retryable_response(response.status, content)
+                if attempt == calendar_client.CALENDAR_MAX_RETRIES or not retryable:
+                    calendar_client.call_stats.increment("failures")
+                    raise CalendarAPIError(response.status, content.decode("utf-8", "replace"))
+
+                retry_after = rate_limiter.parse_retry_after(response.headers.get("Retry-After"))
+
+            delay = rate_limiter.backoff_delay(attempt, retry_after=retry_after)
+            calendar_client.call_stats.increment("retries")
+            print(f"Calendar API returned {response.status}, retrying in {delay:.1f}s...")
+            await asyncio.sleep(delay)
+
+    async def iter_event_pages(self, calendar_id="primary", fields=None,
+                               page_size=calendar_client.EVENTS_PAGE_SIZE, **params):
+        """
+        Async generator over every page of an events.list call, following
+        nextPageToken. Takes the same parameters as calendar_client.iter_event_pages.
+        """
+        if fields:
+            params["fields"] = f"nextPageToken,nextSyncToken,items({fields})"
+        params["maxResults"] = page_size
+
+        page_token = None
+        while True:
+            page = await self._request(
+                "GET",
+                f"calendars/{quote(calendar_id, safe='')}/events",
+                params={**params, "pageToken": page_token},
+            )
+            yield page
+            page_token = page.get("nextPageToken")
+            if not page_token:
+                return
+
+    async def list_events(self, time_min, time_max, calendar_id="primary", fields=None, **params):
+        """Returns all events between two ISO timestamps, ordered by start."""
+        params.setdefault("singleEvents", True)
+        params.setdefault("orderBy", "startTime")
+        return [
+            event
+            async for page in self.iter_event_pages(
+                calendar_id, fields=fields, timeMin=time_min, timeMax=time_max, **params
+            )
+            for event in page.get("items", [])
+        ]
+
+    async def get_event(self, event_id, calendar_id="primary", fields=None):
+        return await self._request(
+            "GET", f"calendars/{quote(calendar_id, safe='')}/events/{event_id}",
+            params={"fields": fields},
+        )
+
+    async def insert_event(self, body, calendar_id="primary"):
+        return await self._request(
+            "POST", f"calendars/{quote(calendar_id, safe='')}/events", json=body
+        )
+
+    async def patch_event(self, event_id, body, calendar_id="primary", etag=None, fields=None):
+        headers = {"If-Match": etag} if etag else None
+        return await self._request(
+            "PATCH",
+            f"calendars/{quote(calendar_id, safe='')}/events/{event_id}",
+            params={"fields": fields},
+            json=body,
+            headers=headers,
+        )
+
+    async def delete_event(self, event_id, calendar_id="primary"):
+        await self._request("DELETE", f"calendars/{quote(calendar_id, safe='')}/events/{event_id}")
+        return True
+
+    async def get_calendar_list_entry(self, calendar_id="primary",
+                                      fields=calendar_client.CALENDAR_METADATA_FIELDS):
+        return await self._request(
+            "GET", f"users/me/calendarList/{quote(calendar_id, safe='')}", params={"fields": fields}
+        )
+
+    async def freebusy(self, time_min, time_max, calendar_ids=("primary",)):
+        """Queries busy time between two aware datetimes (at most FREEBUSY_MAX_SPAN apart)."""
+        return await self._request(
+            "POST", "freeBusy", json=calendar_client.freebusy_body(time_min, time_max, calendar_ids)
+        )
+
+
+# Bridge for synchronous callers: one event loop on a daemon thread, shared
+# by every Flask worker thread, so the connection pool is reused.
+_loop = None
+_loop_lock = threading.Lock()
+_client = None
+
+
+def _get_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="calendar-async", daemon=True).start()
+        return _loop
+
+
+def get_client():
+    """Returns the shared AsyncCalendarClient."""
+    global _client
+    with _loop_lock:
+        if _client is None:
+            _client = AsyncCalendarClient()
+        return _client
+
+
+def run(coro, timeout=None):
+    """Runs a coroutine on the shared event loop and waits for its result."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result(timeout)
+
+
+def gather(*coros, timeout=None):
+    """
+    Runs several coroutines concurrently and returns their results in order.
+    Exceptions are returned in place of results rather than raised.
+    """
+    async def _gather():
+        return await asyncio.gather(*coros, return_exceptions=True)
+
+    return run(_gather(), timeout)
+
+
+# Errors that leave a calendar call without an answer
+_CALL_ERRORS = (CalendarAPIError, aiohttp.ClientError, asyncio.TimeoutError)
+
+
+@contextlib.asynccontextmanager
+async def _holding(lock):
+    """
+    Holds a threading lock without blocking the event loop. Polling instead
+    of acquiring in a worker thread means a cancelled waiter never ends up
+    owning the lock.
+    """
+    while not lock.acquire(blocking=False):
+        await asyncio.sleep(LOCK_POLL_SECONDS)
+    try:
+        yield
+    finally:
+        lock.release()
+
+
+async def _apply_sync(engine, plan):
+    pages = [
+        page async for page in get_client().iter_event_pages(
+            engine.calendar_id, fields=calendar_client.SYNC_EVENT_FIELDS, **engine.list_params(plan)
+        )
+    ]
+    await asyncio.to_thread(engine.apply_pages, plan, pages)
+
+
+async def _sync_calendar(engine, days_in_future):
+    """
+    CalendarSyncEngine.sync with the events.list pages read over aiohttp:
+    incrementally from the stored sync token, or in full if there is none
+    or Google expired it (410). Returns True on success.
+    """
+    async with _holding(engine.lock):
+        plan = await asyncio.to_thread(engine.plan_sync, days_in_future)
+        try:
+            await _apply_sync(engine, plan)
+            return True
+        except _CALL_ERRORS as error:
+            if not plan["sync_token"] or getattr(error, "status", None) != 410:
+                print(f"An error occurred while syncing events: {error}")
+                return False
+            print("Sync token expired, running a full resync...")
+
+        plan = await asyncio.to_thread(engine.plan_sync, days_in_future, True)
+        try:
+            await _apply_sync(engine, plan)
+            return True
+        except _CALL_ERRORS as error:
+            print(f"An error occurred while syncing events: {error}")
+            return False
+
+
+# (calendar id, days) -> running sync Task; only touched on the shared loop
+_sync_tasks = {}
+
+
+async def _sync_calendars(calendar_ids, days_in_future):
+    """
+    Syncs several calendars concurrently and returns their engines. A
+    caller asking for a calendar that is already being synced for the same
+    window waits for that sync instead of starting another.
+    """
+    engines = [calendar_client.get_sync_engine(calendar_id) for calendar_id in calendar_ids]
+    tasks = []
+    for engine in engines:
+        key = (engine.calendar_id, days_in_future)
+        task = _sync_tasks.get(key)
+        if task is None:
+            task = _sync_tasks[key] = asyncio.ensure_future(_sync_calendar(engine, days_in_future))
+            task.add_done_callback(lambda _, key=key: _sync_tasks.pop(key, None))
+        tasks.append(task)
+    await asyncio.gather(*tasks)
+    return engines
+
+
+async def _merged_events(engines, time_min, time_max):
+    return await asyncio.to_thread(
+        lambda: list(calendar_client.iter_merged_events(engines, time_min, time_max))
+    )
+
+
+async def _sync_events(days_in_future, calendar_ids=None):
+    if calendar_ids is None:
+        calendar_ids = await asyncio.to_thread(calendar_client.get_selected_calendar_ids)
+    engines = await _sync_calendars(calendar_ids, days_in_future)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return await _merged_events(engines, now, now + datetime.timedelta(days=days_in_future))
+
+
+async def _query_busy_intervals(ranges, calendar_ids=("primary",)):
+    """
+    calendar_client.query_busy_intervals with every FreeBusy span queried
+    at the same time.
+
+    Raises:
+        FreeBusyError: If a query failed or a calendar's busy time could
+                       not be read
+    """
+    if not ranges:
+        return []
+    client = get_client()
+    responses = await asyncio.gather(
+        *[
+            client.freebusy(span_start, span_end, calendar_ids)
+            for span_start, span_end in calendar_client.freebusy_spans(ranges)
+        ],
+        return_exceptions=True,
+    )
+    for response in responses:
+        if isinstance(response, _CALL_ERRORS):
+            print(f"An error occurred while querying free/busy time: {response}")
+            raise calendar_client.FreeBusyError(f"Free/busy query failed: {response}") from response
+        if isinstance(response, Exception):
+            raise response
+    return calendar_client.busy_events(ranges, responses)
+
+
+async def _get_conflict_candidates(ranges, require_event_details=False):
+    if not ranges:
+        return []
+    plan = await asyncio.to_thread(calendar_client.conflict_check_plan, ranges)
+    if plan["stale"]:
+        if not require_event_details:
+            return await _query_busy_intervals(
+                ranges, calendar_ids=[engine.calendar_id for engine in plan["engines"]]
+            )
+        await _sync_calendars([engine.calendar_id for engine in plan["stale"]], plan["days_in_future"])
+    return await _merged_events(plan["engines"], plan["time_min"], plan["time_max"])
+
+
+def sync_events(days_in_future=calendar_client.SYNC_WINDOW_DAYS, calendar_ids=None):
+    """
+    calendar_client.sync_events with every calendar synced at the same time
+    over aiohttp: returns the merged events of the selected calendars from
+    now until `days_in_future` days ahead.
+    """
+    return run(_sync_events(days_in_future, calendar_ids))
+
+
+def get_conflict_candidates(ranges, require_event_details=False):
+    """
+    calendar_client.get_conflict_candidates with its FreeBusy spans (or the
+    syncs of stale calendars) fetched at the same time over aiohttp.
+
+    Raises:
+        FreeBusyError: If busy time could not be checked
+    """
+    return run(_get_conflict_candidates(ranges, require_event_details))
+
+
+async def _fetch_metadata(calendar_id="primary"):
+    metadata = calendar_client.peek_calendar_metadata(calendar_id)
+    if metadata:
+        return metadata
+    calendar = await get_client().get_calendar_list_entry(calendar_id)
+    return calendar_client.remember_calendar_metadata(calendar_id, calendar)
+
+
+def gather_schedule_context(days_in_future=calendar_client.SYNC_WINDOW_DAYS):
+    """
+    Fetches everything /schedule needs before planning, concurrently: the
+    event window of every selected calendar (each synced over aiohttp at the
+    same time) and the calendar metadata used by the writes that follow.
+    Takes as long as the slowest of those calls.
+
+    Returns:
+        Dict with "events" and "metadata" (None if it could not be fetched)
+    """
+    events, metadata = gather(_sync_events(days_in_future), _fetch_metadata())
+    if isinstance(events, Exception):
+        print(f"An error occurred while fetching events: {events}")
+        events = []
+    if isinstance(metadata, Exception):
+        print(f"Error fetching calendar metadata: {metadata}")
+        metadata = None
+    return {"events": events, "metadata": metadata}
@@ -0,0 +1,282 @@
+"""
+Availability bitmap for placing work sessions without the LLM.
+
+The planner's placement rules (prefer 8 AM to 6 PM, avoid Sundays, blocks of
+at least 45 minutes, sessions before the due date) are simple enough to apply
+directly. The cached event window is turned into a NumPy array with one cell
+per CELL_MINUTES, counting the events that cover each cell, and placements
+are found with vectorized sliding-window sums over it: every possible start
+in the window is checked and scored at once, so a 90-day search takes about
+a millisecond.
+
+The bitmap is built once per cached window and kept up to date as the app's
+own writes are patched into that window, so it never has to be rebuilt for
+a create or delete. All-day events don't block time, as in free_slots.
+"""
+import datetime
+import functools
+import os
+
+import numpy as np
+
+from free_slots import MIN_BLOCK_MINUTES
+
+# Size of one cell; placements start and end on cell boundaries. Must divide
+# an hour (5 and 15 are the useful values)
+CELL_MINUTES = int(os.environ.get("AVAILABILITY_CELL_MINUTES", "15"))
+
+# Sessions are never placed outside these hours
+EARLIEST_HOUR = 7
+LATEST_HOUR = 22
+
+# Sessions are preferably placed between these hours
+PREFERRED_START_HOUR = 8
+PREFERRED_END_HOUR = 18
+
+# How many days before the due date sessions are aimed at
+DEADLINE_LEAD_DAYS = 1
+
+# Penalties used to score a placement; the lowest total wins
+OUTSIDE_PREFERRED_PENALTY = 1.0   # For a session entirely outside preferred hours
+WEEKDAY_PENALTIES = {5: 0.5, 6: 2.0}  # Saturday, Sunday
+DAY_DISTANCE_PENALTY = 0.25       # Per day away from the target day
+FRAGMENT_PENALTY = 0.5            # Per leftover gap shorter than MIN_BLOCK_MINUTES
+
+_HOUR = 3600
+_DAY = 86400
+
+
+@functools.lru_cache(maxsize=32)
+def _local_clock(origin, cells, cell_seconds, tzinfo):
+    """
+    Returns (minute of day, weekday, day number) of every cell's start in
+    `tzinfo`, as arrays. UTC offsets are looked up once per hour, which is
+    how often they can change.
+    """
+    first_hour = origin - origin % _HOUR
+    hours = (cells * cell_seconds + origin - first_hour) // _HOUR + 1
+    offsets = np.array([
+        datetime.datetime.fromtimestamp(first_hour + hour * _HOUR, tzinfo).utcoffset().total_seconds()
+        for hour in range(hours)
+    ], dtype=np.int64)
+
+    epochs = origin + np.arange(cells, dtype=np.int64) * cell_seconds
+    local = epochs + offsets[(epochs - first_hour) // _HOUR]
+    day_number = local // _DAY
+    minute_of_day = (local % _DAY) // 60
+    weekday = (day_number + 3) % 7  # 1970-01-01 was a Thursday
+    return minute_of_day, weekday, day_number
+
+
+def _run_lengths(mask):
+    """
+    Returns (ending, starting): for every cell, how many consecutive True
+    cells end at it and start at it (0 where the cell is False).
+    """
+    positions = np.arange(len(mask))
+    last_false = np.maximum.accumulate(np.where(mask, -1, positions))
+    ending = positions - last_false
+    next_false = np.minimum.accumulate(np.where(mask, len(mask), positions)[::-1])[::-1]
+    starting = next_false - positions
+    return ending, starting
+
+
+def _window_sums(values, width):
+    """Sums of every `width` consecutive values, one per possible start."""
+    totals = np.concatenate(([0], np.cumsum(values, dtype=np.int64)))
+    return totals[width:] - totals[:-width]
+
+
+class AvailabilityBitmap:
+    """
+    Busy cells between time_min and time_max. Each cell counts the events
+    covering it, so removing one of two overlapping events leaves the time
+    busy.
+
+    Args:
+        time_min, time_max: Aware datetimes bounding the bitmap
+        cell_minutes: Cell size
+    """
+
+    def __init__(self, time_min, time_max, cell_minutes=CELL_MINUTES):
+        self.cell = cell_minutes * 60
+        self.origin = int(time_min.timestamp()) // self.cell * self.cell
+        cells = -(-(int(time_max.timestamp()) - self.origin) // self.cell)
+        self.busy = np.zeros(max(cells, 0), dtype=np.int32)
+
+    @classmethod
+    def from_events(cls, events, time_min, time_max, cell_minutes=CELL_MINUTES):
+        """Builds a bitmap from Event objects."""
+        bitmap = cls(time_min, time_max, cell_minutes)
+        bitmap.add(events)
+        return bitmap
+
+    def _cell_ranges(self, events):
+        timed = [(event.start, event.end) for event in events if not event.all_day]
+        if not timed:
+            return None
+        times = np.array(timed, dtype=np.int64)
+        cells = len(self.busy)
+        first = np.clip((times[:, 0] - self.origin) // self.cell, 0, cells)
+        last = np.clip(-(-(times[:, 1] - self.origin) // self.cell), 0, cells)
+        return first, last
+
+    def _apply(self, events, sign):
+        ranges = self._cell_ranges(events)
+        if ranges is None:
+            return
+        changes = np.zeros(len(self.busy) + 1, dtype=np.int32)
+        np.add.at(changes, ranges[0], sign)
+        np.add.at(changes, ranges[1], -sign)
+        self.busy += np.cumsum(changes[:-1], dtype=np.int32)
+
+    def add(self, events):
+        """Marks the time of Event objects busy."""
+        self._apply(events, 1)
+
+    def remove(self, events):
+        """Frees the time of Event objects previously added."""
+        self._apply(events, -1)
+
+    def reserve(self, start, end):
+        """Marks the time between two epochs busy, e.g. for a planned session."""
+        first = min(max((int(start) - self.origin) // self.cell, 0), len(self.busy))
+        last = min(max(-(-(int(end) - self.origin) // self.cell), 0), len(self.busy))
+        self.busy[first:last] += 1
+
+    def copy(self):
+        """Returns an independent copy, e.g. to plan several tasks on."""
+        duplicate = AvailabilityBitmap.__new__(AvailabilityBitmap)
+        duplicate.cell = self.cell
+        duplicate.origin = self.origin
+        duplicate.busy = self.busy.copy()
+        return duplicate
+
+    def free_cells(self):
+        """True for every cell no event covers."""
+        return self.busy == 0
+
+    def cell_of(self, moment, round_up=False):
+        """Index of the cell containing (or, with round_up, starting at or after) an aware datetime."""
+        offset = moment.timestamp() - self.origin
+        index = -(-offset // self.cell) if round_up else offset // self.cell
+        return int(min(max(index, 0), len(self.busy)))
+
+    def epoch_of(self, index):
+        return self.origin + int(index) * self.cell
+
+    def place(self, duration_minutes, tzinfo, not_before=None, deadline=None,
+              count=1, distinct_days=False, free=None, lead_days=DEADLINE_LEAD_DAYS):
+        """
+        Finds the best non-overlapping placements for a session.
+
+        Args:
+            duration_minutes: Session length, rounded up to whole cells
+            tzinfo: Time zone the hour and weekday preferences apply in
+            not_before: Aware datetime the session may not start before
+                        (defaults to the start of the bitmap)
+            deadline: Optional aware datetime the session must end by;
+                      sessions are aimed at DEADLINE_LEAD_DAYS before it,
+                      otherwise at the earliest day possible
+            count: How many placements to return, best first
+            distinct_days: Only return one placement per day
+            free: Free cells to search instead of the bitmap's own (see
+                  place_sessions)
+            lead_days: Days before the deadline to aim at; None aims at the
+                       earliest day even when there is a deadline
+
+        Returns:
+            A list of (start, end) epoch pairs, possibly shorter than
+            `count` (empty if the session fits nowhere).
+        """
+        cells = len(self.busy)
+        width = -(-duration_minutes * 60 // self.cell)
+        if width <= 0 or width > cells:
+            return []
+        if free is None:
+            free = self.free_cells()
+
+        minute_of_day, weekday, day_number = _local_clock(self.origin, cells, self.cell, tzinfo)
+        usable = free & (minute_of_day >= EARLIEST_HOUR * 60) & (minute_of_day < LATEST_HOUR * 60)
+        preferred = (minute_of_day >= PREFERRED_START_HOUR * 60) & (minute_of_day < PREFERRED_END_HOUR * 60)
+
+        # One entry per possible start: starts[i] covers cells i .. i + width - 1
+        starts = np.arange(cells - width + 1)
+        fits = _window_sums(usable, width) == width
+        first = self.cell_of(not_before, round_up=True) if not_before else 0
+        fits[:first] = False
+        if deadline is not None:
+            last_end = self.cell_of(deadline)
+            fits[max(last_end - width + 1, 0):] = False
+        if not fits.any():
+            return []
+
+        score = OUTSIDE_PREFERRED_PENALTY * (1 - _window_sums(preferred, width) / width)
+        weekday_penalty = np.zeros(7)
+        for day, penalty in WEEKDAY_PENALTIES.items():
+            weekday_penalty[day] = penalty
+        score += weekday_penalty[weekday[starts]]
+
+        # Distance in days from the day the session is aimed at
+        if deadline is not None and lead_days is not None:
+            target = day_number[max(self.cell_of(deadline) - 1, 0)] - lead_days
+            target = max(target, day_number[min(first, cells - 1)])
+        else:
+            target = day_number[min(first, cells - 1)]
+        score += DAY_DISTANCE_PENALTY * np.abs(day_number[starts] - target)
+
+        # Leftover gaps on either side too short to use are wasted time
+        ending, starting = _run_lengths(usable)
+        minimum = -(-MIN_BLOCK_MINUTES * 60 // self.cell)
+        before = np.where(starts > 0, ending[np.maximum(starts - 1, 0)], 0)
+        after = np.where(starts + width < cells, starting[np.minimum(starts + width, cells - 1)], 0)
+        score += FRAGMENT_PENALTY * (((before > 0) & (before < minimum)).astype(float)
+                                     + ((after > 0) & (after < minimum)).astype(float))
+
+        score = np.where(fits, score, np.inf)
+        placements = []
+        order = np.argsort(score, kind="stable")
+        for index in order[:np.count_nonzero(fits)]:
+            if len(placements) == count:
+                break
+            if not np.isfinite(score[index]):
+                continue  # Overlaps an earlier pick
+            placements.append((self.epoch_of(index), self.epoch_of(index + width)))
+            # Later picks may not overlap this one (or share its day)
+            if distinct_days:
+                score[day_number[starts] == day_number[index]] = np.inf
+            else:
+                score[max(index - width + 1, 0):index + width] = np.inf
+        return placements
+
+    def place_sessions(self, durations, tzinfo, not_before=None, deadline=None,
+                       distinct_days=False, lead_days=DEADLINE_LEAD_DAYS):
+        """
+        Places several sessions (e.g. the study sessions for one exam) one
+        after another, each in the best time left by the ones before it.
+
+        Args:
+            durations: Session lengths in minutes
+            distinct_days: Put every session on a different day
+            lead_days: As for place()
+
+        Returns:
+            The (start, end) epoch pairs in time order, or None if not all
+            sessions fit.
+        """
+        free = self.free_cells()
+        day_number = _local_clock(self.origin, len(self.busy), self.cell, tzinfo)[2]
+        placed = []
+        for duration in sorted(durations, reverse=True):
+            found = self.place(duration, tzinfo, not_before, deadline, free=free, lead_days=lead_days)
+            if not found:
+                return None
+            start, end = found[0]
+            placed.append((start, end))
+            first = (start - self.origin) // self.cell
+            if distinct_days:
+                free = free & (day_number != day_number[first])
+            else:
+                free = free.copy()
+                free[first:(end - self.origin) // self.cell] = False
+        return sorted(placed)
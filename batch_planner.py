@@ -0,0 +1,222 @@
+"""
+Plans several tasks with due dates in one pass, without the LLM.
+
+Scheduling a week's assignments through /schedule costs one LLM round trip
+per request, and each request is planned without knowing about the sessions
+the others added. Here every task gets its sessions from its estimated
+duration (learned feedback first, then the planner's defaults), and tasks
+are placed earliest deadline first on one availability bitmap, each task's
+sessions reserved before the next is placed, so the plan never conflicts
+with itself or the calendar.
+
+Sessions are first aimed at the day before each due date, like the LLM
+planner does. If that leaves a task with no room before its due date, the
+whole batch is planned again placing every session as early as possible,
+which with earliest deadline first fits everything that can fit.
+"""
+import datetime
+import math
+
+import duration_feedback
+from availability import DEADLINE_LEAD_DAYS
+from free_slots import MIN_BLOCK_MINUTES, parse_time
+
+# Sessions longer than this are split into several
+MAX_SESSION_MINUTES = 120
+
+# Sessions per assignment type when no duration is given or learned, as the
+# LLM planner is told to schedule them
+DEFAULT_SESSIONS = {
+    "project": (120, 120),
+    "homework": (120,),
+    "exam": (120, 120),
+    "quiz": (45,),
+    "paper": (60,),
+    "lab": (120,),
+    "reading": (60,),
+    "study": (60,),
+}
+DEFAULT_SESSION = (60,)
+
+# Assignment types whose sessions go on different days
+DISTINCT_DAY_TYPES = {"exam"}
+
+# Session lengths are rounded up to this many minutes
+SESSION_ROUNDING_MINUTES = 15
+
+# Largest duration and session count a task may ask for
+MAX_TASK_HOURS = 100
+MAX_TASK_SESSIONS = 20
+
+
+def _localize(naive, tzinfo):
+    if hasattr(tzinfo, "localize"):
+        return tzinfo.localize(naive)  # pytz
+    return naive.replace(tzinfo=tzinfo)
+
+
+def parse_due(value, tzinfo):
+    """
+    Parses a due date: an ISO timestamp, or a date meaning the end of that
+    day in `tzinfo`.
+    """
+    if "T" not in value:
+        day = datetime.date.fromisoformat(value)
+        return _localize(datetime.datetime.combine(day, datetime.time(23, 59)), tzinfo)
+    return parse_time(value)
+
+
+def _positive_number(task, field, maximum, number):
+    """
+    Returns a task's optional numeric field, or None if it is not given.
+    Raises ValueError if it is not a number between 0 (exclusive) and
+    `maximum`.
+    """
+    value = task.get(field)
+    if value is None:
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Task {number} has a non-numeric {field}")
+    if not 0 < value <= maximum:
+        raise ValueError(f"Task {number} {field} must be more than 0 and at most {maximum:g}")
+    return value
+
+
+def split_duration(minutes, count=None):
+    """
+    Splits a total into `count` equal sessions, by default as few as keep
+    them within MAX_SESSION_MINUTES.
+    """
+    count = count or max(1, math.ceil(minutes / MAX_SESSION_MINUTES))
+    length = math.ceil(minutes / count / SESSION_ROUNDING_MINUTES) * SESSION_ROUNDING_MINUTES
+    return (max(length, MIN_BLOCK_MINUTES),) * count
+
+
+def estimate_sessions(task):
+    """
+    Returns (session lengths in minutes, where the estimate came from) for
+    a task dict: its own "duration_hours" ("request"), the learned duration
+    for its class and assignment type ("feedback"), or the defaults for its
+    type ("default").
+    """
+    if task.get("duration_hours"):
+        return split_duration(float(task["duration_hours"]) * 60), "request"
+
+    summary = task.get("summary", "")
+    assignment_type = duration_feedback.extract_assignment_type(summary)
+    learned = duration_feedback.get_duration_suggestion(
+        duration_feedback.extract_class_from_text(summary), assignment_type
+    )
+    if learned:
+        return split_duration(float(learned) * 60), "feedback"
+    return DEFAULT_SESSIONS.get(assignment_type, DEFAULT_SESSION), "default"
+
+
+def _place_all(tasks, bitmap, tzinfo, now, lead_days):
+    """
+    Places tasks in order on a copy of the bitmap. Returns {task index:
+    [(start, end), ...] or None}.
+    """
+    working = bitmap.copy()
+    placements = {}
+    for task in tasks:
+        sessions = working.place_sessions(
+            task["sessions"], tzinfo, not_before=now, deadline=task["due"],
+            distinct_days=task["distinct_days"], lead_days=lead_days,
+        )
+        placements[task["index"]] = sessions
+        for start, end in sessions or ():
+            working.reserve(start, end)
+    return placements
+
+
+def plan_batch(tasks, bitmap, tzinfo, now=None):
+    """
+    Plans sessions for several tasks at once.
+
+    Args:
+        tasks: Dicts with "summary" and optionally "due" (ISO timestamp or
+               date), "duration_hours" and "sessions" (how many sessions to
+               split the duration into)
+        bitmap: AvailabilityBitmap of the user's calendar
+        tzinfo: The calendar's time zone
+
+    Returns:
+        {"plan": [{"summary", "due", "duration_source", "events":
+        [{"summary", "start_time", "end_time"}]}], "unscheduled":
+        [{"summary", "reason"}], "strategy": "preferred" or "earliest"},
+        tasks in the order given.
+
+    Raises:
+        ValueError: If a task has no summary, an invalid due date, or a
+                    duration or session count that is not a positive number
+                    up to MAX_TASK_HOURS or MAX_TASK_SESSIONS
+    """
+    now = now or datetime.datetime.now(tzinfo)
+    prepared = []
+    for index, task in enumerate(tasks):
+        if not isinstance(task, dict) or not task.get("summary"):
+            raise ValueError(f"Task {index + 1} has no summary")
+        _positive_number(task, "duration_hours", MAX_TASK_HOURS, index + 1)
+        session_count = _positive_number(task, "sessions", MAX_TASK_SESSIONS, index + 1)
+        if session_count is not None and session_count != int(session_count):
+            raise ValueError(f"Task {index + 1} sessions must be a whole number")
+        sessions, source = estimate_sessions(task)
+        if session_count:
+            sessions = split_duration(sum(sessions), int(session_count))
+        prepared.append({
+            "index": index,
+            "summary": task["summary"],
+            "due": parse_due(task["due"], tzinfo) if task.get("due") else None,
+            "sessions": sessions,
+            "source": source,
+            "distinct_days": (
+                duration_feedback.extract_assignment_type(task["summary"]) in DISTINCT_DAY_TYPES
+            ),
+        })
+
+    # Earliest deadline first; tasks without one go last, longest first
+    order = sorted(prepared, key=lambda task: (
+        task["due"] is None,
+        task["due"].timestamp() if task["due"] else -sum(task["sessions"]),
+    ))
+    strategy = "preferred"
+    placements = _place_all(order, bitmap, tzinfo, now, lead_days=DEADLINE_LEAD_DAYS)
+    if any(sessions is None for sessions in placements.values()):
+        earliest = _place_all(order, bitmap, tzinfo, now, lead_days=None)
+        placed = sum(sessions is not None for sessions in placements.values())
+        if sum(sessions is not None for sessions in earliest.values()) > placed:
+            placements, strategy = earliest, "earliest"
+
+    result = {"plan": [], "unscheduled": [], "strategy": strategy}
+    for task in prepared:
+        sessions = placements[task["index"]]
+        if sessions is None:
+            result["unscheduled"].append({
+                "summary": task["summary"],
+                "reason": (
+                    f"No room for {len(task['sessions'])} session(s) totalling "
+                    f"{sum(task['sessions']) / 60:g} hours"
+                    + (" before it is due" if task["due"] else "")
+                ),
+            })
+            continue
+        events = []
+        for number, (start, end) in enumerate(sessions, 1):
+            summary = task["summary"]
+            if len(sessions) > 1:
+                summary = f"{summary} (Session {number} of {len(sessions)})"
+            events.append({
+                "summary": summary,
+                "start_time": datetime.datetime.fromtimestamp(start, tzinfo).isoformat(),
+                "end_time": datetime.datetime.fromtimestamp(end, tzinfo).isoformat(),
+            })
+        result["plan"].append({
+            "summary": task["summary"],
+            "due": task["due"].isoformat() if task["due"] else None,
+            "duration_source": task["source"],
+            "events": events,
+        })
+    return result
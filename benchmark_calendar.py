@@ -0,0 +1,155 @@
+"""
+Benchmark script for the Calendar client against the local fake API.
+Starts fake_calendar_server in-process, so no Google quota is used.
+
+    python benchmark_calendar.py --events 10000 --latency-ms 40 --error-rate 0.02
+"""
+
+import argparse
+import datetime
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from fake_calendar_server import FakeCalendarBackend, start_fake_server
+
+# An unselected calendar with realistic free time for the local placement
+# benchmarks: weekly classes plus a couple of one-off events a day. The main
+# calendar is packed too tightly to place anything on.
+STUDENT_CALENDAR = "student@example.com"
+STUDENT_CLASSES = 10
+STUDENT_EVENTS_PER_DAY = 2
+
+
+def print_section(title):
+    print("\n" + "="*60)
+    print(f" {title}")
+    print("="*60)
+
+
+def timed(label, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed * 1000:>10.1f} ms")
+    return result
+
+
+def timed_split(label, gaps, duration, time_budget=None):
+    """Times one solve_split call and prints what the search found and how far it got."""
+    import free_slots
+    stats = {}
+    blocks = timed(label, free_slots.solve_split, gaps, duration, time_budget=time_budget, stats=stats)
+    budget = free_slots.SPLIT_TIME_BUDGET if time_budget is None else time_budget
+    print(f"  {len(blocks) if blocks else 'no'} blocks, {stats['nodes']} nodes, "
+          f"{'ran out of' if stats['budget_exhausted'] else 'within'} the {budget * 1000:g} ms budget")
+    return blocks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark calendar_client against the fake API.")
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--page-size", type=int, default=2500)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--creates", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    backend = FakeCalendarBackend(
+        page_size=args.page_size,
+        latency=args.latency_ms / 1000,
+        error_rate=args.error_rate,
+        retry_after=0,
+        seed=args.seed,
+    )
+    backend.populate("primary", args.events, 90)
+    backend.add_calendar(STUDENT_CALENDAR, "Student timetable", selected=False)
+    backend.populate_classes(STUDENT_CALENDAR, STUDENT_CLASSES, 15)
+    backend.populate(STUDENT_CALENDAR, STUDENT_EVENTS_PER_DAY * 90, 90)
+    server, root_url = start_fake_server(backend)
+
+    # calendar_client reads its endpoint, quota and event cache at import
+    # time; the fake API has no quota worth protecting, and its events go in
+    # a throwaway cache rather than the real event_cache.db.
+    cache_dir = tempfile.mkdtemp(prefix="calendar-benchmark-")
+    os.environ["CALENDAR_API_ROOT"] = root_url
+    os.environ["EVENT_CACHE_DB"] = os.path.join(cache_dir, "event_cache.db")
+    os.environ.setdefault("CALENDAR_USER_QPS", "1000")
+    os.environ.setdefault("CALENDAR_PROJECT_QPS", "1000")
+    try:
+        run(args, backend)
+    finally:
+        server.shutdown()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def run(args, backend):
+    import calendar_client
+
+    print_section(f"{args.events} events, {args.latency_ms:.0f} ms latency, "
+                  f"{args.error_rate:.0%} errors")
+    now = datetime.datetime.now(datetime.timezone.utc)
+
+    events = timed("Full sync (90 days)", calendar_client.sync_events, 90)
+    print(f"  {len(events)} events")
+    timed("Incremental sync, no changes", calendar_client.sync_events, 90)
+    ranged = timed("Field-masked range fetch (30 days)", calendar_client.get_events_in_range, 30)
+    print(f"  {len(ranged)} events")
+    timed("FreeBusy query (7 days)", calendar_client.query_busy_intervals,
+          [(now, now + datetime.timedelta(days=7))])
+
+    planned = [
+        {
+            "summary": f"Benchmark block {n}",
+            "start_time": (now + datetime.timedelta(hours=n)).isoformat(),
+            "end_time": (now + datetime.timedelta(hours=n, minutes=30)).isoformat(),
+        }
+        for n in range(args.creates)
+    ]
+    timed(f"Batch create ({args.creates} events)", calendar_client.create_events, planned)
+    timed("Incremental sync after creates", calendar_client.sync_events, 90)
+
+    print_section("Local placement (availability bitmap)")
+    from availability import AvailabilityBitmap
+    student = calendar_client.sync_events(90, calendar_ids=[STUDENT_CALENDAR])
+    print(f"  {len(student)} events on a student timetable")
+    bitmap = timed("Build bitmap (90 days)", AvailabilityBitmap.from_events,
+                   student, now, now + datetime.timedelta(days=90))
+    print(f"  {bitmap.free_cells().sum() * bitmap.cell / 3600:.0f} of "
+          f"{len(bitmap.busy) * bitmap.cell / 3600:.0f} hours free")
+    placements = timed("Best 3 one-hour sessions", bitmap.place, 60, datetime.timezone.utc,
+                       now, now + datetime.timedelta(days=14), count=3)
+    print(f"  {len(placements)} found")
+    placements = timed("Two sessions on different days", bitmap.place_sessions, [60, 60],
+                       datetime.timezone.utc, now, now + datetime.timedelta(days=14), distinct_days=True)
+    print(f"  {len(placements or [])} found")
+    timed("Incremental update (one event)", bitmap.add, student[:1])
+
+    print_section("Task split solver")
+    import free_slots
+    gaps = free_slots.free_intervals(student, now, now + datetime.timedelta(days=90))
+    longest = max((end - start for start, end in gaps), default=0)
+    print(f"  {len(gaps)} free gaps in 90 days on the student timetable, "
+          f"longest {longest / 3600:g} hours")
+    # A longer task than any working day has room for can only be split
+    for hours in (3, 12):
+        timed_split(f"Split {hours} hours over 90 days", gaps, hours * 3600)
+    # Thousands of short gaps (45 to 90 minutes), none fitting the task alone
+    rng = random.Random(args.seed)
+    fragmented = []
+    for hour in range(0, 24 * 365, 2):
+        fragmented.append((hour * 3600, hour * 3600 + rng.randrange(45, 91, 5) * 60))
+    for hours in (3, 4.5):
+        timed_split(f"Split {hours:g} hours over {len(fragmented)} short gaps",
+                    fragmented, int(hours * 3600), time_budget=10)
+
+    print_section("Totals")
+    print(f"Client: {calendar_client.get_call_stats()}")
+    print(f"Server: {backend.stats}")
+
+
+if __name__ == "__main__":
+    main()
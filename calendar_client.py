@@ -1,117 +1,1185 @@
+import concurrent.futures
 import datetime
+import functools
+import heapq
+import json
 import os.path
+import threading
+import time
+import uuid
 import pytz  # NEW: Import for time zone handling
 
+from google.auth.credentials import AnonymousCredentials
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build, build_from_document
 from googleapiclient.errors import HttpError
 
+import event_store
+import rate_limiter
+import recurrence
+from event_model import Event
+from single_flight import SingleFlight
+
 # If modifying these scopes, delete the file token.json.
 SCOPES = ["https://www.googleapis.com/auth/calendar"]
 
+# The file token.json stores the user's access and refresh tokens, and is
+# created automatically when the authorization flow completes for the first
+# time.
+TOKEN_FILE = "token.json"
+
+# Refresh access tokens this long before they expire so that no request goes
+# out with a token that lapses mid-flight.
+TOKEN_REFRESH_MARGIN = datetime.timedelta(minutes=5)
+
+# Root URL of the Calendar API. Point it at a local stand-in (see
+# fake_calendar_server.py) to test or benchmark without touching Google.
+DEFAULT_API_ROOT = "https://www.googleapis.com/"
+CALENDAR_API_ROOT = os.environ.get("CALENDAR_API_ROOT", DEFAULT_API_ROOT)
+if not CALENDAR_API_ROOT.endswith("/"):
+    CALENDAR_API_ROOT += "/"
+
+
+def _uses_default_endpoint():
+    return CALENDAR_API_ROOT == DEFAULT_API_ROOT
+
+
+@functools.lru_cache(maxsize=None)
+def _discovery_document():
+    """
+    Returns the bundled Calendar discovery document with every URL (including
+    the batch endpoint) rewritten to CALENDAR_API_ROOT.
+    """
+    document = json.loads(discovery_cache.get_static_doc("calendar", "v3"))
+    document["rootUrl"] = CALENDAR_API_ROOT
+    document["baseUrl"] = CALENDAR_API_ROOT + document["servicePath"]
+    return json.dumps(document)
 
-def get_calendar_service():
-    """Shows basic usage of the Google Calendar API.
-    Prints the start and name of the next 10 events on the user's calendar.
-    """
-    creds = None
-    # The file token.json stores the user's access and refresh tokens, and is
-    # created automatically when the authorization flow completes for the first
-    # time.
-    if os.path.exists("token.json"):
-        creds = Credentials.from_authorized_user_file("token.json", SCOPES)
-    # If there are no (valid) credentials available, let the user log in.
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            # IMPORTANT: The user must provide their own 'credentials.json' file
-            # from the Google Cloud Console.
-            flow = InstalledAppFlow.from_client_secrets_file(
-                "credentials.json", SCOPES
-            )
-            # This is the correct, manual flow for a command-line environment.
-            # 1. Generate the authorization URL.
-            # The redirect_uri must be set to 'urn:ietf:wg:oauth:2.0:oob' for the
-            # manual, 'out-of-band' (OOB) flow. This must also be an authorized
-            # redirect URI in your Google Cloud Console project.
-            flow.redirect_uri = 'urn:ietf:wg:oauth:2.0:oob'
-            auth_url, _ = flow.authorization_url(prompt="consent")
-
-            print("Please go to this URL to authorize access:")
-            print(auth_url)
-
-            # 2. Have the user enter the authorization code.
-            code = input("Enter the authorization code: ")
-
-            # 3. Exchange the code for credentials.
-            flow.fetch_token(code=code)
-            creds = flow.credentials
-        # Save the credentials for the next run
-        with open("token.json", "w") as token:
-            token.write(creds.to_json())
 
+def _build_service(creds):
+    if _uses_default_endpoint():
+        return build(
+            "calendar", "v3",
+            credentials=creds,
+            cache_discovery=False,
+            static_discovery=True,
+        )
+    return build_from_document(_discovery_document(), credentials=creds)
+
+
+def _run_authorization_flow():
+    """
+    Runs the manual, out-of-band OAuth flow and returns fresh credentials.
+    """
+    # IMPORTANT: The user must provide their own 'credentials.json' file
+    # from the Google Cloud Console.
+    flow = InstalledAppFlow.from_client_secrets_file(
+        "credentials.json", SCOPES
+    )
+    # This is the correct, manual flow for a command-line environment.
+    # 1. Generate the authorization URL.
+    # The redirect_uri must be set to 'urn:ietf:wg:oauth:2.0:oob' for the
+    # manual, 'out-of-band' (OOB) flow. This must also be an authorized
+    # redirect URI in your Google Cloud Console project.
+    flow.redirect_uri = 'urn:ietf:wg:oauth:2.0:oob'
+    auth_url, _ = flow.authorization_url(prompt="consent")
+
+    print("Please go to this URL to authorize access:")
+    print(auth_url)
+
+    # 2. Have the user enter the authorization code.
+    code = input("Enter the authorization code: ")
+
+    # 3. Exchange the code for credentials.
+    flow.fetch_token(code=code)
+    return flow.credentials
+
+
+def _token_file_version(token_file):
+    """Returns a cheap fingerprint of the token file, or None if it is missing."""
     try:
-        service = build("calendar", "v3", credentials=creds)
+        stat = os.stat(token_file)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class CalendarServiceManager:
+    """
+    Keeps built Calendar API service objects per credential (token file).
+
+    Credentials are read from disk once and only re-read when the token file
+    changes, and access tokens are refreshed shortly before they expire.
+    httplib2 connections are not thread-safe, so every Flask worker thread
+    gets its own service object built on the shared credentials. Services are
+    built from the discovery document bundled with google-api-python-client,
+    so even a cold build needs no network round trip.
+    """
+
+    def __init__(self, refresh_margin=TOKEN_REFRESH_MARGIN):
+        self.refresh_margin = refresh_margin
+        self._lock = threading.Lock()
+        self._credentials = {}  # token_file -> {"version", "generation", "creds"}
+        self._generation = 0
+        self._local = threading.local()
+
+    def _needs_refresh(self, creds):
+        if not creds.valid:
+            return True
+        # creds.expiry is a naive UTC datetime
+        if creds.expiry is None:
+            return False
+        return creds.expiry - datetime.datetime.utcnow() < self.refresh_margin
+
+    def get_credentials(self, token_file=TOKEN_FILE):
+        """
+        Returns (credentials, generation) for the given token file, loading,
+        refreshing or re-authorizing them as needed.
+        """
+        with self._lock:
+            version = _token_file_version(token_file)
+            entry = self._credentials.get(token_file)
+
+            if entry is None or entry["version"] != version:
+                creds = None
+                if version is not None:
+                    creds = Credentials.from_authorized_user_file(token_file, SCOPES)
+                self._generation += 1
+                entry = {"version": version, "generation": self._generation, "creds": creds}
+                self._credentials[token_file] = entry
+
+            creds = entry["creds"]
+            if creds is None and not _uses_default_endpoint():
+                # A local stand-in API does not check tokens
+                creds = entry["creds"] = AnonymousCredentials()
+            if creds and not self._needs_refresh(creds):
+                return creds, entry["generation"]
+
+            # If there are no (valid) credentials available, let the user log in.
+            if creds and creds.refresh_token:
+                creds.refresh(Request())
+            else:
+                creds = _run_authorization_flow()
+                self._generation += 1
+                entry["generation"] = self._generation
+                entry["creds"] = creds
+
+            # Save the credentials for the next run
+            with open(token_file, "w") as token:
+                token.write(creds.to_json())
+            entry["version"] = _token_file_version(token_file)
+            return creds, entry["generation"]
+
+    def get_service(self, token_file=TOKEN_FILE):
+        """
+        Returns this thread's Calendar service for the given token file,
+        building it only when the credentials behind it have changed.
+        """
+        creds, generation = self.get_credentials(token_file)
+
+        services = getattr(self._local, "services", None)
+        if services is None:
+            services = self._local.services = {}
+
+        cached_service = services.get(token_file)
+        if cached_service and cached_service[0] == generation:
+            return cached_service[1]
+
+        service = _build_service(creds)
+        services[token_file] = (generation, service)
         return service
+
+    def invalidate(self, token_file=None):
+        """
+        Forgets cached credentials (for one token file, or all of them) so the
+        next call reloads them and rebuilds every thread's service.
+        """
+        with self._lock:
+            if token_file is None:
+                self._credentials.clear()
+            else:
+                self._credentials.pop(token_file, None)
+
+
+_service_manager = CalendarServiceManager()
+
+
+def get_calendar_service():
+    """
+    Returns a ready-to-use Calendar API service for the current thread.
+    """
+    try:
+        return _service_manager.get_service()
     except HttpError as error:
         print(f"An error occurred: {error}")
         return None
 
 
-def get_primary_calendar_timezone(service):
-    """Fetch the time zone of the primary calendar."""
+def get_credentials():
+    """
+    Returns valid (refreshed if needed) credentials for the calendar account,
+    for callers that talk to the API without a service object.
+    """
+    creds, _ = _service_manager.get_credentials()
+    return creds
+
+
+def invalidate_calendar_service():
+    """
+    Drops cached credentials, services, calendar metadata and stored events,
+    e.g. after token.json is rewritten for a different account.
+    """
+    _service_manager.invalidate()
+    invalidate_calendar_metadata()
+    event_store.get_event_store().reset()
+
+
+# Client-side quota, in queries per second. The defaults stay under Google's
+# standard per-user limit (600 queries/minute) with room for bursts, and under
+# the share of the project quota one app instance should use.
+CALENDAR_USER_QPS = float(os.environ.get("CALENDAR_USER_QPS", "8"))
+CALENDAR_PROJECT_QPS = float(os.environ.get("CALENDAR_PROJECT_QPS", "40"))
+CALENDAR_MAX_RETRIES = int(os.environ.get("CALENDAR_MAX_RETRIES", "5"))
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+
+
+def is_retryable_response(status, content):
+    """
+    True for responses worth retrying: rate limits and transient server errors.
+
+    Args:
+        status: HTTP status code
+        content: Response body (bytes), used to tell a 403 rate limit apart
+                 from a 403 permission error
+    """
+    if status in RETRYABLE_STATUSES:
+        return True
+    if status == 403:
+        try:
+            details = json.loads(content.decode("utf-8"))
+            reasons = {e.get("reason") for e in details["error"].get("errors", [])}
+        except (ValueError, KeyError, AttributeError):
+            return False
+        return bool(reasons & RATE_LIMIT_REASONS)
+    return False
+
+
+def _is_retryable_error(error):
+    """True if an HttpError is a rate limit or transient server error."""
+    return is_retryable_response(error.resp.status, error.content)
+
+
+_project_limiter = rate_limiter.TokenBucket(CALENDAR_PROJECT_QPS)
+_user_limiters = {}  # token file -> TokenBucket
+_user_limiters_lock = threading.Lock()
+call_stats = rate_limiter.CallStats()
+
+
+def acquire_quota(calls=1, token_file=TOKEN_FILE):
+    """
+    Waits until both the per-user and the project quota allow `calls` more
+    calls. Used by every Calendar API call, sync or async.
+    """
+    with _user_limiters_lock:
+        user_limiter = _user_limiters.get(token_file)
+        if user_limiter is None:
+            user_limiter = _user_limiters[token_file] = rate_limiter.TokenBucket(CALENDAR_USER_QPS)
+
+    waited = user_limiter.acquire(calls) + _project_limiter.acquire(calls)
+    call_stats.increment("calls", calls)
+    if waited:
+        call_stats.increment("throttled")
+        call_stats.increment("throttle_wait_seconds", waited)
+
+
+def _retry_after(error):
+    """Returns the Retry-After of an HttpError in seconds, if it sent one."""
+    return rate_limiter.parse_retry_after(error.resp.get("retry-after"))
+
+
+def new_event_id():
+    """
+    Returns a fresh event ID to send with an insert. Google accepts client
+    IDs of 5-1024 base32hex characters (a-v, 0-9); a hex UUID is 32 of them.
+    Because a retried insert carries the same ID, an attempt that committed
+    before its response was lost makes the retry fail with 409 instead of
+    creating the event twice.
+    """
+    return uuid.uuid4().hex
+
+
+def execute_request(request, on_conflict=None):
+    """
+    Executes a Calendar API request under the client-side rate limiter,
+    retrying rate-limit and 5xx errors with exponential backoff and jitter
+    (honouring Retry-After). Other errors, and the last failed attempt, are
+    raised as HttpError.
+
+    Args:
+        request: The googleapiclient request to execute
+        on_conflict: For inserts with a client-supplied ID, called with no
+                     arguments when a retry gets 409, meaning an earlier
+                     attempt already created the resource; its return value
+                     is returned as the result
+    """
+    for attempt in range(CALENDAR_MAX_RETRIES + 1):
+        acquire_quota()
+        try:
+            return request.execute()
+        except HttpError as error:
+            call_stats.record_error(error.resp.status)
+            if attempt and on_conflict and error.resp.status == 409:
+                print("Calendar API returned 409 on retry; the earlier attempt succeeded")
+                return on_conflict()
+            if attempt == CALENDAR_MAX_RETRIES or not _is_retryable_error(error):
+                call_stats.increment("failures")
+                raise
+            delay = rate_limiter.backoff_delay(attempt, retry_after=_retry_after(error))
+            call_stats.increment("retries")
+            print(f"Calendar API returned {error.resp.status}, retrying in {delay:.1f}s...")
+            time.sleep(delay)
+
+
+def get_call_stats():
+    """Returns counters of Calendar API calls, retries and throttling."""
+    return call_stats.snapshot()
+
+
+# How long calendar metadata (time zone, access role) is trusted before it is
+# fetched again. Call invalidate_calendar_metadata() to drop it sooner.
+CALENDAR_METADATA_TTL = datetime.timedelta(hours=12)
+
+CALENDAR_METADATA_FIELDS = "id,summary,timeZone,accessRole"
+
+_metadata_lock = threading.Lock()
+_calendar_metadata = {}  # calendar id -> (fetched_at, metadata)
+_metadata_flight = SingleFlight()
+
+
+@functools.lru_cache(maxsize=None)
+def resolve_timezone(timezone_str):
+    """Resolves an IANA time zone name to a pytz time zone, once per name."""
     try:
-        calendar = service.calendars().get(calendarId="primary").execute()
-        return calendar.get("timeZone", "UTC")
-    except HttpError as error:
-        print(f"Error fetching time zone: {error}")
-        return "UTC"
+        return pytz.timezone(timezone_str)
+    except pytz.UnknownTimeZoneError:
+        print(f"Unknown time zone {timezone_str!r}, falling back to UTC")
+        return pytz.utc
 
 
-def get_events_in_range(days_in_future=30):
+def get_calendar_metadata(service=None, calendar_id="primary"):
     """
-    Fetches all events within a given future range from today.
+    Returns cached metadata for a calendar, fetching it on the first call.
+
+    Returns:
+        Dict with "id", "summary", "timeZone", "accessRole" and "tzinfo"
+        (the resolved pytz time zone).
+    """
+    metadata = peek_calendar_metadata(calendar_id)
+    if metadata:
+        return metadata
+    # Concurrent misses (e.g. a burst of requests after a restart) share one fetch
+    return _metadata_flight.do(calendar_id, lambda: _fetch_calendar_metadata(service, calendar_id))
+
+
+def _fetch_calendar_metadata(service, calendar_id):
+    metadata = peek_calendar_metadata(calendar_id)
+    if metadata:
+        return metadata
+
+    service = service or get_calendar_service()
+    try:
+        if not service:
+            raise ValueError("Calendar service unavailable")
+        calendar = execute_request(
+            service.calendarList().get(
+                calendarId=calendar_id, fields=CALENDAR_METADATA_FIELDS
+            )
+        )
+    except (HttpError, ValueError) as error:
+        print(f"Error fetching calendar metadata: {error}")
+        # Don't cache the fallback, so the next call tries again
+        return {
+            "id": calendar_id,
+            "summary": None,
+            "timeZone": "UTC",
+            "accessRole": None,
+            "tzinfo": pytz.utc,
+        }
+
+    return remember_calendar_metadata(calendar_id, calendar)
+
+
+def peek_calendar_metadata(calendar_id="primary"):
+    """Returns cached metadata for a calendar if it is still fresh, else None."""
+    with _metadata_lock:
+        cached_entry = _calendar_metadata.get(calendar_id)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    if cached_entry and now - cached_entry[0] < CALENDAR_METADATA_TTL:
+        return cached_entry[1]
+    return None
+
+
+def remember_calendar_metadata(calendar_id, calendar):
+    """
+    Caches a calendarList entry fetched elsewhere (e.g. by the async client)
+    and returns it as metadata.
+    """
+    timezone_str = calendar.get("timeZone", "UTC")
+    metadata = {
+        "id": calendar.get("id", calendar_id),
+        "summary": calendar.get("summary"),
+        "timeZone": timezone_str,
+        "accessRole": calendar.get("accessRole"),
+        "tzinfo": resolve_timezone(timezone_str),
+    }
+    with _metadata_lock:
+        _calendar_metadata[calendar_id] = (datetime.datetime.now(datetime.timezone.utc), metadata)
+    return metadata
+
+
+def invalidate_calendar_metadata(calendar_id=None):
+    """Drops cached metadata for one calendar, or for all of them."""
+    with _metadata_lock:
+        if calendar_id is None:
+            _calendar_metadata.clear()
+        else:
+            _calendar_metadata.pop(calendar_id, None)
+
+
+def get_primary_calendar_timezone(service=None):
+    """Returns the (cached) time zone name of the primary calendar."""
+    return get_calendar_metadata(service)["timeZone"]
+
+
+# Events requested per page; 2500 is the maximum the API allows.
+EVENTS_PAGE_SIZE = 2500
+
+# Field masks for events().list, one per caller, so that we never download
+# attendee, conference or reminder payloads the app doesn't read.
+CALENDAR_VIEW_EVENT_FIELDS = "id,summary,start,end"
+PLANNER_EVENT_FIELDS = "id,summary,start,end"
+DELETE_SEARCH_EVENT_FIELDS = "id,summary,description,start,end"
+TASK_LIST_EVENT_FIELDS = "id,summary,start,end"
+
+
+def merge_field_masks(*masks):
+    """Combines comma-separated field masks, keeping the first-seen order."""
+    fields = []
+    for mask in masks:
+        for field in mask.split(","):
+            if field and field not in fields:
+                fields.append(field)
+    return ",".join(fields)
+
+
+# The sync store serves all of the callers above, plus it needs the status
+# to spot cancellations and the etag for conditional writes.
+SYNC_EVENT_FIELDS = merge_field_masks(
+    "status,etag,recurrence,recurringEventId,originalStartTime",
+    CALENDAR_VIEW_EVENT_FIELDS,
+    PLANNER_EVENT_FIELDS,
+    DELETE_SEARCH_EVENT_FIELDS,
+)
+
+
+def iter_event_pages(service, calendar_id="primary", fields=None,
+                     page_size=EVENTS_PAGE_SIZE, **params):
+    """
+    Yields every page of an events().list call, following nextPageToken.
+
+    Args:
+        service: Calendar API service
+        calendar_id: Calendar to list
+        fields: Comma-separated event fields to return (e.g. "id,summary,start,end").
+                Page tokens and the sync token are always requested.
+        page_size: maxResults per page
+        **params: Any other events().list parameters (timeMin, syncToken, ...)
+    """
+    if fields:
+        params["fields"] = f"nextPageToken,nextSyncToken,items({fields})"
+
+    page_token = None
+    while True:
+        page = execute_request(
+            service.events().list(
+                calendarId=calendar_id,
+                maxResults=page_size,
+                pageToken=page_token,
+                **params,
+            )
+        )
+        yield page
+        page_token = page.get("nextPageToken")
+        if not page_token:
+            return
+
+
+def iter_events(time_min, time_max, fields=None, calendar_id="primary", **params):
+    """
+    Streams events between two ISO timestamps, one page at a time, so callers
+    never need to hold the whole result set in memory.
+
+    Raises:
+        HttpError: If a page can't be fetched (after retries). Pages already
+                   yielded are not a complete result, so callers must not
+                   use them as one.
     """
     service = get_calendar_service()
     if not service:
-        return []
+        return
 
+    try:
+        for page in iter_event_pages(
+            service,
+            calendar_id=calendar_id,
+            fields=fields,
+            timeMin=time_min,
+            timeMax=time_max,
+            singleEvents=True,
+            orderBy="startTime",
+            **params,
+        ):
+            yield from page.get("items", [])
+    except HttpError as error:
+        print(f"An error occurred while fetching events: {error}")
+        raise
+
+
+def get_events_in_range(days_in_future=30, fields=None):
+    """
+    Fetches all events within a given future range from today.
+
+    Raises:
+        HttpError: If the events could not all be fetched
+    """
     now = datetime.datetime.utcnow()
     time_min = now.isoformat() + "Z"
     time_max = (now + datetime.timedelta(days=days_in_future)).isoformat() + "Z"
 
+    return list(iter_events(time_min, time_max, fields=fields))
+
+
+# Default look-ahead window of the local event store.
+SYNC_WINDOW_DAYS = 90
+
+# Extra days fetched past the requested window on a full sync, so that the
+# window sliding forward day by day doesn't force a full resync every day.
+SYNC_HORIZON_SLACK = datetime.timedelta(days=7)
+
+# Sync recurring events as one master event plus exceptions and expand their
+# occurrences locally, instead of downloading every instance
+# (singleEvents=True). Set CALENDAR_EXPAND_RECURRENCE=false to turn it off.
+EXPAND_RECURRENCE_LOCALLY = os.environ.get("CALENDAR_EXPAND_RECURRENCE", "true").lower() != "false"
+
+# How far back a full sync starts, so the store also covers today's earlier
+# events (for the task list).
+SYNC_LOOKBACK = datetime.timedelta(days=1)
+
+
+def _event_bounds(event):
+    """
+    Returns (start, end) of a Google event as timezone-aware datetimes, or
+    None if the event has no usable times.
+    """
+    start = event.get("start", {}).get("dateTime") or event.get("start", {}).get("date")
+    end = event.get("end", {}).get("dateTime") or event.get("end", {}).get("date")
+    if not start or not end:
+        return None
     try:
-        events_result = (
-            service.events()
-            .list(
-                calendarId="primary",
-                timeMin=time_min,
-                timeMax=time_max,
-                singleEvents=True,
-                orderBy="startTime",
+        # Python 3.10's fromisoformat doesn't accept the "Z" Google uses for UTC
+        start_dt = datetime.datetime.fromisoformat(start.replace("Z", "+00:00"))
+        end_dt = datetime.datetime.fromisoformat(end.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    # All-day events only carry a date; treat them as local midnight
+    if start_dt.tzinfo is None:
+        start_dt = start_dt.astimezone()
+    if end_dt.tzinfo is None:
+        end_dt = end_dt.astimezone()
+    return start_dt, end_dt
+
+
+_write_listeners = []
+
+
+def add_write_listener(listener):
+    """
+    Registers a callback for the writes this app makes, so caches built on
+    top of the sync store can be patched in place instead of refetched.
+    It is called as listener(calendar_id, event_id, event) after an event is
+    created or updated, and with event=None after it is deleted.
+    """
+    _write_listeners.append(listener)
+
+
+def _notify_write(calendar_id, event_id, event):
+    for listener in _write_listeners:
+        try:
+            listener(calendar_id, event_id, event)
+        except Exception as error:
+            print(f"Error applying write of event {event_id}: {error}")
+
+
+class CalendarSyncEngine:
+    """
+    Keeps one calendar's events in the persistent event store (see
+    event_store.py) and refreshes them incrementally.
+
+    The first sync downloads the whole window and saves Google's
+    nextSyncToken. Every later sync sends that token and only receives the
+    events created, updated or cancelled since, which are applied to the
+    store. If Google expires the token (HTTP 410) the store is rebuilt with a
+    full sync. The token lives in the store too, so other workers and later
+    restarts continue from it.
+
+    With `expand_recurrence`, recurring events are synced as their master
+    event plus exceptions, and occurrences are expanded locally (see
+    recurrence.py) for whatever window is read.
+    """
+
+    def __init__(self, calendar_id="primary", store=None, expand_recurrence=EXPAND_RECURRENCE_LOCALLY):
+        self.calendar_id = calendar_id
+        self.store = store or event_store.get_event_store()
+        self.expand_recurrence = expand_recurrence
+        # Held while syncing, by this engine and by async_calendar_client
+        self.lock = threading.Lock()
+
+    @property
+    def last_synced(self):
+        state = self.store.get_sync_state(self.calendar_id)
+        return state["last_synced"] if state else None
+
+    def sync(self, days_in_future=SYNC_WINDOW_DAYS):
+        """
+        Brings the store up to date. Returns True on success.
+        """
+        service = get_calendar_service()
+        if not service:
+            return False
+
+        with self.lock:
+            plan = self.plan_sync(days_in_future)
+            if plan["sync_token"]:
+                try:
+                    self.apply_pages(plan, self._pages(service, plan))
+                    return True
+                except HttpError as error:
+                    if error.resp.status != 410:
+                        print(f"An error occurred while syncing events: {error}")
+                        return False
+                    print("Sync token expired, running a full resync...")
+                plan = self.plan_sync(days_in_future, full=True)
+
+            try:
+                self.apply_pages(plan, self._pages(service, plan))
+                return True
+            except HttpError as error:
+                print(f"An error occurred while syncing events: {error}")
+                return False
+
+    def plan_sync(self, days_in_future=SYNC_WINDOW_DAYS, full=False):
+        """
+        Decides how the next sync runs: incrementally from the stored sync
+        token if it still covers the window, else as a full sync.
+
+        Returns:
+            Dict with "sync_token" (None for a full sync) and, for a full
+            sync, the "time_min" and "time_max" to download
+        """
+        now = datetime.datetime.now(datetime.timezone.utc)
+        window_end = now + datetime.timedelta(days=days_in_future)
+        state = self.store.get_sync_state(self.calendar_id)
+        if (
+            not full and state and state["sync_token"] and state["horizon"]
+            and window_end <= state["horizon"]
+            and state["expands_recurrence"] == self.expand_recurrence
+        ):
+            return {"sync_token": state["sync_token"], "time_min": None, "time_max": None}
+        return {
+            "sync_token": None,
+            "time_min": now - SYNC_LOOKBACK,
+            "time_max": window_end + SYNC_HORIZON_SLACK,
+        }
+
+    def list_params(self, plan):
+        """Returns the events.list parameters (besides paging and fields) of a sync plan."""
+        params = {"singleEvents": not self.expand_recurrence}
+        if plan["sync_token"]:
+            params["syncToken"] = plan["sync_token"]
+        else:
+            params["timeMin"] = plan["time_min"].isoformat()
+            params["timeMax"] = plan["time_max"].isoformat()
+        return params
+
+    def _pages(self, service, plan):
+        return iter_event_pages(
+            service, calendar_id=self.calendar_id, fields=SYNC_EVENT_FIELDS, **self.list_params(plan)
+        )
+
+    def apply_pages(self, plan, pages):
+        """
+        Writes the events.list pages of a sync plan to the store: a full
+        sync replaces the calendar, an incremental one applies the changes
+        and advances the sync token. Nothing is written if reading the pages
+        fails.
+        """
+        changes = {"entries": [], "masters": [], "cancelled": [], "deleted": []}
+        sync_token = plan["sync_token"]
+        for page in pages:
+            for event in page.get("items", []):
+                self._collect(changes, event)
+            sync_token = page.get("nextSyncToken", sync_token)
+        synced_at = datetime.datetime.now(datetime.timezone.utc)
+
+        if plan["sync_token"] is None:
+            self.store.replace_calendar(
+                self.calendar_id, changes["entries"], sync_token, plan["time_min"], plan["time_max"],
+                synced_at,
+                masters=changes["masters"],
+                cancelled=changes["cancelled"],
+                expands_recurrence=self.expand_recurrence,
+            )
+            print(
+                f"Full calendar sync of {self.calendar_id}: {len(changes['entries'])} events"
+                + (f", {len(changes['masters'])} recurring series" if changes["masters"] else "")
             )
-            .execute()
+            return
+
+        self.store.apply_changes(
+            self.calendar_id, changes["entries"], changes["deleted"], sync_token, synced_at,
+            masters=changes["masters"],
+            cancelled=changes["cancelled"],
+        )
+        changed = len(changes["entries"]) + len(changes["masters"]) + len(changes["deleted"])
+        if changed:
+            print(f"Incremental calendar sync of {self.calendar_id}: {changed} changed events")
+
+    def _collect(self, changes, event):
+        """Sorts one synced event into the store changes it implies."""
+        if event.get("status") == "cancelled":
+            changes["deleted"].append(event.get("id"))
+            # A cancelled occurrence of a recurring series
+            if self.expand_recurrence and event.get("recurringEventId") and event.get("originalStartTime"):
+                changes["cancelled"].append((
+                    event["recurringEventId"],
+                    recurrence.original_start_epoch(event["originalStartTime"]),
+                ))
+            return
+
+        if event.get("recurrence"):
+            event["calendarId"] = self.calendar_id
+            series = recurrence.get_series(self.calendar_id, event)
+            bounds = _event_bounds(event)
+            if series and bounds:
+                changes["masters"].append((bounds[0], series.last_end(), event))
+            return
+
+        entry = self._entry(event)
+        if entry:
+            changes["entries"].append(entry)
+
+    def _entry(self, event):
+        """Returns the (start, end, event) store entry for an event, or None."""
+        bounds = _event_bounds(event)
+        if not bounds:
+            return None
+        # Record which calendar the event came from
+        event["calendarId"] = self.calendar_id
+        return (bounds[0], bounds[1], event)
+
+    def events_in_range(self, time_min, time_max):
+        """
+        Returns stored events overlapping [time_min, time_max) as Event
+        objects ordered by start, with recurring series expanded into
+        occurrences.
+        """
+        events = self.store.events_in_range(self.calendar_id, time_min, time_max)
+        masters = self.store.masters_in_range(self.calendar_id, time_min, time_max)
+        if not masters:
+            return events
+
+        overridden = self.store.overridden_starts(
+            self.calendar_id, [master["id"] for master in masters]
         )
-        return events_result.get("items", [])
+        for master in masters:
+            series = recurrence.get_series(self.calendar_id, master)
+            if not series:
+                continue
+            for _, _, instance in series.entries_in_range(time_min, time_max, overridden[master["id"]]):
+                events.append(Event.from_google(instance, self.calendar_id))
+        events.sort(key=lambda event: event.start)
+        return events
+
+    def contains(self, event_id):
+        return self.store.contains(self.calendar_id, event_id)
+
+    def is_fresh(self, max_age, time_min=None, time_max=None):
+        """
+        True if the store synced within `max_age` and its window covers
+        [time_min, time_max).
+        """
+        state = self.store.get_sync_state(self.calendar_id)
+        if not state or not state["last_synced"] or not state["horizon"]:
+            return False
+        now = datetime.datetime.now(datetime.timezone.utc)
+        if now - state["last_synced"] > max_age:
+            return False
+        if time_min is not None and time_min < state["window_start"]:
+            return False
+        if time_max is not None and time_max > state["horizon"]:
+            return False
+        return True
+
+    def get_etag(self, event_id):
+        """Returns the stored etag of an event, or None if it isn't stored."""
+        event = self.store.get_event(self.calendar_id, event_id)
+        return event.get("etag") if event else None
+
+    def upsert(self, event):
+        """Stores a single event we just wrote or fetched."""
+        changes = {"entries": [], "masters": [], "cancelled": [], "deleted": []}
+        self._collect(changes, event)
+        if changes["entries"] or changes["masters"]:
+            self.store.upsert(self.calendar_id, changes["entries"], changes["masters"])
+            _notify_write(self.calendar_id, event.get("id"), event)
+
+    def discard(self, event_id):
+        """Drops an event from the store (e.g. right after we delete it)."""
+        self.store.delete(self.calendar_id, event_id)
+        _notify_write(self.calendar_id, event_id, None)
+
+    def reset(self):
+        """Forgets the store and sync token, forcing a full sync next time."""
+        self.store.reset(self.calendar_id)
+
+
+# Calendars whose events count for planning and conflict checks, as a
+# comma-separated list of calendar IDs. When unset, "primary" plus every
+# calendar the user has selected (shown) in Google Calendar is used.
+CALENDAR_IDS = [
+    calendar_id.strip()
+    for calendar_id in os.environ.get("CALENDAR_IDS", "").split(",")
+    if calendar_id.strip()
+]
+
+# Threads used to fetch several calendars at the same time
+CALENDAR_FETCH_WORKERS = 8
+
+CALENDAR_LIST_FIELDS = "nextPageToken,items(id,summary,primary,selected,accessRole,timeZone)"
+
+_sync_engines = {}  # calendar id -> CalendarSyncEngine
+_sync_engines_lock = threading.Lock()
+_fetch_pool = concurrent.futures.ThreadPoolExecutor(
+    max_workers=CALENDAR_FETCH_WORKERS, thread_name_prefix="calendar-fetch"
+)
+_calendar_list_lock = threading.Lock()
+_calendar_list = None  # (fetched_at, calendars)
+# Concurrent fetches of the same thing share one upstream call
+_calendar_list_flight = SingleFlight()
+_sync_flight = SingleFlight()
+
+
+def get_sync_engine(calendar_id):
+    """Returns the process-wide CalendarSyncEngine of a calendar."""
+    with _sync_engines_lock:
+        engine = _sync_engines.get(calendar_id)
+        if engine is None:
+            engine = _sync_engines[calendar_id] = CalendarSyncEngine(calendar_id)
+        return engine
+
+
+def list_calendars():
+    """
+    Returns the user's calendarList entries (id, summary, primary, selected,
+    accessRole, timeZone), cached like the calendar metadata.
+    """
+    now = datetime.datetime.now(datetime.timezone.utc)
+    with _calendar_list_lock:
+        if _calendar_list and now - _calendar_list[0] < CALENDAR_METADATA_TTL:
+            return _calendar_list[1]
+    return _calendar_list_flight.do("calendarList", _fetch_calendar_list)
+
+
+def _fetch_calendar_list():
+    global _calendar_list
+    now = datetime.datetime.now(datetime.timezone.utc)
+    with _calendar_list_lock:
+        if _calendar_list and now - _calendar_list[0] < CALENDAR_METADATA_TTL:
+            return _calendar_list[1]
+
+    service = get_calendar_service()
+    if not service:
+        return []
+
+    calendars = []
+    page_token = None
+    try:
+        while True:
+            page = execute_request(
+                service.calendarList().list(pageToken=page_token, fields=CALENDAR_LIST_FIELDS)
+            )
+            calendars.extend(page.get("items", []))
+            page_token = page.get("nextPageToken")
+            if not page_token:
+                break
     except HttpError as error:
-        print(f"An error occurred while fetching events: {error}")
+        print(f"An error occurred while listing calendars: {error}")
+        return []
+
+    with _calendar_list_lock:
+        _calendar_list = (now, calendars)
+    return calendars
+
+
+def get_selected_calendar_ids():
+    """Returns the IDs of the calendars included in planning and conflict checks."""
+    if CALENDAR_IDS:
+        return CALENDAR_IDS
+    return ["primary"] + [
+        calendar["id"]
+        for calendar in list_calendars()
+        if calendar.get("selected") and not calendar.get("primary")
+    ]
+
+
+def _sync_calendars(calendar_ids, days_in_future):
+    """
+    Syncs several calendars in parallel and returns their engines. A caller
+    asking for a calendar that is already being synced for the same window
+    waits for that sync instead of starting another.
+    """
+    engines = [get_sync_engine(calendar_id) for calendar_id in calendar_ids]
+
+    def sync(engine):
+        return _sync_flight.do(
+            (engine.calendar_id, days_in_future), lambda: engine.sync(days_in_future)
+        )
+
+    if len(engines) == 1:
+        sync(engines[0])
+    else:
+        list(_fetch_pool.map(sync, engines))
+    return engines
+
+
+def iter_merged_events(engines, time_min, time_max):
+    """
+    Yields the events of several calendars as one time-ordered stream, by
+    k-way merging each calendar's already-sorted events.
+    """
+    streams = [engine.events_in_range(time_min, time_max) for engine in engines]
+    yield from heapq.merge(*streams, key=lambda event: event.start)
+
+
+def find_event_calendar(event_id):
+    """Returns the ID of the synced calendar holding an event, or "primary"."""
+    return event_store.get_event_store().find_calendar(event_id) or "primary"
+
+
+def sync_events(days_in_future=SYNC_WINDOW_DAYS, calendar_ids=None):
+    """
+    Returns events (Event objects) from now until `days_in_future` days
+    ahead across all selected calendars, refreshing the local event stores
+    with only the changes since the last sync. Each event's calendar_id says
+    where it came from.
+    """
+    engines = _sync_calendars(calendar_ids or get_selected_calendar_ids(), days_in_future)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return list(iter_merged_events(engines, now, now + datetime.timedelta(days=days_in_future)))
+
+
+# The sync store is trusted for conflict checks if it synced this recently;
+# otherwise conflicts are checked with a FreeBusy query.
+CONFLICT_STORE_MAX_AGE = datetime.timedelta(minutes=2)
+
+# Longest span a single FreeBusy query may cover; the API rejects longer
+# ones with timeRangeTooLong
+FREEBUSY_MAX_SPAN = datetime.timedelta(days=60)
+
+
+class FreeBusyError(Exception):
+    """Raised when busy time for a calendar could not be determined."""
+
+
+def freebusy_spans(ranges):
+    """
+    Groups time ranges into as few spans of at most FREEBUSY_MAX_SPAN as
+    possible, skipping the gaps between groups. A range longer than the
+    limit is cut into several spans.
+    """
+    spans = []
+    for start, end in sorted(ranges):
+        if spans and end - spans[-1][0] <= FREEBUSY_MAX_SPAN:
+            spans[-1][1] = max(spans[-1][1], end)
+            continue
+        while end - start > FREEBUSY_MAX_SPAN:
+            spans.append([start, start + FREEBUSY_MAX_SPAN])
+            start += FREEBUSY_MAX_SPAN
+        spans.append([start, end])
+    return spans
+
+
+def freebusy_body(span_start, span_end, calendar_ids):
+    """Returns the freebusy().query body for one span of the given calendars."""
+    return {
+        "timeMin": span_start.isoformat(),
+        "timeMax": span_end.isoformat(),
+        "items": [{"id": calendar_id} for calendar_id in calendar_ids],
+    }
+
+
+def busy_events(ranges, responses):
+    """
+    Turns FreeBusy responses into "Busy" Event objects (without an ID) for
+    the blocks overlapping one of the ranges, so they plug into conflict
+    detection.
+
+    Raises:
+        FreeBusyError: If a calendar's busy time could not be read; an
+                       empty answer would make every range look free
+    """
+    busy_blocks = {}
+    for response in responses:
+        for calendar_id, calendar in response.get("calendars", {}).items():
+            errors = calendar.get("errors", [])
+            if errors:
+                reasons = ", ".join(error.get("reason", "unknown") for error in errors)
+                raise FreeBusyError(f"Free/busy error for {calendar_id}: {reasons}")
+            for block in calendar.get("busy", []):
+                # Blocks are clipped to each query's span, so one crossing a
+                # span boundary comes back as two adjacent blocks; an exact
+                # repeat is dropped
+                busy_blocks[(calendar_id, block["start"], block["end"])] = block
+
+    events = []
+    for (calendar_id, _, _), block in busy_blocks.items():
+        block_start = datetime.datetime.fromisoformat(block["start"].replace("Z", "+00:00"))
+        block_end = datetime.datetime.fromisoformat(block["end"].replace("Z", "+00:00"))
+        if any(block_start < end and block_end > start for start, end in ranges):
+            events.append(Event(
+                None, "Busy", int(block_start.timestamp()), int(block_end.timestamp()),
+                calendar_id=calendar_id,
+            ))
+    return events
+
+
+def query_busy_intervals(ranges, calendar_ids=("primary",)):
+    """
+    Asks the FreeBusy endpoint which parts of the given time ranges are busy.
+
+    Nearby ranges share one freebusy().query call, each covering at most
+    FREEBUSY_MAX_SPAN, so a year of recurring occurrences takes a handful of
+    calls. Only busy blocks overlapping one of the ranges are returned (see
+    busy_events). async_calendar_client.query_busy_intervals sends the
+    calls concurrently.
+
+    Args:
+        ranges: List of (start, end) timezone-aware datetimes
+        calendar_ids: Calendars whose busy time counts
+
+    Raises:
+        HttpError: If a query failed
+        FreeBusyError: If the service is unavailable or a calendar's busy
+                       time could not be read
+    """
+    if not ranges:
+        return []
+
+    service = get_calendar_service()
+    if not service:
+        raise FreeBusyError("Calendar service unavailable")
+
+    responses = []
+    for span_start, span_end in freebusy_spans(ranges):
+        body = freebusy_body(span_start, span_end, calendar_ids)
+        try:
+            responses.append(execute_request(service.freebusy().query(body=body)))
+        except HttpError as error:
+            print(f"An error occurred while querying free/busy time: {error}")
+            raise
+    return busy_events(ranges, responses)
+
+
+def conflict_check_plan(ranges):
+    """
+    Works out how to find the existing events near some ranges.
+
+    Returns:
+        Dict with "time_min" and "time_max" bounding the ranges, the
+        selected calendars' sync "engines", the "stale" ones (not synced
+        within CONFLICT_STORE_MAX_AGE or not covering the ranges) and the
+        "days_in_future" a sync bringing them up to date has to cover
+    """
+    time_min = min(start for start, _ in ranges)
+    time_max = max(end for _, end in ranges)
+    engines = [get_sync_engine(calendar_id) for calendar_id in get_selected_calendar_ids()]
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return {
+        "time_min": time_min,
+        "time_max": time_max,
+        "engines": engines,
+        "stale": [
+            engine for engine in engines
+            if not engine.is_fresh(CONFLICT_STORE_MAX_AGE, time_min, time_max)
+        ],
+        "days_in_future": max(SYNC_WINDOW_DAYS, (time_max - now).days + 1),
+    }
+
+
+def get_conflict_candidates(ranges, require_event_details=False):
+    """
+    Returns the existing events (Event objects) that may overlap any of the
+    given ranges, without downloading the whole calendar window.
+
+    If the local sync store is fresh and covers the ranges it answers
+    directly. Otherwise a single FreeBusy query is made, unless the caller
+    needs event IDs and titles (`require_event_details`), in which case the
+    store is brought up to date with an incremental sync instead.
+    async_calendar_client.get_conflict_candidates does the same with the
+    FreeBusy calls or syncs running concurrently.
+
+    Args:
+        ranges: List of (start, end) timezone-aware datetimes
+
+    Raises:
+        HttpError, FreeBusyError: If busy time could not be checked (see
+                                  query_busy_intervals)
+    """
+    if not ranges:
         return []
 
+    plan = conflict_check_plan(ranges)
+    if plan["stale"]:
+        if not require_event_details:
+            return query_busy_intervals(
+                ranges, calendar_ids=[engine.calendar_id for engine in plan["engines"]]
+            )
+        _sync_calendars([engine.calendar_id for engine in plan["stale"]], plan["days_in_future"])
+
+    return list(iter_merged_events(plan["engines"], plan["time_min"], plan["time_max"]))
+
 
 def get_daily_events():
     """
-    Fetches all events for the current day from the user's primary calendar.
+    Fetches all events for the current day from the user's primary calendar,
+    as Event objects.
+
+    Raises:
+        HttpError: If the events could not all be fetched
     """
     service = get_calendar_service()
     if not service:
         return []
 
     # Get the user's time zone
-    timezone_str = get_primary_calendar_timezone(service)
-    user_tz = pytz.timezone(timezone_str)
+    metadata = get_calendar_metadata(service)
+    timezone_str = metadata["timeZone"]
+    user_tz = metadata["tzinfo"]
 
     # Get current time in user's time zone
     now = datetime.datetime.now(user_tz)
@@ -120,30 +1188,39 @@ def get_daily_events():
     time_min = now.replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
     time_max = now.replace(hour=23, minute=59, second=59, microsecond=999999).isoformat()
 
+    # Answer from the event store when it synced recently and covers today
+    day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    day_end = day_start + datetime.timedelta(days=1)
+    engine = get_sync_engine("primary")
+    if engine.is_fresh(CONFLICT_STORE_MAX_AGE, day_start, day_end):
+        return engine.events_in_range(day_start, day_end)
+
     print(f"Getting events for today from {time_min} to {time_max} in {timezone_str}")
 
-    try:
-        events_result = (
-            service.events()
-            .list(
-                calendarId="primary",
-                timeMin=time_min,
-                timeMax=time_max,
-                singleEvents=True,
-                orderBy="startTime",
-            )
-            .execute()
+    events = [
+        event for event in (
+            Event.from_google(raw, "primary")
+            for raw in iter_events(time_min, time_max, fields=TASK_LIST_EVENT_FIELDS)
         )
-        events = events_result.get("items", [])
+        if event
+    ]
+    if not events:
+        print("No upcoming events found for today.")
+    return events
 
-        if not events:
-            print("No upcoming events found for today.")
-            return []
 
-        return events
-    except HttpError as error:
-        print(f"An error occurred: {error}")
-        return []
+def _event_body(summary, start_time, end_time, timezone, recurrence=None):
+    """Builds the request body for inserting an event."""
+    event = {
+        "summary": summary,
+        "start": {"dateTime": start_time, "timeZone": timezone},
+        "end": {"dateTime": end_time, "timeZone": timezone},
+    }
+
+    # Add recurrence rules if provided
+    if recurrence:
+        event["recurrence"] = recurrence
+    return event
 
 
 def create_event(summary, start_time, end_time, timezone="UTC", recurrence=None):
@@ -165,22 +1242,17 @@ def create_event(summary, start_time, end_time, timezone="UTC", recurrence=None)
     # Fetch the actual time zone of the primary calendar
     actual_timezone = get_primary_calendar_timezone(service)
 
-    event = {
-        "summary": summary,
-        "start": {"dateTime": start_time, "timeZone": actual_timezone},
-        "end": {"dateTime": end_time, "timeZone": actual_timezone},
-    }
-    
-    # Add recurrence rules if provided
-    if recurrence:
-        event["recurrence"] = recurrence
+    event = _event_body(summary, start_time, end_time, actual_timezone, recurrence)
+    event["id"] = new_event_id()
 
     try:
-        created_event = (
-            service.events()
-            .insert(calendarId="primary", body=event)
-            .execute()
+        created_event = execute_request(
+            service.events().insert(calendarId="primary", body=event),
+            on_conflict=lambda: execute_request(
+                service.events().get(calendarId="primary", eventId=event["id"])
+            ),
         )
+        get_sync_engine("primary").upsert(created_event)
         if recurrence:
             print(f"Recurring event created: {created_event.get('htmlLink')}")
         else:
@@ -191,9 +1263,15 @@ def create_event(summary, start_time, end_time, timezone="UTC", recurrence=None)
         return None
 
 
-def update_event(event_id, new_start_time, new_end_time):
+def move_event(event_id, new_start_time, new_end_time, calendar_id=None):
     """
-    Updates an existing event with new start and end times.
+    Reschedules an event by PATCHing only its start and end times. The
+    calendar defaults to whichever synced calendar holds the event.
+
+    When the local store knows the event's etag, the patch is sent with
+    If-Match so no read is needed beforehand; if the event changed on the
+    server since (HTTP 412), it is refetched and the patch retried once with
+    the fresh etag.
     """
     service = get_calendar_service()
     if not service:
@@ -202,39 +1280,242 @@ def update_event(event_id, new_start_time, new_end_time):
     # Fetch the actual time zone of the primary calendar
     actual_timezone = get_primary_calendar_timezone(service)
 
+    body = {
+        "start": {"dateTime": new_start_time, "timeZone": actual_timezone},
+        "end": {"dateTime": new_end_time, "timeZone": actual_timezone},
+    }
+    calendar_id = calendar_id or find_event_calendar(event_id)
+    engine = get_sync_engine(calendar_id)
+    etag = engine.get_etag(event_id)
+
     try:
-        # First, get the existing event to preserve other details
-        existing_event = service.events().get(calendarId="primary", eventId=event_id).execute()
-        
-        # Update only the start and end times
-        existing_event['start'] = {"dateTime": new_start_time, "timeZone": actual_timezone}
-        existing_event['end'] = {"dateTime": new_end_time, "timeZone": actual_timezone}
-        
-        # Update the event
-        updated_event = (
-            service.events()
-            .update(calendarId="primary", eventId=event_id, body=existing_event)
-            .execute()
-        )
-        print(f"Event updated: {updated_event.get('htmlLink')}")
-        return updated_event
+        for attempt in range(2):
+            request = service.events().patch(
+                calendarId=calendar_id,
+                eventId=event_id,
+                body=body,
+                fields=SYNC_EVENT_FIELDS,
+            )
+            if etag:
+                request.headers["If-Match"] = etag
+            try:
+                updated_event = execute_request(request)
+            except HttpError as error:
+                if error.resp.status != 412 or attempt:
+                    raise
+                print(f"Event {event_id} changed since last sync, refetching...")
+                current_event = execute_request(
+                    service.events().get(
+                        calendarId=calendar_id, eventId=event_id, fields=SYNC_EVENT_FIELDS
+                    )
+                )
+                engine.upsert(current_event)
+                etag = current_event.get("etag")
+                continue
+
+            engine.upsert(updated_event)
+            print(f"Event updated: {event_id}")
+            return updated_event
     except HttpError as error:
         print(f"An error occurred while updating event: {error}")
         return None
 
 
-def delete_event(event_id):
+def update_event(event_id, new_start_time, new_end_time):
+    """
+    Updates an existing event with new start and end times.
+    """
+    return move_event(event_id, new_start_time, new_end_time)
+
+
+def delete_event(event_id, calendar_id=None):
     """
-    Deletes an event from the user's primary calendar.
+    Deletes an event from the calendar holding it (the primary calendar
+    unless the event was synced from another one).
     """
     service = get_calendar_service()
     if not service:
         return None
 
+    calendar_id = calendar_id or find_event_calendar(event_id)
     try:
-        service.events().delete(calendarId="primary", eventId=event_id).execute()
+        execute_request(service.events().delete(calendarId=calendar_id, eventId=event_id))
+        get_sync_engine(calendar_id).discard(event_id)
         print(f"Event deleted successfully: {event_id}")
         return True
     except HttpError as error:
         print(f"An error occurred while deleting event: {error}")
         return False
+
+
+# The Calendar batch endpoint accepts at most 50 calls per HTTP request.
+BATCH_SIZE = 50
+BATCH_MAX_ATTEMPTS = CALENDAR_MAX_RETRIES + 1
+
+
+def batch_mutate(operations, calendar_id="primary"):
+    """
+    Runs many event mutations through the batch endpoint, up to BATCH_SIZE
+    per HTTP request, retrying only the sub-requests that fail transiently.
+
+    Args:
+        operations: List of (method, kwargs) tuples for service.events(),
+                    e.g. ("insert", {"body": {...}}) or ("delete", {"eventId": "abc"})
+        calendar_id: Calendar the operations apply to, unless an operation's
+                     kwargs carry their own "calendarId"
+
+    Returns:
+        List with one {"ok": bool, "result": dict or None, "error": str or None}
+        per operation, in the same order.
+
+    Inserts should carry a client-supplied "id" in their body (see
+    new_event_id()): a retried insert that gets 409 was created by an
+    earlier attempt, so it counts as done and the event is fetched instead.
+    """
+    results = [{"ok": False, "result": None, "error": "Not attempted"} for _ in operations]
+
+    service = get_calendar_service()
+    if not service:
+        for result in results:
+            result["error"] = "Calendar service unavailable"
+        return results
+
+    pending = list(range(len(operations)))
+    retry_after = None
+    already_created = []
+    for attempt in range(BATCH_MAX_ATTEMPTS):
+        if attempt:
+            delay = rate_limiter.backoff_delay(attempt - 1, retry_after=retry_after)
+            call_stats.increment("retries", len(pending))
+            print(f"Retrying {len(pending)} failed batch operation(s) in {delay:.1f}s...")
+            time.sleep(delay)
+
+        retry = []
+        retry_after = None
+
+        def note_retry_after(error):
+            nonlocal retry_after
+            seconds = _retry_after(error)
+            if seconds is not None:
+                retry_after = max(retry_after or 0.0, seconds)
+
+        def callback(request_id, response, exception):
+            index = int(request_id)
+            method = operations[index][0]
+            if exception is None:
+                results[index] = {"ok": True, "result": response or None, "error": None}
+            elif method == "delete" and isinstance(exception, HttpError) and exception.resp.status == 410:
+                # Already deleted, which is what we wanted
+                results[index] = {"ok": True, "result": None, "error": None}
+            elif (attempt and method == "insert" and isinstance(exception, HttpError)
+                  and exception.resp.status == 409):
+                # An earlier attempt committed before its response was lost
+                results[index] = {"ok": True, "result": None, "error": None}
+                already_created.append(index)
+            else:
+                results[index] = {"ok": False, "result": None, "error": str(exception)}
+                if isinstance(exception, HttpError):
+                    call_stats.record_error(exception.resp.status)
+                    if _is_retryable_error(exception):
+                        retry.append(index)
+                        note_retry_after(exception)
+
+        for chunk_start in range(0, len(pending), BATCH_SIZE):
+            chunk = pending[chunk_start:chunk_start + BATCH_SIZE]
+            batch = service.new_batch_http_request(callback=callback)
+            for index in chunk:
+                method, kwargs = operations[index]
+                kwargs = {"calendarId": calendar_id, **kwargs}
+                request = getattr(service.events(), method)(**kwargs)
+                batch.add(request, request_id=str(index))
+            # Every call inside a batch counts against the quota separately
+            acquire_quota(len(chunk))
+            try:
+                batch.execute()
+            except HttpError as error:
+                # The whole batch request failed; every call in it is retryable
+                # if the outer error is.
+                call_stats.record_error(error.resp.status)
+                for index in chunk:
+                    results[index] = {"ok": False, "result": None, "error": str(error)}
+                    if _is_retryable_error(error):
+                        retry.append(index)
+                if _is_retryable_error(error):
+                    note_retry_after(error)
+
+        pending = sorted(retry)
+        if not pending:
+            break
+
+    for index in already_created:
+        kwargs = {"calendarId": calendar_id, **operations[index][1]}
+        try:
+            results[index]["result"] = execute_request(service.events().get(
+                calendarId=kwargs["calendarId"], eventId=kwargs["body"]["id"]
+            ))
+        except HttpError as error:
+            print(f"Could not fetch event {kwargs['body']['id']} created on an earlier attempt: {error}")
+
+    failures = sum(1 for result in results if not result["ok"])
+    if failures:
+        call_stats.increment("failures", failures)
+    return results
+
+
+def create_events(events):
+    """
+    Creates several events on the primary calendar in as few HTTP round
+    trips as possible.
+
+    Args:
+        events: List of dicts with "summary", "start_time", "end_time" and
+                optionally "recurrence" (list of RRULE strings)
+
+    Returns:
+        One batch_mutate() result per event, in order.
+    """
+    if not events:
+        return []
+
+    actual_timezone = get_primary_calendar_timezone()
+
+    operations = []
+    for event in events:
+        body = _event_body(
+            event["summary"],
+            event["start_time"],
+            event["end_time"],
+            actual_timezone,
+            event.get("recurrence"),
+        )
+        body["id"] = new_event_id()
+        operations.append(("insert", {"body": body}))
+    results = batch_mutate(operations)
+    engine = get_sync_engine("primary")
+    for result in results:
+        if result["ok"] and result["result"]:
+            engine.upsert(result["result"])
+    created = sum(1 for result in results if result["ok"])
+    print(f"Batch created {created} of {len(events)} event(s)")
+    return results
+
+
+def delete_events(event_ids):
+    """
+    Deletes several events, each from the calendar holding it, in as few HTTP
+    round trips as possible. Returns one batch_mutate() result per event ID.
+    """
+    if not event_ids:
+        return []
+
+    calendar_ids = [find_event_calendar(event_id) for event_id in event_ids]
+    results = batch_mutate([
+        ("delete", {"calendarId": calendar_id, "eventId": event_id})
+        for event_id, calendar_id in zip(event_ids, calendar_ids)
+    ])
+    for event_id, calendar_id, result in zip(event_ids, calendar_ids, results):
+        if result["ok"]:
+            get_sync_engine(calendar_id).discard(event_id)
+    deleted = sum(1 for result in results if result["ok"])
+    print(f"Batch deleted {deleted} of {len(event_ids)} event(s)")
+    return results
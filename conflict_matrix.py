@@ -0,0 +1,144 @@
+"""
+Vectorized conflict checks for whole plans.
+
+Instead of checking each planned session (or each occurrence of a planned
+recurring event) against the calendar one at a time, the starts and ends of
+every occurrence are put in arrays and the full overlap matrix against the
+existing events, and against the plan's other sessions, is computed with
+NumPy in one pass.
+"""
+from datetime import timedelta
+
+import numpy as np
+
+import recurrence
+
+# Overlaps longer than this many minutes are reported as high severity
+HIGH_SEVERITY_MINUTES = 30
+
+# How far ahead a planned recurring event's occurrences are validated
+PLAN_RECURRENCE_HORIZON_DAYS = 365
+
+
+def overlap_minutes(starts, ends, other_starts, other_ends):
+    """
+    Returns the N x M matrix of overlap, in minutes, between intervals
+    [starts[i], ends[i]) and [other_starts[j], other_ends[j]) given as epoch
+    seconds. Pairs that don't overlap are 0.
+    """
+    overlap = (
+        np.minimum(ends[:, None], other_ends[None, :])
+        - np.maximum(starts[:, None], other_starts[None, :])
+    )
+    return np.clip(overlap, 0, None) / 60
+
+
+def plan_occurrences(start_dt, end_dt, recurrence_rules=None, time_zone=None):
+    """
+    Returns the (start, end) datetimes a planned event will occupy: just its
+    own slot, or every occurrence of its recurrence within
+    PLAN_RECURRENCE_HORIZON_DAYS.
+
+    Args:
+        start_dt, end_dt: Timezone-aware datetimes of the first occurrence
+        recurrence_rules: List of RRULE strings, as sent to Google
+        time_zone: IANA name of the calendar's time zone, used to keep the
+                   wall-clock time across daylight saving changes
+    """
+    if not recurrence_rules:
+        return [(start_dt, end_dt)]
+
+    try:
+        series = recurrence.RecurringSeries({
+            "id": "planned",
+            "start": {"dateTime": start_dt.isoformat(), "timeZone": time_zone},
+            "end": {"dateTime": end_dt.isoformat(), "timeZone": time_zone},
+            "recurrence": recurrence_rules,
+        })
+    except (KeyError, ValueError, TypeError) as error:
+        print(f"Could not expand planned recurrence {recurrence_rules}: {error}")
+        return [(start_dt, end_dt)]
+    horizon = start_dt + timedelta(days=PLAN_RECURRENCE_HORIZON_DAYS)
+    occurrences = [(start, end) for start, end, _ in series.entries_in_range(start_dt, horizon)]
+    return occurrences or [(start_dt, end_dt)]
+
+
+def _conflict(summary, start_time, end_time, event_id, minutes):
+    return {
+        'existing_event': {
+            'summary': summary,
+            'start_time': start_time,
+            'end_time': end_time,
+            'id': event_id
+        },
+        'overlap_minutes': int(minutes),
+        'severity': 'high' if minutes > HIGH_SEVERITY_MINUTES else 'low'
+    }
+
+
+def plan_conflicts(planned_events, existing_events):
+    """
+    Checks a whole plan at once against the calendar and against itself.
+
+    Args:
+        planned_events: List of dicts with "summary" and "occurrences", a list
+                        of (start, end) aware datetimes (see plan_occurrences)
+        existing_events: Event objects already on the calendar
+
+    Returns:
+        A list parallel to planned_events with each one's conflicts, in the
+        structure detect_conflicts returns. An overlap between two planned
+        events is reported on the later one, with the earlier one as
+        "existing_event" (no ID) and "source": "plan". Conflicts of a
+        recurring event's occurrences carry "occurrence_start".
+    """
+    results = [[] for _ in planned_events]
+    occurrences = [
+        (index, start, end)
+        for index, planned in enumerate(planned_events)
+        for start, end in planned["occurrences"]
+    ]
+    if not occurrences:
+        return results
+
+    owners = np.array([index for index, _, _ in occurrences])
+    starts = np.array([start.timestamp() for _, start, _ in occurrences])
+    ends = np.array([end.timestamp() for _, _, end in occurrences])
+    recurring = [len(planned["occurrences"]) > 1 for planned in planned_events]
+
+    def add(row, conflict):
+        if recurring[owners[row]]:
+            conflict['occurrence_start'] = occurrences[row][1].isoformat()
+        results[owners[row]].append(conflict)
+
+    # Against the calendar: only events overlapping the plan's overall span
+    existing = sorted(existing_events, key=lambda event: event.start)
+    existing_starts = np.array([event.start for event in existing], dtype=float)
+    existing_ends = np.array([event.end for event in existing], dtype=float)
+    last = np.searchsorted(existing_starts, ends.max(), side="left")
+    window = np.nonzero(existing_ends[:last] > starts.min())[0]
+    if len(window):
+        matrix = overlap_minutes(starts, ends, existing_starts[window], existing_ends[window])
+        for row, column in zip(*np.nonzero(matrix)):
+            event = existing[window[column]]
+            add(row, _conflict(
+                event.summary or 'Untitled Event', event.start_iso, event.end_iso,
+                event.id, matrix[row, column],
+            ))
+
+    # Against the plan's own sessions, each pair once
+    if len(planned_events) > 1:
+        matrix = overlap_minutes(starts, ends, starts, ends)
+        matrix[owners[:, None] >= owners[None, :]] = 0
+        for earlier, later in zip(*np.nonzero(matrix)):
+            conflict = _conflict(
+                planned_events[owners[earlier]]["summary"],
+                occurrences[earlier][1].isoformat(),
+                occurrences[earlier][2].isoformat(),
+                None,
+                matrix[earlier, later],
+            )
+            conflict['source'] = 'plan'
+            add(later, conflict)
+
+    return results
@@ -0,0 +1,348 @@
+"""
+Per-user cache of the event windows the app reads over and over (the
+calendar view and the planner context).
+
+Each entry is one user's events for one window (e.g. the next 90 days) as a
+start-ordered list of Event objects. Entries are refreshed from the sync
+store once they are older than EVENT_CACHE_MAX_AGE, which is a cheap
+incremental sync. The app's own writes don't wait for that: every create,
+update and delete made through calendar_client is patched into the cached
+windows it falls in as soon as Google confirms it, so a user sees their
+change right away without anything being refetched.
+
+Requests never wait for a refresh they don't have to. An entry that has just
+expired is still served (for up to EVENT_CACHE_STALE_AGE more) while it is
+refreshed in the background, and an entry that is read close to expiring is
+refreshed ahead of time, so windows that are used often are normally
+refreshed before anyone sees them expire. Only a missing or very old entry is
+fetched synchronously, and concurrent requests for the same window share
+that one fetch.
+"""
+import bisect
+import collections
+import concurrent.futures
+import datetime
+import os
+import threading
+import time
+
+from cachetools import LRUCache
+
+import async_calendar_client
+import calendar_client
+import recurrence
+from availability import AvailabilityBitmap
+from interval_index import IntervalIndex
+from single_flight import SingleFlight
+from event_model import Event
+
+# Cached windows are refreshed once they are older than this
+EVENT_CACHE_MAX_AGE = datetime.timedelta(
+    seconds=float(os.environ.get("EVENT_CACHE_MAX_AGE_SECONDS", "300"))
+)
+
+# How long after expiring an entry may still be served while it is refreshed
+# in the background; older entries are refetched before answering
+EVENT_CACHE_STALE_AGE = datetime.timedelta(
+    seconds=float(os.environ.get("EVENT_CACHE_STALE_SECONDS", "3600"))
+)
+
+# Entries read after this fraction of EVENT_CACHE_MAX_AGE are refreshed ahead
+# of time in the background
+EVENT_CACHE_REFRESH_AHEAD = 0.8
+
+# Number of (user, window) entries kept; the least recently used are dropped
+EVENT_CACHE_MAX_ENTRIES = 100
+
+# Threads refreshing entries in the background
+EVENT_CACHE_REFRESH_WORKERS = 2
+
+# Number of recent writes remembered, to re-apply those made while a window
+# was being refreshed
+RECENT_WRITES = 256
+
+# Number of recent reads whose data age is kept for the refresh-lag metrics
+SERVED_AGE_SAMPLES = 1000
+
+
+def _same_event(event, event_id):
+    """True for the event itself and, for a recurring master, its occurrences."""
+    return event.id == event_id or (event.id or "").startswith(event_id + "_")
+
+
+class CachedWindow:
+    """
+    One user's events between time_min and time_max, as fetched at
+    fetched_at from the given calendars.
+    """
+
+    def __init__(self, events, time_min, time_max, calendar_ids, fetched_at):
+        self.events = events
+        self.time_min = time_min
+        self.time_max = time_max
+        self.calendar_ids = set(calendar_ids)
+        self.fetched_at = fetched_at
+        self._availability = None
+        self._index = None
+        self._lock = threading.Lock()
+
+    def availability(self):
+        """
+        Returns the window's AvailabilityBitmap, building it on first use.
+        Writes patched into the window update it in place.
+        """
+        with self._lock:
+            if self._availability is None:
+                self._availability = AvailabilityBitmap.from_events(
+                    self.events, self.time_min, self.time_max
+                )
+            return self._availability
+
+    def index(self):
+        """
+        Returns an IntervalIndex of the window's events, building it on first
+        use. Writes patched into the window update it in place.
+        """
+        with self._lock:
+            if self._index is None:
+                self._index = IntervalIndex(self.events)
+            return self._index
+
+    def age(self, now=None):
+        return (now or datetime.datetime.now(datetime.timezone.utc)) - self.fetched_at
+
+    def patched(self, event_id, added):
+        """
+        Returns the window's events with an event replaced by `added` (Event
+        objects, possibly empty). A new list is built so that requests still
+        reading the old one are unaffected.
+        """
+        events = [event for event in self.events if not _same_event(event, event_id)]
+        for event in added:
+            if event.end > self.time_min.timestamp() and event.start < self.time_max.timestamp():
+                position = bisect.bisect_right([existing.start for existing in events], event.start)
+                events.insert(position, event)
+        return events
+
+    def patch(self, event_id, added):
+        """Replaces an event by `added` in the window, its availability and index."""
+        with self._lock:
+            removed = [event for event in self.events if _same_event(event, event_id)]
+            self.events = self.patched(event_id, added)
+            added = [event for event in self.events if _same_event(event, event_id)]
+            if self._availability is not None:
+                self._availability.remove(removed)
+                self._availability.add(added)
+            if self._index is not None:
+                for event in removed:
+                    self._index.remove(event.id)
+                for event in added:
+                    self._index.add(event)
+
+
+class EventWindowCache:
+    """
+    Thread-safe LRU of CachedWindow entries keyed by (user, days ahead).
+
+    Args:
+        max_age: How old an entry may get before it is refreshed
+        stale_age: How long past max_age an entry may still be served while
+                   it is refreshed in the background
+        maxsize: Number of entries kept
+    """
+
+    def __init__(self, max_age=EVENT_CACHE_MAX_AGE, stale_age=EVENT_CACHE_STALE_AGE,
+                 maxsize=EVENT_CACHE_MAX_ENTRIES):
+        self.max_age = max_age
+        self.stale_age = stale_age
+        self._entries = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._flight = SingleFlight()
+        self._generation = 0
+        self._write_sequence = 0
+        self._recent_writes = collections.deque(maxlen=RECENT_WRITES)
+        self._served_ages = collections.deque(maxlen=SERVED_AGE_SAMPLES)
+        self._stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "refreshes_ahead": 0,
+            "background_refreshes": 0,
+            "refresh_failures": 0,
+            "last_refresh_seconds": None,
+        }
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get_events(self, user_key, days_in_future=calendar_client.SYNC_WINDOW_DAYS):
+        """
+        Returns the user's events (Event objects) from now until
+        `days_in_future` days ahead. Cached entries are returned right away,
+        even slightly expired ones (which are then refreshed in the
+        background); only a missing or too old entry is fetched first.
+        """
+        return self.get_window(user_key, days_in_future).events
+
+    def get_availability(self, user_key, days_in_future=calendar_client.SYNC_WINDOW_DAYS):
+        """Returns the AvailabilityBitmap of the same window get_events reads."""
+        return self.get_window(user_key, days_in_future).availability()
+
+    def get_index(self, user_key, days_in_future=calendar_client.SYNC_WINDOW_DAYS):
+        """Returns the IntervalIndex of the same window get_events reads."""
+        return self.get_window(user_key, days_in_future).index()
+
+    def get_window(self, user_key, days_in_future=calendar_client.SYNC_WINDOW_DAYS):
+        """Returns the CachedWindow get_events reads its events from."""
+        key = (user_key, days_in_future)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        with self._lock:
+            window = self._entries.get(key)
+
+        if window is not None:
+            age = window.age(now)
+            if age <= self.max_age + self.stale_age:
+                if age > self.max_age:
+                    self._count("stale_hits")
+                    self._refresh_in_background(key)
+                else:
+                    self._count("hits")
+                    if age > self.max_age * EVENT_CACHE_REFRESH_AHEAD:
+                        self._refresh_in_background(key, ahead=True)
+                with self._lock:
+                    self._served_ages.append(age.total_seconds())
+                return window
+
+        self._count("misses")
+        with self._lock:
+            self._served_ages.append(0.0)
+        return self._refresh(key)
+
+    def _refresh(self, key):
+        """
+        Fetches a window from the sync store and caches it, or waits for the
+        fetch of it that is already running.
+        """
+        return self._flight.do(key, lambda: self._fetch(key))
+
+    def _fetch(self, key):
+        user_key, days_in_future = key
+        print(f"Refreshing cached calendar events for {user_key} ({days_in_future} days)...")
+        started = time.monotonic()
+        now = datetime.datetime.now(datetime.timezone.utc)
+        with self._lock:
+            sequence = self._write_sequence
+            generation = self._generation
+
+        calendar_ids = calendar_client.get_selected_calendar_ids()
+        events = async_calendar_client.sync_events(days_in_future, calendar_ids=calendar_ids)
+        window = CachedWindow(
+            events, now, now + datetime.timedelta(days=days_in_future), calendar_ids, now
+        )
+        with self._lock:
+            if generation != self._generation:
+                # The cache was invalidated while fetching
+                return window
+            # Writes made while fetching may not be in what was fetched
+            for write_sequence, calendar_id, event_id, event in self._recent_writes:
+                if write_sequence > sequence and calendar_id in window.calendar_ids:
+                    window.patch(event_id, self._occurrences(calendar_id, event, window))
+            self._entries[key] = window
+            self._stats["last_refresh_seconds"] = round(time.monotonic() - started, 3)
+        return window
+
+    def _refresh_in_background(self, key, ahead=False):
+        """Schedules a refresh of an entry unless one is already running."""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            self._stats["refreshes_ahead" if ahead else "background_refreshes"] += 1
+
+        def refresh():
+            try:
+                self._refresh(key)
+            except Exception as error:
+                self._count("refresh_failures")
+                print(f"Background refresh of cached events failed: {error}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        _refresh_pool.submit(refresh)
+
+    def get_stats(self):
+        """
+        Returns hit/miss and refresh counters, plus how old the data served by
+        recent reads was (the refresh lag), in seconds.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            ages = sorted(self._served_ages)
+            stats["entries"] = len(self._entries)
+            stats["refreshing"] = len(self._refreshing)
+        stats["coalesced"] = self._flight.shared
+        if ages:
+            stats["served_age_seconds"] = {
+                "p50": round(ages[len(ages) // 2], 1),
+                "p99": round(ages[min(len(ages) - 1, int(len(ages) * 0.99))], 1),
+                "max": round(ages[-1], 1),
+            }
+        else:
+            stats["served_age_seconds"] = None
+        return stats
+
+    def apply_write(self, calendar_id, event_id, event):
+        """
+        Patches an event we just created or updated (a Google event dict), or
+        deleted (event=None), into every cached window of its calendar.
+        Recurring events are expanded into their occurrences in each window.
+        """
+        if not event_id:
+            return
+        with self._lock:
+            self._write_sequence += 1
+            self._recent_writes.append((self._write_sequence, calendar_id, event_id, event))
+            for window in list(self._entries.values()):
+                if calendar_id not in window.calendar_ids:
+                    continue
+                window.patch(event_id, self._occurrences(calendar_id, event, window))
+
+    @staticmethod
+    def _occurrences(calendar_id, event, window):
+        if event is None or event.get("status") == "cancelled":
+            return []
+        if event.get("recurrence"):
+            series = recurrence.get_series(calendar_id, event)
+            if not series:
+                return []
+            return [
+                Event.from_google(instance, calendar_id)
+                for _, _, instance in series.entries_in_range(window.time_min, window.time_max)
+            ]
+        parsed = Event.from_google(event, calendar_id)
+        return [parsed] if parsed else []
+
+    def invalidate(self, user_key=None):
+        """Drops one user's entries, or every entry."""
+        with self._lock:
+            self._generation += 1
+            if user_key is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] == user_key]:
+                del self._entries[key]
+
+
+_refresh_pool = concurrent.futures.ThreadPoolExecutor(
+    max_workers=EVENT_CACHE_REFRESH_WORKERS, thread_name_prefix="event-cache-refresh"
+)
+_event_cache = EventWindowCache()
+calendar_client.add_write_listener(_event_cache.apply_write)
+
+
+def get_event_cache():
+    """Returns the process-wide EventWindowCache."""
+    return _event_cache
@@ -0,0 +1,127 @@
+"""
+Compact, pre-parsed representation of a calendar event.
+
+Google returns events as nested dicts with ISO timestamp strings, and every
+consumer used to dig out start.dateTime/start.date and parse them again.
+Event parses them once, when the event is read from the API or the event
+store, and keeps only what the app works with: UTC epoch seconds, an all-day
+flag and an interned title. The full Google payload is kept as-is (often
+still as the JSON text it was stored as) and only decoded if `raw` is used.
+"""
+import json
+import sys
+from datetime import date, datetime, timedelta, timezone
+
+
+def _intern(value):
+    return sys.intern(value) if value else value
+
+
+class Event:
+    """
+    A calendar event with pre-parsed times.
+
+    Attributes:
+        id: Google event ID (None for anonymous busy blocks)
+        calendar_id: Calendar the event belongs to
+        summary: Event title (interned, so repeated titles share one string),
+                 None if the event has none; each view picks its own fallback
+        start, end: UTC epoch seconds (all-day events start at local midnight)
+        all_day: True for date-only events
+        utc_offset: Offset of the event's own time zone, in minutes, used to
+                    render times the way Google sent them
+    """
+
+    __slots__ = ("id", "calendar_id", "summary", "start", "end", "all_day", "utc_offset", "_payload")
+
+    def __init__(self, id, summary, start, end, all_day=False, utc_offset=0,
+                 calendar_id="primary", payload=None):
+        self.id = id
+        self.calendar_id = _intern(calendar_id)
+        self.summary = _intern(summary)
+        self.start = start
+        self.end = end
+        self.all_day = all_day
+        self.utc_offset = utc_offset
+        self._payload = payload
+
+    @classmethod
+    def from_google(cls, event, calendar_id=None, payload=None):
+        """
+        Builds an Event from a Google event dict. Returns None if the event
+        has no usable start and end.
+
+        Args:
+            payload: The raw payload to keep (e.g. the JSON text the dict was
+                     decoded from); defaults to the dict itself
+        """
+        start = event.get("start", {})
+        end = event.get("end", {})
+        all_day = not start.get("dateTime")
+        start_value = start.get("dateTime") or start.get("date")
+        end_value = end.get("dateTime") or end.get("date")
+        if not start_value or not end_value:
+            return None
+        try:
+            start_dt = _parse(start_value)
+            end_dt = _parse(end_value)
+        except ValueError as e:
+            print(f"Error parsing event times: {e}")
+            return None
+
+        return cls(
+            event.get("id"),
+            event.get("summary"),
+            int(start_dt.timestamp()),
+            int(end_dt.timestamp()),
+            all_day=all_day,
+            utc_offset=int(start_dt.utcoffset().total_seconds() // 60),
+            calendar_id=calendar_id or event.get("calendarId", "primary"),
+            payload=payload if payload is not None else event,
+        )
+
+    @property
+    def raw(self):
+        """The full Google event dict, decoded on first use."""
+        if isinstance(self._payload, str):
+            self._payload = json.loads(self._payload)
+        return self._payload if self._payload is not None else {}
+
+    def _render(self, epoch):
+        if self.all_day:
+            return date.fromtimestamp(epoch).isoformat()
+        zone = timezone(timedelta(minutes=self.utc_offset))
+        return datetime.fromtimestamp(epoch, zone).isoformat()
+
+    @property
+    def start_iso(self):
+        """Start as Google formats it: a date for all-day events, else an ISO timestamp."""
+        return self._render(self.start)
+
+    @property
+    def end_iso(self):
+        return self._render(self.end)
+
+    @property
+    def start_dt(self):
+        """Start as an aware datetime in the event's own UTC offset."""
+        return datetime.fromtimestamp(self.start, timezone(timedelta(minutes=self.utc_offset)))
+
+    @property
+    def end_dt(self):
+        return datetime.fromtimestamp(self.end, timezone(timedelta(minutes=self.utc_offset)))
+
+    def to_dict(self):
+        """Compact dict for prompts and JSON responses."""
+        return {"id": self.id, "summary": self.summary, "start": self.start_iso, "end": self.end_iso}
+
+    def __repr__(self):
+        return f"Event({self.id!r}, {self.summary!r}, {self.start_iso}, {self.end_iso})"
+
+
+def _parse(value):
+    """Parses an ISO date or timestamp; dates and naive times are taken as local time."""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.astimezone()
+    return parsed
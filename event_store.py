@@ -0,0 +1,387 @@
+"""
+Persistent SQLite cache of synced calendar events.
+
+Events are stored with their start/end as UTC epoch seconds, indexed per
+calendar, so time-window lookups are index range scans instead of walks over
+every event. The database survives restarts and is shared by every process
+(e.g. each Gunicorn worker) pointing at the same file, together with each
+calendar's sync token, so a new worker continues from the last sync instead
+of downloading the whole window again.
+"""
+import datetime
+import json
+import os
+import sqlite3
+import threading
+
+import recurrence
+from event_model import Event
+
+# Location of the cache database
+EVENT_CACHE_DB = os.environ.get("EVENT_CACHE_DB", "event_cache.db")
+
+# Bump when the schema changes; the cache is rebuilt from Google on the next sync
+SCHEMA_VERSION = 4
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    calendar_id TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    start_epoch REAL NOT NULL,
+    end_epoch REAL NOT NULL,
+    recurring_event_id TEXT,
+    original_start REAL,
+    summary TEXT,
+    all_day INTEGER NOT NULL DEFAULT 0,
+    utc_offset INTEGER NOT NULL DEFAULT 0,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (calendar_id, event_id)
+);
+CREATE INDEX IF NOT EXISTS events_by_start ON events (calendar_id, start_epoch);
+CREATE INDEX IF NOT EXISTS events_by_end ON events (calendar_id, end_epoch);
+CREATE INDEX IF NOT EXISTS events_by_id ON events (event_id);
+CREATE INDEX IF NOT EXISTS events_by_series ON events (calendar_id, recurring_event_id);
+
+CREATE TABLE IF NOT EXISTS recurring_masters (
+    calendar_id TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    start_epoch REAL NOT NULL,
+    until_epoch REAL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (calendar_id, event_id)
+);
+
+CREATE TABLE IF NOT EXISTS cancelled_instances (
+    calendar_id TEXT NOT NULL,
+    recurring_event_id TEXT NOT NULL,
+    original_start REAL NOT NULL,
+    PRIMARY KEY (calendar_id, recurring_event_id, original_start)
+);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    calendar_id TEXT PRIMARY KEY,
+    sync_token TEXT,
+    window_start REAL,
+    horizon REAL,
+    last_synced REAL,
+    max_duration REAL NOT NULL DEFAULT 0,
+    expands_recurrence INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+_TABLES = ("events", "recurring_masters", "cancelled_instances", "sync_state")
+
+
+def _to_epoch(value):
+    return value.timestamp() if value is not None else None
+
+
+def _from_epoch(value):
+    if value is None:
+        return None
+    return datetime.datetime.fromtimestamp(value, datetime.timezone.utc)
+
+
+_INSERT_EVENT = "INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+_INSERT_MASTER = "INSERT OR REPLACE INTO recurring_masters VALUES (?, ?, ?, ?, ?)"
+_INSERT_CANCELLED = "INSERT OR IGNORE INTO cancelled_instances VALUES (?, ?, ?)"
+
+
+class EventStore:
+    """
+    SQLite-backed store of events per calendar, plus each
+    calendar's sync state (sync token, covered window, last sync time).
+
+    Every thread (and every process) gets its own connection; the database
+    runs in WAL mode so readers never block the writer.
+    """
+
+    def __init__(self, path=EVENT_CACHE_DB):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        # A connection must not be used across threads, or be inherited by a
+        # forked worker process.
+        connection = getattr(self._local, "connection", None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            connection.executescript(
+                "".join(f"DROP TABLE IF EXISTS {table};" for table in _TABLES)
+                + f"PRAGMA user_version = {SCHEMA_VERSION};"
+            )
+        connection.executescript(_SCHEMA)
+        self._local.connection = connection
+        self._local.pid = os.getpid()
+        return connection
+
+    def _write(self, statements):
+        """Runs (sql, params) statements in one immediate transaction."""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            for sql, params in statements:
+                if isinstance(params, list):
+                    connection.executemany(sql, params)
+                else:
+                    connection.execute(sql, params)
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _rows(calendar_id, entries):
+        rows = []
+        for start, end, event in entries:
+            original_start = event.get("originalStartTime")
+            rows.append((
+                calendar_id,
+                event["id"],
+                start.timestamp(),
+                end.timestamp(),
+                event.get("recurringEventId"),
+                recurrence.original_start_epoch(original_start) if original_start else None,
+                event.get("summary"),
+                int(not event["start"].get("dateTime")),
+                int(start.utcoffset().total_seconds() // 60),
+                json.dumps(event),
+            ))
+        return rows
+
+    @staticmethod
+    def _master_rows(calendar_id, masters):
+        return [
+            (calendar_id, master["id"], start.timestamp(), _to_epoch(until), json.dumps(master))
+            for start, until, master in masters
+        ]
+
+    @staticmethod
+    def _longest(entries):
+        return max(
+            ((end - start).total_seconds() for start, end, _ in entries), default=0.0
+        )
+
+    # ----- writes -----------------------------------------------------------
+
+    def replace_calendar(self, calendar_id, entries, sync_token, window_start, horizon,
+                         synced_at, masters=(), cancelled=(), expands_recurrence=False):
+        """
+        Replaces every stored event of a calendar (after a full sync) and
+        records its new sync state.
+
+        Args:
+            entries: (start, end, event) for single events and exceptions
+            masters: (first start, last end or None, event) for recurring masters
+            cancelled: (recurring event id, original start epoch) of cancelled
+                       occurrences
+            expands_recurrence: Whether the sync fetched recurring masters
+                                (True) or server-expanded instances (False)
+        """
+        self._write([
+            ("DELETE FROM events WHERE calendar_id = ?", (calendar_id,)),
+            ("DELETE FROM recurring_masters WHERE calendar_id = ?", (calendar_id,)),
+            ("DELETE FROM cancelled_instances WHERE calendar_id = ?", (calendar_id,)),
+            (_INSERT_EVENT, self._rows(calendar_id, entries)),
+            (_INSERT_MASTER, self._master_rows(calendar_id, masters)),
+            (_INSERT_CANCELLED, [(calendar_id, *instance) for instance in cancelled]),
+            (
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (calendar_id, sync_token, _to_epoch(window_start), _to_epoch(horizon),
+                 _to_epoch(synced_at), self._longest(entries), int(expands_recurrence)),
+            ),
+        ])
+
+    def apply_changes(self, calendar_id, entries, deleted_ids, sync_token, synced_at,
+                      masters=(), cancelled=()):
+        """
+        Applies an incremental sync: upserts changed events and recurring
+        masters, removes cancelled ones (a cancelled master takes its
+        exceptions with it) and advances the sync token, atomically.
+        """
+        deleted = [(calendar_id, event_id) for event_id in deleted_ids]
+        self._write([
+            ("DELETE FROM events WHERE calendar_id = ? AND event_id = ?", deleted),
+            ("DELETE FROM events WHERE calendar_id = ? AND recurring_event_id = ?", deleted),
+            ("DELETE FROM recurring_masters WHERE calendar_id = ? AND event_id = ?", deleted),
+            ("DELETE FROM cancelled_instances WHERE calendar_id = ? AND recurring_event_id = ?", deleted),
+            (_INSERT_EVENT, self._rows(calendar_id, entries)),
+            (_INSERT_MASTER, self._master_rows(calendar_id, masters)),
+            (_INSERT_CANCELLED, [(calendar_id, *instance) for instance in cancelled]),
+            (
+                "UPDATE sync_state SET sync_token = ?, last_synced = ?, "
+                "max_duration = MAX(max_duration, ?) WHERE calendar_id = ?",
+                (sync_token, _to_epoch(synced_at), self._longest(entries), calendar_id),
+            ),
+        ])
+
+    def upsert(self, calendar_id, entries, masters=()):
+        """Stores events we just wrote or fetched, without touching the sync token."""
+        self._write([
+            (_INSERT_EVENT, self._rows(calendar_id, entries)),
+            (_INSERT_MASTER, self._master_rows(calendar_id, masters)),
+            (
+                "UPDATE sync_state SET max_duration = MAX(max_duration, ?) WHERE calendar_id = ?",
+                (self._longest(entries), calendar_id),
+            ),
+        ])
+
+    def delete(self, calendar_id, event_id):
+        """
+        Removes an event. Deleting one occurrence of a stored recurring
+        series records it as cancelled, so expansion leaves it out.
+        """
+        statements = [
+            ("DELETE FROM events WHERE calendar_id = ? AND event_id = ?", (calendar_id, event_id)),
+        ]
+        instance = recurrence.parse_instance_id(event_id)
+        if instance and self._has_master(calendar_id, instance[0]):
+            statements.append((_INSERT_CANCELLED, (calendar_id, *instance)))
+        self._write(statements)
+
+    def reset(self, calendar_id=None):
+        """Forgets the events and sync state of one calendar, or of all of them."""
+        if calendar_id is None:
+            self._write([(f"DELETE FROM {table}", ()) for table in _TABLES])
+        else:
+            self._write([
+                (f"DELETE FROM {table} WHERE calendar_id = ?", (calendar_id,)) for table in _TABLES
+            ])
+
+    # ----- reads ------------------------------------------------------------
+
+    def get_sync_state(self, calendar_id):
+        """
+        Returns a calendar's sync state as a dict with "sync_token",
+        "window_start", "horizon", "last_synced" (aware datetimes) and
+        "expands_recurrence", or None if it has never been synced.
+        """
+        row = self._connection().execute(
+            "SELECT sync_token, window_start, horizon, last_synced, expands_recurrence "
+            "FROM sync_state WHERE calendar_id = ?",
+            (calendar_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "sync_token": row[0],
+            "window_start": _from_epoch(row[1]),
+            "horizon": _from_epoch(row[2]),
+            "last_synced": _from_epoch(row[3]),
+            "expands_recurrence": bool(row[4]),
+        }
+
+    def events_in_range(self, calendar_id, time_min, time_max):
+        """
+        Returns the stored events overlapping [time_min, time_max) as Event
+        objects, ordered by start. Their payloads are only decoded on access.
+        """
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT max_duration FROM sync_state WHERE calendar_id = ?", (calendar_id,)
+        ).fetchone()
+        max_duration = row[0] if row else None
+        time_min = time_min.timestamp()
+        time_max = time_max.timestamp()
+
+        if max_duration is None:
+            # Entries without sync state (never synced); scan the calendar
+            lower_bound = float("-inf")
+        else:
+            # No event lasts longer than max_duration, so any event ending
+            # after time_min starts after time_min - max_duration: the overlap
+            # test becomes a bounded scan of the start index.
+            lower_bound = time_min - max_duration
+        rows = connection.execute(
+            "SELECT event_id, summary, start_epoch, end_epoch, all_day, utc_offset, payload "
+            "FROM events WHERE calendar_id = ? AND start_epoch >= ? AND start_epoch < ? "
+            "AND end_epoch > ? ORDER BY start_epoch",
+            (calendar_id, lower_bound, time_max, time_min),
+        )
+        return [
+            Event(event_id, summary, int(start), int(end), bool(all_day), utc_offset,
+                  calendar_id, payload)
+            for event_id, summary, start, end, all_day, utc_offset, payload in rows
+        ]
+
+    def masters_in_range(self, calendar_id, time_min, time_max):
+        """Returns the recurring masters with occurrences possibly in [time_min, time_max)."""
+        rows = self._connection().execute(
+            "SELECT payload FROM recurring_masters WHERE calendar_id = ? AND start_epoch < ? "
+            "AND (until_epoch IS NULL OR until_epoch > ?)",
+            (calendar_id, time_max.timestamp(), time_min.timestamp()),
+        )
+        return [json.loads(payload) for payload, in rows]
+
+    def overridden_starts(self, calendar_id, master_ids):
+        """
+        Returns {master id: set of original start epochs} of the occurrences
+        replaced by a stored exception or cancelled.
+        """
+        overridden = {master_id: set() for master_id in master_ids}
+        if not master_ids:
+            return overridden
+        placeholders = ",".join("?" * len(master_ids))
+        rows = self._connection().execute(
+            f"SELECT recurring_event_id, original_start FROM events "
+            f"WHERE calendar_id = ? AND recurring_event_id IN ({placeholders}) "
+            f"UNION ALL SELECT recurring_event_id, original_start FROM cancelled_instances "
+            f"WHERE calendar_id = ? AND recurring_event_id IN ({placeholders})",
+            (calendar_id, *master_ids, calendar_id, *master_ids),
+        )
+        for master_id, original_start in rows:
+            overridden[master_id].add(original_start)
+        return overridden
+
+    def _has_master(self, calendar_id, event_id):
+        return self._connection().execute(
+            "SELECT 1 FROM recurring_masters WHERE calendar_id = ? AND event_id = ?",
+            (calendar_id, event_id),
+        ).fetchone() is not None
+
+    def get_event(self, calendar_id, event_id):
+        row = self._connection().execute(
+            "SELECT payload FROM events WHERE calendar_id = ? AND event_id = ?",
+            (calendar_id, event_id),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def contains(self, calendar_id, event_id):
+        return self._connection().execute(
+            "SELECT 1 FROM events WHERE calendar_id = ? AND event_id = ?",
+            (calendar_id, event_id),
+        ).fetchone() is not None
+
+    def find_calendar(self, event_id):
+        """
+        Returns the ID of a calendar holding the event (or, for an occurrence
+        of a recurring series, its master), or None.
+        """
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT calendar_id FROM events WHERE event_id = ? LIMIT 1", (event_id,)
+        ).fetchone()
+        instance = recurrence.parse_instance_id(event_id)
+        if row is None and instance:
+            row = connection.execute(
+                "SELECT calendar_id FROM recurring_masters WHERE event_id = ? LIMIT 1", (instance[0],)
+            ).fetchone()
+        return row[0] if row else None
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_event_store():
+    """Returns the shared EventStore for EVENT_CACHE_DB."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = EventStore()
+        return _store
@@ -0,0 +1,660 @@
+"""
+Local stand-in for the Google Calendar v3 API, for tests and benchmarks.
+
+Implements the endpoints calendar_client.py and async_calendar_client.py use
+(events list/get/insert/update/patch/delete with sync tokens, etags and
+recurring events, calendars get, calendarList, freeBusy and the batch
+endpoint) against an
+in-memory store, with configurable latency, error injection, page size and
+synthetic calendars of any size.
+
+Run it standalone and point the app at it:
+
+    python fake_calendar_server.py --port 8089 --events 10000 --latency-ms 40
+    CALENDAR_API_ROOT=http://127.0.0.1:8089/ python app.py
+
+or start it in-process with start_fake_server(). Authorization headers are
+accepted but ignored.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+import uuid
+from datetime import datetime, timedelta, timezone
+from email.parser import FeedParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import recurrence
+
+SYNTHETIC_CLASS_DAYS = ["MO,WE,FR", "TU,TH", "MO,WE", "TH"]
+
+SYNTHETIC_SUMMARIES = [
+    "ECEN 380 Lecture", "CS 220 Lab", "MATH 290 Recitation", "Study Group",
+    "Office Hours", "Work Shift", "Gym", "Club Meeting", "TA Session",
+    "Project Sync", "Lunch", "Reading", "Dentist", "Career Fair",
+]
+
+
+def _parse_time(value):
+    """Parses an RFC 3339 timestamp or a date into an aware datetime (UTC for dates)."""
+    if "T" not in value:
+        return datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _event_time(event, key):
+    when = event.get(key, {})
+    return _parse_time(when.get("dateTime") or when.get("date"))
+
+
+def _parse_field_mask(mask):
+    """
+    Parses a partial-response field mask ("nextPageToken,items(id,start/dateTime)")
+    into a nested dict of field name -> sub-mask (None selects the whole field).
+    """
+    tree = {}
+    depth = 0
+    token = ""
+    tokens = []
+    for char in mask:
+        if char == "," and depth == 0:
+            tokens.append(token)
+            token = ""
+            continue
+        depth += {"(": 1, ")": -1}.get(char, 0)
+        token += char
+    tokens.append(token)
+
+    for token in filter(None, (t.strip() for t in tokens)):
+        if "(" in token and ("/" not in token or token.index("(") < token.index("/")):
+            name, sub_mask = token.split("(", 1)
+            tree[name] = _parse_field_mask(sub_mask[:-1])
+        elif "/" in token:
+            name, rest = token.split("/", 1)
+            sub_tree = tree.get(name) or {}
+            sub_tree.update(_parse_field_mask(rest))
+            tree[name] = sub_tree
+        else:
+            tree[token] = None
+    return tree
+
+
+def _apply_field_mask(resource, tree):
+    if tree is None:
+        return resource
+    if isinstance(resource, list):
+        return [_apply_field_mask(item, tree) for item in resource]
+    if not isinstance(resource, dict):
+        return resource
+    return {
+        name: _apply_field_mask(resource[name], sub_tree)
+        for name, sub_tree in tree.items()
+        if name in resource
+    }
+
+
+class FakeAPIError(Exception):
+    def __init__(self, status, reason, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+        self.message = message
+        self.headers = headers or {}
+
+    def body(self):
+        return {"error": {
+            "code": self.status,
+            "message": self.message,
+            "errors": [{"domain": "global", "reason": self.reason, "message": self.message}],
+        }}
+
+
+class FakeCalendarBackend:
+    """
+    In-memory calendars plus the Calendar v3 request semantics the app relies on.
+
+    Args:
+        page_size: Largest page returned by events.list (maxResults is capped to it)
+        latency: Seconds added to every HTTP request
+        latency_jitter: Extra random latency, up to this many seconds
+        error_rate: Probability that any single call fails
+        error_status: Status of injected failures (403 is sent as rateLimitExceeded)
+        retry_after: Retry-After header (seconds) sent with injected failures
+        seed: Seed for the random generator (synthetic data and error injection)
+    """
+
+    def __init__(self, page_size=250, latency=0.0, latency_jitter=0.0,
+                 error_rate=0.0, error_status=503, retry_after=None, seed=None):
+        self.page_size = page_size
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.stats = {"requests": 0, "calls": 0, "injected_errors": 0, "bytes_sent": 0}
+        self._lock = threading.RLock()
+        self._calendars = {}
+        self._primary_id = None
+        self.add_calendar("primary@example.com", "Primary", primary=True)
+
+    # ----- data setup -------------------------------------------------------
+
+    def add_calendar(self, calendar_id, summary, time_zone="UTC", primary=False,
+                     selected=True, access_role="owner"):
+        with self._lock:
+            self._calendars[calendar_id] = {
+                "entry": {
+                    "id": calendar_id,
+                    "summary": summary,
+                    "timeZone": time_zone,
+                    "accessRole": access_role,
+                    "selected": selected,
+                    "primary": primary,
+                },
+                "events": {},
+                "version": 0,
+                "min_sync_version": -1,
+            }
+            if primary:
+                self._primary_id = calendar_id
+        return calendar_id
+
+    def populate(self, calendar_id="primary", count=1000, days=90, start=None, all_day_ratio=0.05):
+        """Adds `count` synthetic events spread over `days` days from `start` (default today)."""
+        start = start or datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        with self._lock:
+            for _ in range(count):
+                day = start + timedelta(days=self.random.randrange(days))
+                if self.random.random() < all_day_ratio:
+                    body = {
+                        "start": {"date": day.date().isoformat()},
+                        "end": {"date": (day + timedelta(days=1)).date().isoformat()},
+                    }
+                else:
+                    begin = day + timedelta(minutes=15 * self.random.randrange(7 * 4, 21 * 4))
+                    end = begin + timedelta(minutes=15 * self.random.randrange(2, 13))
+                    body = {
+                        "start": {"dateTime": begin.isoformat(), "timeZone": "UTC"},
+                        "end": {"dateTime": end.isoformat(), "timeZone": "UTC"},
+                    }
+                body["summary"] = self.random.choice(SYNTHETIC_SUMMARIES)
+                body["description"] = "Synthetic event"
+                body["attendees"] = [{"email": f"student{n}@example.com"} for n in range(3)]
+                self._insert(calendar_id, body)
+
+    def populate_classes(self, calendar_id="primary", count=10, weeks=15, start=None,
+                         time_zone="America/Denver"):
+        """Adds `count` weekly recurring class series lasting `weeks` weeks from `start`."""
+        start = start or datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        zone = recurrence.zoneinfo.ZoneInfo(time_zone)
+        with self._lock:
+            for n in range(count):
+                day = (start + timedelta(days=self.random.randrange(7))).astimezone(zone)
+                begin = day.replace(hour=self.random.randrange(8, 17), minute=0, second=0, microsecond=0)
+                end = begin + timedelta(minutes=self.random.choice([50, 75, 110]))
+                until = (start + timedelta(weeks=weeks)).strftime("%Y%m%dT%H%M%SZ")
+                self._insert(calendar_id, {
+                    "summary": f"Class {n + 1}",
+                    "start": {"dateTime": begin.isoformat(), "timeZone": time_zone},
+                    "end": {"dateTime": end.isoformat(), "timeZone": time_zone},
+                    "recurrence": [
+                        f"RRULE:FREQ=WEEKLY;BYDAY={self.random.choice(SYNTHETIC_CLASS_DAYS)};UNTIL={until}"
+                    ],
+                })
+
+    def expire_sync_tokens(self, calendar_id="primary"):
+        """Makes every sync token issued so far answer 410 Gone."""
+        with self._lock:
+            calendar = self._calendar(calendar_id)
+            calendar["min_sync_version"] = calendar["version"]
+
+    # ----- helpers ----------------------------------------------------------
+
+    def _calendar(self, calendar_id):
+        if calendar_id == "primary":
+            calendar_id = self._primary_id
+        calendar = self._calendars.get(calendar_id)
+        if calendar is None:
+            raise FakeAPIError(404, "notFound", "Not Found")
+        return calendar
+
+    def _bump(self, calendar):
+        calendar["version"] += 1
+        return calendar["version"]
+
+    def _stamp(self, calendar, event):
+        version = self._bump(calendar)
+        event["_version"] = version
+        event["etag"] = f'"{version}"'
+        event["updated"] = datetime.now(timezone.utc).isoformat()
+
+    def _public(self, event):
+        return {key: value for key, value in event.items() if not key.startswith("_")}
+
+    def _insert(self, calendar_id, body):
+        calendar = self._calendar(calendar_id)
+        event = dict(body)
+        event.setdefault("id", uuid.uuid4().hex)
+        if event["id"] in calendar["events"]:
+            raise FakeAPIError(409, "duplicate", "The requested identifier already exists.")
+        event["kind"] = "calendar#event"
+        event["status"] = "confirmed"
+        event["htmlLink"] = f"https://calendar.example.com/event?eid={event['id']}"
+        event["created"] = datetime.now(timezone.utc).isoformat()
+        self._stamp(calendar, event)
+        calendar["events"][event["id"]] = event
+        return event
+
+    def _tombstone(self, event):
+        fields = ("id", "status", "recurringEventId", "originalStartTime")
+        return {key: event[key] for key in fields if key in event}
+
+    def _series_window(self, time_min, time_max):
+        now = datetime.now(timezone.utc)
+        return time_min or now - timedelta(days=365), time_max or now + timedelta(days=365)
+
+    def _series_overlaps(self, master, time_min, time_max):
+        time_min, time_max = self._series_window(time_min, time_max)
+        series = recurrence.RecurringSeries(self._public(master))
+        last_end = series.last_end()
+        return _event_time(master, "start") < time_max and (last_end is None or last_end > time_min)
+
+    def _expand(self, calendar, master, time_min, time_max):
+        """Returns the occurrences of a recurring master, as singleEvents=true would."""
+        time_min, time_max = self._series_window(time_min, time_max)
+        overridden = {
+            recurrence.original_start_epoch(event["originalStartTime"])
+            for event in calendar["events"].values()
+            if event.get("recurringEventId") == master["id"]
+        }
+        series = recurrence.RecurringSeries(self._public(master))
+        instances = []
+        for _, _, instance in series.entries_in_range(time_min, time_max, overridden):
+            instance.update(etag=master["etag"], status="confirmed")
+            instances.append(instance)
+        return instances
+
+    def _materialize_instance(self, calendar, event_id):
+        """Turns an occurrence of a recurring series into a stored exception."""
+        instance = recurrence.parse_instance_id(event_id)
+        master = calendar["events"].get(instance[0]) if instance else None
+        if not master or not master.get("recurrence") or master["status"] == "cancelled":
+            return None
+        start = datetime.fromtimestamp(instance[1], timezone.utc)
+        for occurrence in self._expand(calendar, master, start, start + timedelta(seconds=1)):
+            if occurrence["id"] == event_id:
+                self._stamp(calendar, occurrence)
+                calendar["events"][event_id] = occurrence
+                return occurrence
+        return None
+
+    def _live_event(self, calendar, event_id):
+        event = calendar["events"].get(event_id) or self._materialize_instance(calendar, event_id)
+        if event is None:
+            raise FakeAPIError(404, "notFound", "Not Found")
+        if event["status"] == "cancelled":
+            raise FakeAPIError(410, "deleted", "Resource has been deleted")
+        return event
+
+    def _check_etag(self, event, headers):
+        if_match = headers.get("if-match")
+        if if_match and if_match != "*" and if_match != event["etag"]:
+            raise FakeAPIError(412, "conditionNotMet", "Precondition Failed")
+
+    def _maybe_fail(self):
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.stats["injected_errors"] += 1
+            headers = {"Retry-After": str(self.retry_after)} if self.retry_after is not None else {}
+            if self.error_status == 403:
+                raise FakeAPIError(403, "rateLimitExceeded", "Rate Limit Exceeded", headers)
+            raise FakeAPIError(self.error_status, "backendError", "Backend Error", headers)
+
+    # ----- API operations ---------------------------------------------------
+
+    def list_events(self, calendar_id, query):
+        calendar = self._calendar(calendar_id)
+        page_size = min(int(query.get("maxResults", 250)), self.page_size)
+        offset = int(query.get("pageToken") or 0)
+
+        if "syncToken" in query:
+            since = int(query["syncToken"])
+            if since <= calendar["min_sync_version"]:
+                raise FakeAPIError(410, "fullSyncRequired", "Sync token is no longer valid")
+            matches = [
+                event for event in calendar["events"].values() if event["_version"] > since
+            ]
+            matches.sort(key=lambda event: event["_version"])
+            items = [
+                self._tombstone(event) if event["status"] == "cancelled" else self._public(event)
+                for event in matches
+            ]
+        else:
+            time_min = _parse_time(query["timeMin"]) if "timeMin" in query else None
+            time_max = _parse_time(query["timeMax"]) if "timeMax" in query else None
+            single_events = query.get("singleEvents") == "true"
+            matches = []
+            for event in calendar["events"].values():
+                if event.get("recurrence"):
+                    if event["status"] == "cancelled":
+                        continue
+                    if single_events:
+                        matches.extend(self._expand(calendar, event, time_min, time_max))
+                    elif self._series_overlaps(event, time_min, time_max):
+                        matches.append(event)
+                elif event["status"] == "cancelled":
+                    # Cancelled occurrences are listed with their series
+                    master = calendar["events"].get(event.get("recurringEventId"))
+                    if not single_events and master and master["status"] != "cancelled":
+                        matches.append(event)
+                elif ((time_min is None or _event_time(event, "end") > time_min)
+                      and (time_max is None or _event_time(event, "start") < time_max)):
+                    matches.append(event)
+            if query.get("orderBy") == "startTime":
+                matches.sort(key=lambda event: _event_time(event, "start"))
+            items = [
+                self._tombstone(event) if event["status"] == "cancelled" else self._public(event)
+                for event in matches
+            ]
+
+        page = {
+            "kind": "calendar#events",
+            "summary": calendar["entry"]["summary"],
+            "timeZone": calendar["entry"]["timeZone"],
+            "items": items[offset:offset + page_size],
+        }
+        if offset + page_size < len(items):
+            page["nextPageToken"] = str(offset + page_size)
+        else:
+            page["nextSyncToken"] = str(calendar["version"])
+        return page
+
+    def get_event(self, calendar_id, event_id):
+        return self._public(self._live_event(self._calendar(calendar_id), event_id))
+
+    def insert_event(self, calendar_id, body):
+        return self._public(self._insert(calendar_id, body))
+
+    def update_event(self, calendar_id, event_id, body, headers, patch):
+        calendar = self._calendar(calendar_id)
+        event = self._live_event(calendar, event_id)
+        self._check_etag(event, headers)
+        if patch:
+            event.update({key: value for key, value in body.items() if key not in ("id", "etag")})
+        else:
+            preserved = {key: event[key] for key in event if key.startswith("_") or key in (
+                "id", "kind", "status", "htmlLink", "created")}
+            event.clear()
+            event.update(body)
+            event.update(preserved)
+        self._stamp(calendar, event)
+        return self._public(event)
+
+    def delete_event(self, calendar_id, event_id, headers):
+        calendar = self._calendar(calendar_id)
+        event = self._live_event(calendar, event_id)
+        self._check_etag(event, headers)
+        event["status"] = "cancelled"
+        self._stamp(calendar, event)
+        return None
+
+    def get_calendar(self, calendar_id):
+        entry = self._calendar(calendar_id)["entry"]
+        return {"kind": "calendar#calendar", "id": entry["id"],
+                "summary": entry["summary"], "timeZone": entry["timeZone"]}
+
+    def get_calendar_list_entry(self, calendar_id):
+        return dict(self._calendar(calendar_id)["entry"], kind="calendar#calendarListEntry")
+
+    def list_calendar_list(self):
+        return {"kind": "calendar#calendarList", "items": [
+            dict(calendar["entry"], kind="calendar#calendarListEntry")
+            for calendar in self._calendars.values()
+        ]}
+
+    def freebusy(self, body):
+        time_min = _parse_time(body["timeMin"])
+        time_max = _parse_time(body["timeMax"])
+        calendars = {}
+        for item in body.get("items", []):
+            try:
+                calendar = self._calendar(item["id"])
+            except FakeAPIError:
+                calendars[item["id"]] = {"errors": [{"domain": "global", "reason": "notFound"}], "busy": []}
+                continue
+            events = []
+            for event in calendar["events"].values():
+                if not event.get("recurrence"):
+                    events.append(event)
+                elif event["status"] != "cancelled":
+                    events.extend(self._expand(calendar, event, time_min, time_max))
+            blocks = sorted(
+                (max(_event_time(event, "start"), time_min), min(_event_time(event, "end"), time_max))
+                for event in events
+                if event["status"] != "cancelled"
+                and event.get("transparency") != "transparent"
+                and _event_time(event, "start") < time_max
+                and _event_time(event, "end") > time_min
+            )
+            merged = []
+            for start, end in blocks:
+                if merged and start <= merged[-1][1]:
+                    merged[-1][1] = max(merged[-1][1], end)
+                else:
+                    merged.append([start, end])
+            calendars[item["id"]] = {"busy": [
+                {"start": start.isoformat(), "end": end.isoformat()} for start, end in merged
+            ]}
+        return {"kind": "calendar#freeBusy", "timeMin": body["timeMin"],
+                "timeMax": body["timeMax"], "calendars": calendars}
+
+    # ----- routing ----------------------------------------------------------
+
+    _ROUTES = [
+        ("GET", re.compile(r"^/calendar/v3/calendars/([^/]+)/events$"), "list"),
+        ("POST", re.compile(r"^/calendar/v3/calendars/([^/]+)/events$"), "insert"),
+        ("GET", re.compile(r"^/calendar/v3/calendars/([^/]+)/events/([^/]+)$"), "get"),
+        ("PUT", re.compile(r"^/calendar/v3/calendars/([^/]+)/events/([^/]+)$"), "update"),
+        ("PATCH", re.compile(r"^/calendar/v3/calendars/([^/]+)/events/([^/]+)$"), "patch"),
+        ("DELETE", re.compile(r"^/calendar/v3/calendars/([^/]+)/events/([^/]+)$"), "delete"),
+        ("GET", re.compile(r"^/calendar/v3/calendars/([^/]+)$"), "calendar"),
+        ("GET", re.compile(r"^/calendar/v3/users/me/calendarList$"), "calendar_list"),
+        ("GET", re.compile(r"^/calendar/v3/users/me/calendarList/([^/]+)$"), "calendar_list_entry"),
+        ("POST", re.compile(r"^/calendar/v3/freeBusy$"), "freebusy"),
+    ]
+
+    def handle(self, method, target, headers, body):
+        """
+        Handles one (non-batch) API call.
+
+        Returns:
+            (status, extra headers, JSON-serializable body or None)
+        """
+        parsed = urllib.parse.urlsplit(target)
+        query = dict(urllib.parse.parse_qsl(parsed.query))
+        headers = {key.lower(): value for key, value in headers.items()}
+        self.stats["calls"] += 1
+
+        try:
+            self._maybe_fail()
+            for route_method, pattern, name in self._ROUTES:
+                match = pattern.match(parsed.path)
+                if route_method != method or not match:
+                    continue
+                args = [urllib.parse.unquote(group) for group in match.groups()]
+                payload = json.loads(body) if body else {}
+                with self._lock:
+                    result = self._dispatch(name, args, query, headers, payload)
+                if result is None:
+                    return 204, {}, None
+                if "fields" in query:
+                    result = _apply_field_mask(result, _parse_field_mask(query["fields"]))
+                return 200, {}, result
+            raise FakeAPIError(404, "notFound", f"No route for {method} {parsed.path}")
+        except FakeAPIError as error:
+            return error.status, error.headers, error.body()
+
+    def _dispatch(self, name, args, query, headers, payload):
+        if name == "list":
+            return self.list_events(args[0], query)
+        if name == "insert":
+            return self.insert_event(args[0], payload)
+        if name == "get":
+            return self.get_event(*args)
+        if name in ("update", "patch"):
+            return self.update_event(args[0], args[1], payload, headers, patch=name == "patch")
+        if name == "delete":
+            return self.delete_event(args[0], args[1], headers)
+        if name == "calendar":
+            return self.get_calendar(args[0])
+        if name == "calendar_list":
+            return self.list_calendar_list()
+        if name == "calendar_list_entry":
+            return self.get_calendar_list_entry(args[0])
+        if name == "freebusy":
+            return self.freebusy(payload)
+        raise FakeAPIError(404, "notFound", "Not Found")
+
+    def handle_batch(self, content_type, body):
+        """
+        Handles a multipart/mixed batch request and returns (content type, body).
+        """
+        parser = FeedParser()
+        parser.feed(f"Content-Type: {content_type}\r\n\r\n")
+        parser.feed(body.decode("utf-8"))
+        message = parser.close()
+
+        boundary = uuid.uuid4().hex
+        parts = []
+        for part in message.get_payload():
+            request_line, rest = part.get_payload().split("\n", 1)
+            method, target, _ = request_line.strip().split(" ", 2)
+            inner = FeedParser()
+            inner.feed(rest)
+            inner_message = inner.close()
+            inner_body = inner_message.get_payload() or ""
+            status, headers, result = self.handle(method, target, dict(inner_message.items()), inner_body)
+
+            content = json.dumps(result) if result is not None else ""
+            header_lines = "".join(f"{key}: {value}\r\n" for key, value in headers.items())
+            content_id = part["Content-ID"].strip("<>")
+            parts.append(
+                f"--{boundary}\r\n"
+                f"Content-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}\r\n"
+                f"Content-Type: application/json; charset=UTF-8\r\n"
+                f"{header_lines}"
+                f"Content-Length: {len(content.encode('utf-8'))}\r\n\r\n"
+                f"{content}\r\n"
+            )
+        parts.append(f"--{boundary}--\r\n")
+        return f"multipart/mixed; boundary={boundary}", "".join(parts).encode("utf-8")
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    backend = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _respond(self, status, headers, content_type, content):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(content)
+        self.backend.stats["bytes_sent"] += len(content)
+
+    def _handle(self):
+        backend = self.backend
+        backend.stats["requests"] += 1
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+
+        if backend.latency or backend.latency_jitter:
+            time.sleep(backend.latency + backend.random.uniform(0, backend.latency_jitter))
+
+        if self.command == "POST" and self.path.split("?")[0] == "/batch/calendar/v3":
+            content_type, content = backend.handle_batch(self.headers["Content-Type"], body)
+            self._respond(200, {}, content_type, content)
+            return
+
+        status, headers, result = backend.handle(
+            self.command, self.path, dict(self.headers.items()), body.decode("utf-8")
+        )
+        content = json.dumps(result).encode("utf-8") if result is not None else b""
+        self._respond(status, headers, "application/json; charset=UTF-8", content)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _handle
+
+
+def start_fake_server(backend=None, host="127.0.0.1", port=0):
+    """
+    Starts the fake API on a daemon thread.
+
+    Returns:
+        (server, root_url): call server.shutdown() to stop it; root_url is the
+        value for CALENDAR_API_ROOT, e.g. "http://127.0.0.1:51234/"
+    """
+    backend = backend or FakeCalendarBackend()
+    handler = type("FakeCalendarHandler", (_RequestHandler,), {"backend": backend})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.backend = backend
+    threading.Thread(target=server.serve_forever, name="fake-calendar", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake Google Calendar API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--events", type=int, default=1000, help="synthetic events on the primary calendar")
+    parser.add_argument("--calendars", type=int, default=1, help="total calendars, including primary")
+    parser.add_argument("--classes", type=int, default=0, help="weekly recurring class series on the primary calendar")
+    parser.add_argument("--days", type=int, default=90, help="days the synthetic events are spread over")
+    parser.add_argument("--page-size", type=int, default=250)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    backend = FakeCalendarBackend(
+        page_size=args.page_size,
+        latency=args.latency_ms / 1000,
+        latency_jitter=args.jitter_ms / 1000,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed,
+    )
+    backend.populate("primary", args.events, args.days)
+    backend.populate_classes("primary", args.classes, weeks=args.days // 7)
+    for n in range(1, args.calendars):
+        calendar_id = backend.add_calendar(f"calendar{n}@group.example.com", f"Calendar {n}")
+        backend.populate(calendar_id, args.events, args.days)
+
+    server, root_url = start_fake_server(backend, args.host, args.port)
+    print(f"Fake Calendar API listening on {root_url}")
+    print(f"Point the app at it with: CALENDAR_API_ROOT={root_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,565 @@
+"""
+Deterministic free-time search for scheduling suggestions.
+
+Finding room for a task or a conflicting event is interval arithmetic over
+the user's events: take the working hours of each day, subtract the busy
+intervals and keep the gaps long enough to use. This module does that
+locally, in milliseconds, and builds the task-split and alternative-time
+suggestions in the same JSON shapes the LLM was asked for, so the routes can
+fall back to the LLM only when nothing fits.
+
+All-day events (deadlines, holidays, reminders) don't block time in
+free_intervals unless include_all_day is set, so suggest_task_split and
+suggest_alternative_times can suggest time on the same day as one.
+nearest_free_slot, which the /schedule auto-repair uses, counts them as
+busy, as the conflict check does.
+"""
+import datetime
+import math
+import os
+import time
+
+from interval_index import IntervalIndex
+
+# Working hours searched for task splits and for alternative times
+WORKDAY_START_HOUR = 8
+SPLIT_WORKDAY_END_HOUR = 18
+ALTERNATIVE_WORKDAY_END_HOUR = 20
+
+# Blocks of a split task are at least this long, and at most this many
+MIN_BLOCK_MINUTES = 45
+MAX_SPLIT_BLOCKS = 3
+
+# How long the task-split search may take per request, in seconds; the best
+# split found so far is used when it runs out
+SPLIT_TIME_BUDGET = float(os.environ.get("SPLIT_TIME_BUDGET_MS", "50")) / 1000
+
+# Suggested start times are rounded to this grid
+SLOT_MINUTES = 15
+
+# How many days ahead (from the requested day) suggestions are searched
+SPLIT_SEARCH_DAYS = 7
+ALTERNATIVE_SEARCH_DAYS = 7
+
+# Whether Saturdays and Sundays count as working days
+SCHEDULE_WEEKENDS = os.environ.get("FREE_SLOTS_WEEKENDS", "false").lower() == "true"
+
+# Whether the routes ask the LLM when no suggestion can be found locally
+SUGGESTIONS_LLM_FALLBACK = os.environ.get("SUGGESTIONS_LLM_FALLBACK", "true").lower() != "false"
+
+_SLOT = SLOT_MINUTES * 60
+
+
+def _align_up(epoch):
+    return int(math.ceil(epoch / _SLOT) * _SLOT)
+
+
+def _align_down(epoch):
+    return int(epoch // _SLOT * _SLOT)
+
+
+def parse_time(value):
+    """Parses an ISO timestamp from a request; naive times are taken as local time."""
+    parsed = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.astimezone()
+    return parsed
+
+
+def _busy_intervals(index, time_min, time_max, exclude_ids=(), extra=(), include_all_day=False):
+    """Merged busy (start, end) epochs between time_min and time_max."""
+    intervals = [
+        (start, end)
+        for start, end, event in index.overlapping(time_min, time_max)
+        if (include_all_day or not event.all_day) and event.id not in exclude_ids
+    ]
+    intervals.extend((start, end) for start, end in extra if start < time_max and end > time_min)
+    intervals.sort()
+
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def free_intervals(events, time_min, time_max, day_end_hour=SPLIT_WORKDAY_END_HOUR,
+                   weekends=SCHEDULE_WEEKENDS, exclude_ids=(), extra_busy=(),
+                   include_all_day=False):
+    """
+    Returns the free time inside working hours between time_min and
+    time_max, as (start, end) epoch pairs in order. Starts are rounded up to
+    SLOT_MINUTES.
+
+    Args:
+        events: Event objects or an IntervalIndex of them
+        time_min, time_max: Aware datetimes; working hours are taken in
+                            time_min's time zone
+        exclude_ids: IDs of events to treat as free (e.g. one being moved)
+        extra_busy: More (start, end) epochs to treat as busy
+        include_all_day: Treat all-day events as busy too (by default they
+                         are deadlines and reminders that don't block time)
+    """
+    index = events if isinstance(events, IntervalIndex) else IntervalIndex(events)
+    tzinfo = time_min.tzinfo
+    lower = time_min.timestamp()
+    upper = time_max.timestamp()
+    busy = _busy_intervals(index, lower, upper, set(exclude_ids), extra_busy, include_all_day)
+
+    gaps = []
+    position = 0
+    day = time_min.date()
+    while day <= time_max.astimezone(tzinfo).date():
+        if weekends or day.weekday() < 5:
+            day_start = datetime.datetime.combine(day, datetime.time(WORKDAY_START_HOUR), tzinfo)
+            day_end = datetime.datetime.combine(day, datetime.time(day_end_hour), tzinfo)
+            cursor = _align_up(max(day_start.timestamp(), lower))
+            end = min(day_end.timestamp(), upper)
+
+            while position < len(busy) and busy[position][1] <= cursor:
+                position += 1
+            scan = position
+            while cursor < end:
+                if scan < len(busy) and busy[scan][0] < end:
+                    busy_start, busy_end = busy[scan]
+                    if busy_start > cursor:
+                        gaps.append((cursor, busy_start))
+                    cursor = max(cursor, _align_up(busy_end))
+                    scan += 1
+                else:
+                    gaps.append((cursor, end))
+                    break
+        day += datetime.timedelta(days=1)
+    return gaps
+
+
+def _format(epoch, tzinfo):
+    return datetime.datetime.fromtimestamp(epoch, tzinfo).isoformat()
+
+
+def _hours(seconds):
+    return round(seconds / 3600, 2)
+
+
+def _describe_shift(seconds):
+    minutes = int(abs(seconds) // 60)
+    if minutes < 120:
+        return f"{minutes} minutes"
+    return f"{minutes / 60:g} hours"
+
+
+def _day_name(day, reference):
+    offset = (day - reference).days
+    if offset == 1:
+        return "tomorrow"
+    return day.strftime("%A")
+
+
+def _day_number(epoch, tzinfo):
+    return datetime.datetime.fromtimestamp(epoch, tzinfo).date().toordinal()
+
+
+def _place_blocks(chosen, lengths):
+    """
+    Lays out blocks of the given lengths in the chosen gaps: the first ends
+    as late as its gap allows and the others start at their gap's start, so
+    the split is as compact as possible.
+    """
+    blocks = []
+    for number, ((gap_start, gap_end), length) in enumerate(zip(chosen, lengths)):
+        start = gap_start
+        if number == 0:
+            start = max(gap_start, _align_down(gap_end - length))
+        blocks.append((start, start + length))
+    return blocks
+
+
+class _LongGapFinder:
+    """
+    Finds the first gap at or after a position that is at least some length
+    long, in O(log n), from a sparse table of range maximums.
+    """
+
+    def __init__(self, lengths):
+        self.count = len(lengths)
+        self.table = [list(lengths)]
+        width = 1
+        while width * 2 <= self.count:
+            previous = self.table[-1]
+            self.table.append([
+                max(previous[index], previous[index + width])
+                for index in range(self.count - width * 2 + 1)
+            ])
+            width *= 2
+
+    def first(self, position, length):
+        """Index of the first gap from `position` on that is `length` long, or None."""
+        for level in range(len(self.table) - 1, -1, -1):
+            # Skip a run of 2^level gaps if none of them is long enough
+            if position + (1 << level) <= self.count and self.table[level][position] < length:
+                position += 1 << level
+        return position if position < self.count else None
+
+
+def solve_split(gaps, duration, tzinfo=datetime.timezone.utc, time_budget=None, stats=None):
+    """
+    Finds the best way to split `duration` seconds over free gaps: the
+    fewest blocks (2 to MAX_SPLIT_BLOCKS) of at least MIN_BLOCK_MINUTES,
+    then blocks on the same or consecutive days, then the shortest span from
+    the first block's start to the last block's end, then the earliest.
+
+    The span only depends on which gaps are used (the first block ends at
+    its gap's end, the last starts at its gap's start and any middle block
+    takes as much as it can), so the search is over gap combinations. It is
+    a branch and bound over gaps in time order: for given first (and
+    middle) gaps the best last gap is the first one long enough for the
+    rest, and first and middle gaps are skipped as soon as the smallest span
+    they could give can't beat the best split found.
+
+    Args:
+        gaps: Free (start, end) epoch pairs in time order
+        duration: Seconds to place
+        tzinfo: Time zone whose days count as the same day
+        time_budget: Seconds to search for (SPLIT_TIME_BUDGET by default);
+                     when it runs out the best split found so far is kept
+        stats: Optional dict that gets the number of gap combinations tried
+               ("nodes") and whether the budget ran out ("budget_exhausted")
+
+    Returns:
+        The (start, end) blocks, or None if no split was found.
+    """
+    minimum = MIN_BLOCK_MINUTES * 60
+    budget = SPLIT_TIME_BUDGET if time_budget is None else time_budget
+    deadline = time.monotonic() + budget
+    usable = [(start, end) for start, end in gaps if end - start >= minimum]
+    lengths = [end - start for start, end in usable]
+    days = [(_day_number(start, tzinfo), _day_number(end - 1, tzinfo)) for start, end in usable]
+    count = len(usable)
+    finder = _LongGapFinder(lengths)
+    longest = sorted(lengths, reverse=True)
+    nodes = 0
+
+    def report(blocks, exhausted=False):
+        if stats is not None:
+            stats.update(nodes=nodes, budget_exhausted=exhausted)
+        return blocks
+
+    def score(first, last, middle_length):
+        # Days beyond the next one, then span, then start
+        spread = max(0, days[last][1] - days[first][0] - 1)
+        span = usable[last][0] - usable[first][1] + duration - middle_length
+        return spread, span, usable[first][0]
+
+    for blocks in range(2, MAX_SPLIT_BLOCKS + 1):
+        if duration < blocks * minimum or sum(longest[:blocks]) < duration:
+            continue
+        largest_middle = duration - 2 * minimum if blocks > 2 else 0
+        best = None
+        for first in range(count - blocks + 1):
+            # The nearest gaps after this one give its best possible score;
+            # later firsts also start later, so ties can't win either
+            if best is not None and score(first, first + blocks - 1, largest_middle) >= best[0]:
+                continue
+            if time.monotonic() > deadline:
+                print(f"Task split search ran out of its {budget * 1000:g} ms budget")
+                return report(best[1] if best else None, exhausted=True)
+
+            for middle in ([None] if blocks == 2 else range(first + 1, count - 1)):
+                nodes += 1
+                middle_length = 0
+                if middle is not None:
+                    if best is not None and score(first, middle + 1, largest_middle) >= best[0]:
+                        break  # Later middles only push the last gap further out
+                    middle_length = min(lengths[middle], largest_middle)
+                    if middle_length < minimum:
+                        continue
+                remaining = duration - middle_length
+                # Fill the first gap as far as leaving a minimum last block allows
+                first_length = min(lengths[first], remaining - minimum)
+                last = finder.first((first if middle is None else middle) + 1, remaining - first_length)
+                if last is None:
+                    continue
+                candidate = score(first, last, middle_length)
+                if best is None or candidate < best[0]:
+                    chosen = [usable[first], usable[last]]
+                    block_lengths = [first_length, remaining - first_length]
+                    if middle is not None:
+                        chosen.insert(1, usable[middle])
+                        block_lengths.insert(1, middle_length)
+                    best = (candidate, _place_blocks(chosen, block_lengths))
+        if best is not None:
+            return report(best[1])
+    return report(None)
+
+
+def suggest_task_split(proposed_event, calendar_events, now=None):
+    """
+    Finds room for a task: the single free block closest to the preferred
+    time, or else the most compact split into 2-3 blocks of at least
+    MIN_BLOCK_MINUTES, within working hours over the next SPLIT_SEARCH_DAYS.
+
+    Args:
+        proposed_event: Dict with "summary", "start_time" and "end_time"
+        calendar_events: Event objects (or an IntervalIndex of them)
+
+    Returns:
+        {"recommendation": "single_block" or "split_task", "reason",
+        "suggested_events": [{"summary", "start_time", "end_time",
+        "duration_hours"}]}, or None if nothing fits.
+    """
+    start = parse_time(proposed_event["start_time"])
+    end = parse_time(proposed_event["end_time"])
+    duration = int((end - start).total_seconds())
+    if duration <= 0:
+        return None
+    tzinfo = start.tzinfo
+    now = now or datetime.datetime.now(tzinfo)
+    search_start = max(now, datetime.datetime.combine(start.date(), datetime.time(0), tzinfo))
+    search_end = search_start + datetime.timedelta(days=SPLIT_SEARCH_DAYS)
+
+    gaps = free_intervals(calendar_events, search_start, search_end, SPLIT_WORKDAY_END_HOUR)
+    summary = proposed_event.get("summary")
+    preferred = start.timestamp()
+
+    singles = []
+    for gap_start, gap_end in gaps:
+        if gap_end - gap_start < duration:
+            continue
+        # The start within this gap nearest the preferred time
+        candidate = min(max(gap_start, _align_down(preferred)), _align_down(gap_end - duration))
+        candidate = max(candidate, gap_start)
+        singles.append((abs(candidate - preferred), candidate))
+    if singles:
+        _, block_start = min(singles)
+        return {
+            "recommendation": "single_block",
+            "reason": f"You have a free {_hours(duration):g}-hour block, so the task can stay in one piece.",
+            "suggested_events": [{
+                "summary": summary,
+                "start_time": _format(block_start, tzinfo),
+                "end_time": _format(block_start + duration, tzinfo),
+                "duration_hours": _hours(duration),
+            }],
+        }
+
+    blocks = solve_split(gaps, duration, tzinfo)
+    if blocks is None:
+        return None
+
+    return {
+        "recommendation": "split_task",
+        "reason": (
+            f"There is no free {_hours(duration):g}-hour block between "
+            f"{WORKDAY_START_HOUR} AM and {SPLIT_WORKDAY_END_HOUR - 12} PM, so the task is split "
+            f"into the {len(blocks)} closest gaps."
+        ),
+        "suggested_events": [
+            {
+                "summary": f"{summary} (Part {number} of {len(blocks)})",
+                "start_time": _format(block_start, tzinfo),
+                "end_time": _format(block_end, tzinfo),
+                "duration_hours": _hours(block_end - block_start),
+            }
+            for number, (block_start, block_end) in enumerate(blocks, 1)
+        ],
+    }
+
+
+def _nearest_slots(gaps, start, duration, tzinfo):
+    """
+    Returns (earlier, later): the latest start before `start` and the
+    earliest start after it, on the same day, where `duration` seconds fit
+    in a gap. Either may be None.
+    """
+    day = datetime.datetime.fromtimestamp(start, tzinfo).date()
+    earlier = later = None
+    for gap_start, gap_end in gaps:
+        if datetime.datetime.fromtimestamp(gap_start, tzinfo).date() != day:
+            continue
+        candidate = min(_align_down(gap_end - duration), _align_down(start - 1))
+        if candidate >= gap_start:
+            earlier = candidate if earlier is None else max(earlier, candidate)
+        candidate = max(gap_start, _align_up(start + 1))
+        if candidate + duration <= gap_end and later is None:
+            later = candidate
+    return earlier, later
+
+
+def _other_day_slot(gaps, start, duration, tzinfo):
+    """
+    Returns the first later day's start for `duration`: the same clock time
+    if it is free, otherwise that day's free slot nearest to it. Returns
+    (start epoch, True if same time) or None.
+    """
+    requested = datetime.datetime.fromtimestamp(start, tzinfo)
+    by_day = {}
+    for gap_start, gap_end in gaps:
+        day = datetime.datetime.fromtimestamp(gap_start, tzinfo).date()
+        if day > requested.date():
+            by_day.setdefault(day, []).append((gap_start, gap_end))
+
+    for day in sorted(by_day):
+        same_time = datetime.datetime.combine(day, requested.time(), tzinfo).timestamp()
+        options = []
+        for gap_start, gap_end in by_day[day]:
+            if gap_end - gap_start < duration:
+                continue
+            candidate = min(max(gap_start, same_time), _align_down(gap_end - duration))
+            candidate = max(candidate, gap_start)
+            options.append((abs(candidate - same_time), candidate))
+        if options:
+            distance, candidate = min(options)
+            return candidate, distance == 0
+    return None
+
+
+def _moves(gaps, start, duration, tzinfo):
+    """
+    Returns the earlier, later and other-day moves for one slot, as
+    (direction, new start, description) where the description reads like
+    "60 minutes earlier" or "the same time tomorrow".
+    """
+    moves = []
+    earlier, later = _nearest_slots(gaps, start, duration, tzinfo)
+    if earlier is not None:
+        moves.append(("earlier", earlier, f"{_describe_shift(start - earlier)} earlier"))
+    if later is not None:
+        moves.append(("later", later, f"{_describe_shift(later - start)} later"))
+
+    other = _other_day_slot(gaps, start, duration, tzinfo)
+    if other:
+        candidate, same_time = other
+        day = datetime.datetime.fromtimestamp(candidate, tzinfo)
+        name = _day_name(day.date(), datetime.datetime.fromtimestamp(start, tzinfo).date())
+        if name != "tomorrow":
+            name = f"on {name}"
+        if same_time:
+            description = f"the same time {name}"
+        else:
+            description = f"{name} at {day.strftime('%I:%M %p').lstrip('0')}"
+        moves.append(("to different day", candidate, description))
+    return moves
+
+
+def nearest_free_slot(start, end, calendar_events, extra_busy=(), now=None):
+    """
+    Finds the free slot for an event that is nearest its requested time,
+    earlier or later, within working hours (ALTERNATIVE_WORKDAY_END_HOUR)
+    from the requested day over the next ALTERNATIVE_SEARCH_DAYS.
+
+    All-day events count as busy here, as they do for
+    conflict_matrix.plan_conflicts, so the slot found is one that check
+    accepts.
+
+    Args:
+        start, end: Aware datetimes of the requested slot
+        calendar_events: Event objects (or an IntervalIndex of them)
+        extra_busy: More (start, end) epochs to avoid, e.g. the rest of a plan
+
+    Returns:
+        (start, end) aware datetimes in start's time zone, or None.
+    """
+    tzinfo = start.tzinfo
+    now = now or datetime.datetime.now(tzinfo)
+    duration = int((end - start).total_seconds())
+    if duration <= 0:
+        return None
+    search_start = max(now, datetime.datetime.combine(start.date(), datetime.time(0), tzinfo))
+    search_end = search_start + datetime.timedelta(days=ALTERNATIVE_SEARCH_DAYS + 1)
+    gaps = free_intervals(
+        calendar_events, search_start, search_end, ALTERNATIVE_WORKDAY_END_HOUR,
+        extra_busy=extra_busy, include_all_day=True,
+    )
+
+    requested = start.timestamp()
+    best = None
+    for gap_start, gap_end in gaps:
+        if gap_end - gap_start < duration:
+            continue
+        candidate = min(max(gap_start, _align_down(requested)), _align_down(gap_end - duration))
+        candidate = max(candidate, gap_start)
+        if best is None or abs(candidate - requested) < abs(best - requested):
+            best = candidate
+    if best is None:
+        return None
+    return (
+        datetime.datetime.fromtimestamp(best, tzinfo),
+        datetime.datetime.fromtimestamp(best + duration, tzinfo),
+    )
+
+
+def suggest_alternative_times(proposed_event, conflicting_events, calendar_events, now=None):
+    """
+    Suggests free times for a conflicting new event (earlier or later the
+    same day, or another day), and for moving the events it conflicts with
+    while the new event keeps its time, within working hours
+    (ALTERNATIVE_WORKDAY_END_HOUR) over the next ALTERNATIVE_SEARCH_DAYS.
+
+    Args:
+        proposed_event: Dict with "summary", "start_time" and "end_time"
+        conflicting_events: Conflicts as detect_conflicts returns them
+        calendar_events: Event objects (or an IntervalIndex of them)
+
+    Returns:
+        {"new_event_alternatives": [{"option", "start_time", "end_time",
+        "reason"}], "existing_event_alternatives": [{"option",
+        "existing_event_id", "existing_event_title", "new_start_time",
+        "new_end_time", "reason"}]}
+    """
+    start = parse_time(proposed_event["start_time"])
+    end = parse_time(proposed_event["end_time"])
+    tzinfo = start.tzinfo
+    now = now or datetime.datetime.now(tzinfo)
+    index = calendar_events if isinstance(calendar_events, IntervalIndex) else IntervalIndex(calendar_events)
+    search_start = max(now, datetime.datetime.combine(start.date(), datetime.time(0), tzinfo))
+    search_end = search_start + datetime.timedelta(days=ALTERNATIVE_SEARCH_DAYS + 1)
+    duration = int((end - start).total_seconds())
+
+    result = {"new_event_alternatives": [], "existing_event_alternatives": []}
+    if duration <= 0:
+        return result
+
+    gaps = free_intervals(index, search_start, search_end, ALTERNATIVE_WORKDAY_END_HOUR)
+    for direction, candidate, description in _moves(gaps, start.timestamp(), duration, tzinfo):
+        if direction == "to different day":
+            reason = description[0].upper() + description[1:]
+        else:
+            reason = description.replace("earlier", "before").replace("later", "after")
+            reason += " your requested time"
+        result["new_event_alternatives"].append({
+            "option": f"Move new event {direction}",
+            "start_time": _format(candidate, tzinfo),
+            "end_time": _format(candidate + duration, tzinfo),
+            "reason": reason,
+        })
+
+    # Moving an existing event: everything else stays, and the new event
+    # takes its requested time
+    proposed_busy = [(start.timestamp(), end.timestamp())]
+    alternatives = result["existing_event_alternatives"]
+    for conflict in conflicting_events:
+        existing = conflict.get("existing_event", {})
+        if not existing.get("id") or "T" not in (existing.get("start_time") or ""):
+            continue  # Anonymous busy time, or an all-day event
+        existing_start = parse_time(existing["start_time"]).timestamp()
+        existing_duration = int(parse_time(existing["end_time"]).timestamp() - existing_start)
+        gaps = free_intervals(
+            index, search_start, search_end, ALTERNATIVE_WORKDAY_END_HOUR,
+            exclude_ids=(existing["id"],), extra_busy=proposed_busy,
+        )
+        title = existing.get("summary")
+        for direction, candidate, description in _moves(gaps, existing_start, existing_duration, tzinfo):
+            alternatives.append({
+                "option": f"Move existing event {direction}",
+                "existing_event_id": existing["id"],
+                "existing_event_title": title,
+                "new_start_time": _format(candidate, tzinfo),
+                "new_end_time": _format(candidate + existing_duration, tzinfo),
+                "reason": f"Move {title} {'to ' if direction == 'to different day' else ''}{description}",
+            })
+        if len(alternatives) >= 3:
+            break
+    del alternatives[3:]
+    return result
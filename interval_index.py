@@ -0,0 +1,111 @@
+"""
+In-memory interval index over calendar events, for conflict detection.
+
+Events are kept in a list sorted by start time. An overlap query binary
+searches the window of starts that can reach the query range: nothing that
+starts after the range ends can overlap it, and nothing that starts more
+than the longest event's duration before it can still be running. Rare very
+long events (all-day and multi-day ones) are kept in a separate short list so
+they don't widen that window for everything else. Queries therefore cost
+O(log M + k) for M indexed events and k candidates, and single events can be
+added or removed without rebuilding the index.
+
+An index can be shared between threads while one of them adds and removes
+events (as the cached event windows do): every change is a single list or
+dict operation, so a query sees the index either before or after it.
+"""
+import bisect
+import itertools
+
+from event_model import Event
+
+# Events longer than this (in seconds) go in the separate long-event list
+LONG_EVENT_SECONDS = 12 * 3600
+
+
+def _as_event(event):
+    return event if isinstance(event, Event) else Event.from_google(event)
+
+
+class IntervalIndex:
+    """
+    Sorted-array interval index of events.
+
+    Args:
+        events: Event objects (or Google event dicts, which are converted) to
+                index; events without usable times are skipped
+    """
+
+    def __init__(self, events=()):
+        self._sequence = itertools.count()
+        self._rows = []  # (start_epoch, sequence, end_epoch, event), sorted
+        self._long = {}  # sequence -> (start_epoch, end_epoch, event)
+        self._by_id = {}  # event id -> [(start_epoch, sequence)], one per copy
+        self._max_duration = 0.0
+
+        rows = [
+            (event.start, next(self._sequence), event.end, event)
+            for event in map(_as_event, events)
+            if event
+        ]
+        rows.sort(key=lambda row: row[:2])
+        for start, sequence, end, event in rows:
+            self._place(start, sequence, end, event, append=True)
+
+    def __len__(self):
+        return len(self._rows) + len(self._long)
+
+    def _place(self, start, sequence, end, event, append=False):
+        if end - start > LONG_EVENT_SECONDS:
+            self._long[sequence] = (start, end, event)
+        else:
+            self._max_duration = max(self._max_duration, end - start)
+            if append:
+                self._rows.append((start, sequence, end, event))
+            else:
+                position = bisect.bisect_left(self._rows, (start, sequence))
+                self._rows.insert(position, (start, sequence, end, event))
+        if event.id:
+            # The same event can be on several calendars
+            self._by_id.setdefault(event.id, []).append((start, sequence))
+
+    def add(self, event):
+        """
+        Indexes one more event, replacing any with the same ID. Returns False
+        if it has no usable times.
+        """
+        event = _as_event(event)
+        if not event:
+            return False
+        self.remove(event.id)
+        self._place(event.start, next(self._sequence), event.end, event)
+        return True
+
+    def remove(self, event_id):
+        """Drops an event (every copy of it) by ID. Returns True if it was indexed."""
+        located = self._by_id.pop(event_id, None) if event_id else None
+        if not located:
+            return False
+        for start, sequence in located:
+            if self._long.pop(sequence, None) is None:
+                del self._rows[bisect.bisect_left(self._rows, (start, sequence))]
+        return True
+
+    def overlapping(self, start, end):
+        """
+        Returns (start_epoch, end_epoch, Event) for every indexed event
+        overlapping [start, end) (epoch seconds), ordered by start.
+        """
+        low = bisect.bisect_left(self._rows, (start - self._max_duration,))
+        high = bisect.bisect_left(self._rows, (end,))
+        matches = [
+            (row_start, row_end, event)
+            for row_start, _, row_end, event in self._rows[low:high]
+            if row_end > start
+        ]
+        if self._long:
+            matches.extend(
+                entry for entry in list(self._long.values()) if entry[0] < end and entry[1] > start
+            )
+            matches.sort(key=lambda entry: entry[0])
+        return matches
@@ -3,6 +3,7 @@ import json
 import google.generativeai as genai
 from datetime import datetime
 import duration_feedback
+from single_flight import CoalescingCache, SingleFlight
 
 # IMPORTANT: The user must set their Gemini API key as an environment variable.
 API_KEY = os.getenv("GEMINI_API_KEY")
@@ -12,6 +13,49 @@ if not API_KEY:
 
 genai.configure(api_key=API_KEY)
 
+# How long the answer to an identical suggestion prompt is reused
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "300"))
+
+_response_cache = CoalescingCache(maxsize=256, ttl=LLM_CACHE_TTL_SECONDS)
+_in_flight = SingleFlight()
+
+
+def _generate(model, prompt, cache=False):
+    """
+    Returns the model's text response to a prompt. Identical prompts sent
+    at the same time share one model call; with `cache`, the answer is also
+    reused for LLM_CACHE_TTL_SECONDS (if it is valid JSON).
+    """
+    key = (model.model_name, prompt)
+    if cache:
+        return _response_cache.get(
+            key, lambda: model.generate_content(prompt).text, cache_if=_is_json_response
+        )
+    return _in_flight.do(key, lambda: model.generate_content(prompt).text)
+
+
+def _is_json_response(text):
+    """True if a response parses as JSON, so malformed answers aren't reused."""
+    try:
+        json.loads(text.strip().replace("```json", "").replace("```", "").strip())
+        return True
+    except (json.JSONDecodeError, AttributeError):
+        return False
+
+
+def _current_time():
+    # Rounded to the minute so that repeated requests produce identical prompts
+    return datetime.now().replace(second=0, microsecond=0).isoformat()
+
+def simplify_events(calendar_events):
+    """
+    Reduces Event objects to the title and times the prompts need.
+    """
+    return [
+        {"summary": event.summary or "No Title", "start": event.start_iso, "end": event.end_iso}
+        for event in calendar_events
+    ]
+
 def generate_study_plan(user_text, calendar_events):
     """
     Uses the Gemini model to act as a proactive planner, creating a study plan.
@@ -19,17 +63,10 @@ def generate_study_plan(user_text, calendar_events):
     """
     model = genai.GenerativeModel('gemini-2.5-flash')
 
-    simplified_events = [
-        {
-            "summary": event.get("summary", "No Title"),
-            "start": event.get("start", {}).get("dateTime", event.get("start", {}).get("date")),
-            "end": event.get("end", {}).get("dateTime", event.get("end", {}).get("date")),
-        }
-        for event in calendar_events
-    ]
+    simplified_events = simplify_events(calendar_events)
 
     events_json_string = json.dumps(simplified_events, indent=2)
-    now = datetime.now().isoformat()
+    now = _current_time()
     
     # Get learned feedback to improve duration estimates
     learned_patterns = duration_feedback.get_feedback_summary()
@@ -109,6 +146,7 @@ def generate_study_plan(user_text, calendar_events):
     - "end_time": The end time in ISO 8601 format.
     - "is_split": (optional) true if this is part of a split task, false or omitted otherwise
     - "split_info": (optional) a description like "Part 1 of 3" if this is a split task
+    - "user_specified_time": true if the user gave the exact time for this event (e.g. "tomorrow at 2pm"), false if you chose the time
     - "recurrence": (optional) object with recurrence pattern if this is a recurring event:
         {{
             "frequency": "DAILY" | "WEEKLY" | "MONTHLY" | "YEARLY",
@@ -127,11 +165,12 @@ def generate_study_plan(user_text, calendar_events):
     - Default recurring events to 10 occurrences if no end specified
     """
 
+    response_text = None
     try:
-        response = model.generate_content(prompt)
-        cleaned_response = response.text.strip().replace("```json", "").replace("```", "").strip()
+        response_text = _generate(model, prompt)
+        cleaned_response = response_text.strip().replace("```json", "").replace("```", "").strip()
 
-        print(f"LLM Planner Raw Response: {response.text}")
+        print(f"LLM Planner Raw Response: {response_text}")
         print(f"Cleaned Response for JSON parsing: {cleaned_response}")
 
         plan = json.loads(cleaned_response)
@@ -139,7 +178,7 @@ def generate_study_plan(user_text, calendar_events):
 
     except (json.JSONDecodeError, Exception) as e:
         print(f"An error occurred while parsing the LLM planner response: {e}")
-        print(f"Raw response was: {response.text}")
+        print(f"Raw response was: {response_text}")
         return []
 
 
@@ -150,17 +189,10 @@ def suggest_task_split(proposed_event, calendar_events):
     """
     model = genai.GenerativeModel('gemini-2.5-flash')
     
-    simplified_events = [
-        {
-            "summary": event.get("summary", "No Title"),
-            "start": event.get("start", {}).get("dateTime", event.get("start", {}).get("date")),
-            "end": event.get("end", {}).get("dateTime", event.get("end", {}).get("date")),
-        }
-        for event in calendar_events
-    ]
+    simplified_events = simplify_events(calendar_events)
     
     events_json_string = json.dumps(simplified_events, indent=2)
-    now = datetime.now().isoformat()
+    now = _current_time()
     
     # Calculate task duration
     from datetime import datetime as dt
@@ -215,11 +247,12 @@ def suggest_task_split(proposed_event, calendar_events):
     If recommending a single block, return 1 event. If splitting, return 2-3 events that sum to {duration_hours} hours total.
     """
     
+    response_text = None
     try:
-        response = model.generate_content(prompt)
-        cleaned_response = response.text.strip().replace("```json", "").replace("```", "").strip()
+        response_text = _generate(model, prompt, cache=True)
+        cleaned_response = response_text.strip().replace("```json", "").replace("```", "").strip()
         
-        print(f"Task Split Suggestion Raw Response: {response.text}")
+        print(f"Task Split Suggestion Raw Response: {response_text}")
         print(f"Cleaned Response: {cleaned_response}")
         
         suggestion = json.loads(cleaned_response)
@@ -227,7 +260,7 @@ def suggest_task_split(proposed_event, calendar_events):
         
     except (json.JSONDecodeError, Exception) as e:
         print(f"Error generating task split suggestion: {e}")
-        print(f"Raw response was: {response.text}")
+        print(f"Raw response was: {response_text}")
         return {
             "recommendation": "single_block",
             "reason": "Error occurred, defaulting to original request",
@@ -241,18 +274,11 @@ def suggest_alternative_times(proposed_event, conflicting_events, calendar_event
     """
     model = genai.GenerativeModel('gemini-2.5-flash')
 
-    simplified_events = [
-        {
-            "summary": event.get("summary", "No Title"),
-            "start": event.get("start", {}).get("dateTime", event.get("start", {}).get("date")),
-            "end": event.get("end", {}).get("dateTime", event.get("end", {}).get("date")),
-        }
-        for event in calendar_events
-    ]
+    simplified_events = simplify_events(calendar_events)
 
     events_json_string = json.dumps(simplified_events, indent=2)
     conflicts_json = json.dumps(conflicting_events, indent=2)
-    now = datetime.now().isoformat()
+    now = _current_time()
 
     prompt = f"""
     You are an intelligent scheduling assistant. A user tried to schedule an event but it conflicts with existing events. 
@@ -339,11 +365,12 @@ def suggest_alternative_times(proposed_event, conflicting_events, calendar_event
     }}
     """
 
+    response_text = None
     try:
-        response = model.generate_content(prompt)
-        cleaned_response = response.text.strip().replace("```json", "").replace("```", "").strip()
+        response_text = _generate(model, prompt, cache=True)
+        cleaned_response = response_text.strip().replace("```json", "").replace("```", "").strip()
 
-        print(f"Alternative Times Raw Response: {response.text}")
+        print(f"Alternative Times Raw Response: {response_text}")
         print(f"Cleaned Response: {cleaned_response}")
 
         suggestions = json.loads(cleaned_response)
@@ -351,7 +378,7 @@ def suggest_alternative_times(proposed_event, conflicting_events, calendar_event
 
     except (json.JSONDecodeError, Exception) as e:
         print(f"Error generating alternative times: {e}")
-        print(f"Raw response was: {response.text}")
+        print(f"Raw response was: {response_text}")
         return {"new_event_alternatives": [], "existing_event_alternatives": []}
 
 
@@ -363,8 +390,7 @@ def generate_text(prompt):
     model = genai.GenerativeModel('gemini-2.5-flash')
     
     try:
-        response = model.generate_content(prompt)
-        return response.text.strip()
+        return _generate(model, prompt).strip()
     except Exception as e:
         print(f"Error generating text: {e}")
         raise
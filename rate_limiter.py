@@ -0,0 +1,117 @@
+"""
+Client-side rate limiting and retry scheduling for Google API calls.
+Keeps bursts of calendar writes under our quota instead of letting them fail
+with 403 rateLimitExceeded, and spaces out retries of transient errors.
+"""
+import email.utils
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: allows `rate` calls per second on average and
+    bursts of up to `capacity` calls.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens=1):
+        """
+        Takes `tokens` from the bucket, blocking until they are available.
+        Returns the number of seconds spent waiting.
+
+        A request for more than the bucket holds takes a full bucket and
+        leaves it in debt, then waits until the debt is repaid, so it is
+        paced like the same number of single calls.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                needed = min(tokens, self.capacity)
+                if self._tokens >= needed:
+                    self._tokens -= tokens
+                    debt = -self._tokens / self.rate if self._tokens < 0 else 0.0
+                    break
+                delay = (needed - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+        if debt:
+            time.sleep(debt)
+        return waited + debt
+
+
+class CallStats:
+    """Thread-safe counters for monitoring API call behaviour."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {
+            "calls": 0,
+            "retries": 0,
+            "failures": 0,
+            "throttled": 0,
+            "throttle_wait_seconds": 0.0,
+            "errors_by_status": {},
+        }
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def record_error(self, status):
+        with self._lock:
+            by_status = self._counters["errors_by_status"]
+            by_status[str(status)] = by_status.get(str(status), 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            snapshot = dict(self._counters)
+            snapshot["errors_by_status"] = dict(self._counters["errors_by_status"])
+            snapshot["throttle_wait_seconds"] = round(snapshot["throttle_wait_seconds"], 3)
+            return snapshot
+
+
+def parse_retry_after(value):
+    """
+    Parses a Retry-After header (seconds or an HTTP date) into seconds.
+    Returns None if the header is missing or malformed.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt, base=0.5, cap=32.0, retry_after=None):
+    """
+    Exponential backoff with full jitter for the given (0-based) retry attempt.
+    A server-provided Retry-After always wins if it asks us to wait longer.
+    """
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
@@ -0,0 +1,217 @@
+"""
+Local expansion of recurring Google Calendar events.
+
+Instead of asking Google for every instance of a recurring event
+(singleEvents=True), the sync store keeps the recurring "master" event and
+its exceptions, and occurrences are generated here only for the window a
+caller asks about. Parsed recurrence rules are cached per master (keyed by
+its etag), so repeated lookups reuse both the parse and the occurrences
+already generated.
+"""
+import datetime
+import re
+import threading
+import zoneinfo
+
+from cachetools import LRUCache
+from dateutil import rrule
+
+# Number of parsed recurring series kept in memory
+SERIES_CACHE_SIZE = 1024
+
+_UNTIL = re.compile(r"UNTIL=(\d{8})(T\d{6})?(Z)?")
+_BOUND = re.compile(r"[:;](COUNT|UNTIL)=")
+
+
+def _parse_datetime(value):
+    return datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _local_midnight(value):
+    """All-day dates are treated as local midnight, like _event_bounds in calendar_client."""
+    return datetime.datetime.fromisoformat(value).astimezone()
+
+
+def _zone(name, fallback):
+    try:
+        return zoneinfo.ZoneInfo(name) if name else fallback
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+        return fallback
+
+
+def _normalize_until(line, tzinfo):
+    """
+    Rewrites UNTIL so dateutil accepts it: UTC for timed series, floating
+    (naive) for all-day series.
+    """
+    def replace(match):
+        date, time, utc = match.groups()
+        if tzinfo is None:
+            return f"UNTIL={date}{time or ''}"
+        if utc:
+            return match.group(0)
+        until = datetime.datetime.strptime(date + (time or "T235959"), "%Y%m%dT%H%M%S")
+        until = until.replace(tzinfo=tzinfo).astimezone(datetime.timezone.utc)
+        return f"UNTIL={until:%Y%m%dT%H%M%S}Z"
+
+    return _UNTIL.sub(replace, line)
+
+
+def original_start_epoch(original_start):
+    """
+    Returns the epoch of an event's originalStartTime ({"dateTime"} or
+    {"date"}), matching the occurrence start generated by RecurringSeries.
+    """
+    if original_start.get("dateTime"):
+        return _parse_datetime(original_start["dateTime"]).timestamp()
+    return _local_midnight(original_start["date"]).timestamp()
+
+
+def parse_instance_id(event_id):
+    """
+    Splits a Google instance ID ("<master id>_20261020T150000Z" or
+    "<master id>_20261020") into (master id, original start epoch).
+    Returns None for IDs that are not instance IDs.
+    """
+    master_id, _, stamp = event_id.rpartition("_")
+    if not master_id:
+        return None
+    try:
+        if len(stamp) == 16 and stamp.endswith("Z"):
+            start = datetime.datetime.strptime(stamp, "%Y%m%dT%H%M%SZ")
+            return master_id, start.replace(tzinfo=datetime.timezone.utc).timestamp()
+        if len(stamp) == 8:
+            return master_id, datetime.datetime.strptime(stamp, "%Y%m%d").astimezone().timestamp()
+    except ValueError:
+        pass
+    return None
+
+
+class RecurringSeries:
+    """
+    A recurring master event with its RRULE/RDATE/EXDATE lines parsed once.
+    Occurrences are generated lazily and remembered by dateutil, so asking
+    for a later window only computes the occurrences not seen before.
+    """
+
+    def __init__(self, master):
+        self.master = master
+        start = master["start"]
+        end = master["end"]
+        self.all_day = not start.get("dateTime")
+        self.time_zone = start.get("timeZone")
+
+        if self.all_day:
+            dtstart = datetime.datetime.fromisoformat(start["date"])
+            self.duration = datetime.datetime.fromisoformat(end["date"]) - dtstart
+            tzinfo = None
+        else:
+            first_start = _parse_datetime(start["dateTime"])
+            # Expand in the event's own time zone so occurrences keep their
+            # wall-clock time across daylight saving changes
+            tzinfo = _zone(self.time_zone, first_start.tzinfo)
+            dtstart = first_start.astimezone(tzinfo)
+            self.duration = _parse_datetime(end["dateTime"]) - first_start
+
+        self.dtstart = dtstart
+        lines = [
+            _normalize_until(line, tzinfo)
+            for line in master.get("recurrence", [])
+            if line.split(":", 1)[0].split(";", 1)[0] in ("RRULE", "RDATE", "EXDATE")
+        ]
+        self.rules = rrule.rrulestr("\n".join(lines), dtstart=dtstart, forceset=True, cache=True)
+        # The series ends if every RRULE has a COUNT or UNTIL (RDATEs are finite)
+        self.bounded = all(_BOUND.search(line) for line in lines if line.startswith("RRULE"))
+
+    def _to_rule_time(self, value):
+        # All-day series are expanded on naive local dates
+        if self.all_day:
+            return value.astimezone().replace(tzinfo=None)
+        return value
+
+    def _bounds(self, occurrence):
+        if self.all_day:
+            start = occurrence.astimezone()
+            return start, (occurrence + self.duration).astimezone()
+        return occurrence, occurrence + self.duration
+
+    def last_end(self):
+        """
+        Returns when the last occurrence ends, or None if the series never ends.
+        """
+        if not self.bounded:
+            return None
+        last = self.dtstart
+        for last in self.rules:
+            pass
+        return self._bounds(last)[1]
+
+    def _instance(self, occurrence):
+        """Builds the event dict Google would return for one occurrence."""
+        event = {key: value for key, value in self.master.items() if key not in ("recurrence", "etag")}
+        event["recurringEventId"] = self.master["id"]
+        end = occurrence + self.duration
+        if self.all_day:
+            event["id"] = f"{self.master['id']}_{occurrence:%Y%m%d}"
+            event["start"] = {"date": occurrence.date().isoformat()}
+            event["end"] = {"date": end.date().isoformat()}
+        else:
+            stamp = occurrence.astimezone(datetime.timezone.utc)
+            event["id"] = f"{self.master['id']}_{stamp:%Y%m%dT%H%M%SZ}"
+            event["start"] = {"dateTime": occurrence.isoformat(), "timeZone": self.time_zone}
+            event["end"] = {"dateTime": end.isoformat(), "timeZone": self.time_zone}
+        event["originalStartTime"] = dict(event["start"])
+        return event
+
+    def entries_in_range(self, time_min, time_max, skip_starts=()):
+        """
+        Returns (start, end, event) entries for the occurrences overlapping
+        [time_min, time_max), ordered by start.
+
+        Args:
+            skip_starts: Start epochs of occurrences to leave out (exceptions
+                         that were moved, edited or cancelled)
+        """
+        occurrences = self.rules.between(
+            self._to_rule_time(time_min - self.duration),
+            self._to_rule_time(time_max),
+            inc=True,
+        )
+        entries = []
+        for occurrence in occurrences:
+            start, end = self._bounds(occurrence)
+            if start >= time_max or end <= time_min or start.timestamp() in skip_starts:
+                continue
+            entries.append((start, end, self._instance(occurrence)))
+        return entries
+
+
+_series_cache = LRUCache(maxsize=SERIES_CACHE_SIZE)
+_series_lock = threading.Lock()
+
+
+def get_series(calendar_id, master):
+    """
+    Returns the cached RecurringSeries for a master event, parsing it again
+    only when the master changes (new etag). Returns None if its recurrence
+    can't be parsed.
+    """
+    key = (
+        calendar_id,
+        master["id"],
+        master.get("etag") or repr((master.get("recurrence"), master.get("start"), master.get("end"))),
+    )
+    with _series_lock:
+        series = _series_cache.get(key)
+    if series is not None:
+        return series
+
+    try:
+        series = RecurringSeries(master)
+    except (KeyError, ValueError, TypeError) as error:
+        print(f"Could not expand recurring event {master.get('id')}: {error}")
+        return None
+
+    with _series_lock:
+        _series_cache[key] = series
+    return series
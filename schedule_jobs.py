@@ -0,0 +1,170 @@
+"""
+Background jobs for long scheduling requests.
+
+Planning a request means fetching the calendar, calling the LLM, checking
+conflicts and inserting events, which can take tens of seconds. In job mode
+the request only enqueues that work on a local worker pool and returns a job
+ID; the client polls the job, which reports each stage as it runs and the
+outcome of every planned event.
+"""
+import concurrent.futures
+import datetime
+import os
+import threading
+import traceback
+import uuid
+
+# Threads running scheduling jobs; jobs beyond this wait in the queue
+SCHEDULE_JOB_WORKERS = int(os.environ.get("SCHEDULE_JOB_WORKERS", "4"))
+
+# How long finished jobs can still be polled
+SCHEDULE_JOB_RETENTION = datetime.timedelta(hours=1)
+
+# Stages of a scheduling job, in the order they run
+STAGES = ("context", "planning", "conflicts", "inserts")
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+class ScheduleJob:
+    """
+    Progress and outcome of one scheduling request. Stage and event updates
+    may come from a worker thread while the job is being polled.
+
+    Attributes:
+        status: "queued", "running", "succeeded" or "failed"
+        result, http_status: The response the synchronous endpoint would
+                             have returned, once the job has finished
+    """
+
+    def __init__(self, owner=None):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.status = "queued"
+        self.created_at = _now()
+        self.finished_at = None
+        self.result = None
+        self.http_status = None
+        self._stages = {name: {"status": "pending"} for name in STAGES}
+        self._events = []
+        self._lock = threading.Lock()
+
+    def start_stage(self, name):
+        with self._lock:
+            self._stages[name] = {"status": "running", "started_at": _now().isoformat()}
+
+    def finish_stage(self, name, **details):
+        """Marks a stage done, with details such as counts to report."""
+        with self._lock:
+            stage = self._stages[name]
+            stage.update(details)
+            stage["status"] = "done"
+            stage["finished_at"] = _now().isoformat()
+
+    def record_event(self, event, outcome, **details):
+        """
+        Records what happened to one planned event: "created", "conflict",
+        "repaired" (moved off a conflict) or "failed", with details such as
+        the conflicts or error.
+        """
+        with self._lock:
+            self._events.append({
+                "summary": event.get("summary"),
+                "start_time": event.get("start_time"),
+                "end_time": event.get("end_time"),
+                "outcome": outcome,
+                **details,
+            })
+
+    def finish(self, result, http_status):
+        with self._lock:
+            self.result = result
+            self.http_status = http_status
+            self.status = "succeeded" if http_status < 500 else "failed"
+            self.finished_at = _now()
+            for stage in self._stages.values():
+                if stage["status"] == "running":
+                    stage["status"] = "failed"
+                elif stage["status"] == "pending":
+                    stage["status"] = "skipped"
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "status": self.status,
+                "created_at": self.created_at.isoformat(),
+                "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+                "stages": {name: dict(stage) for name, stage in self._stages.items()},
+                "events": [dict(event) for event in self._events],
+                "result": self.result,
+                "http_status": self.http_status,
+            }
+
+
+class JobQueue:
+    """
+    Runs jobs on a thread pool and keeps them (for SCHEDULE_JOB_RETENTION
+    after they finish) so their owners can poll them.
+    """
+
+    def __init__(self, workers=SCHEDULE_JOB_WORKERS):
+        self._pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="schedule-job"
+        )
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, owner, function, *args):
+        """
+        Queues function(job, *args), which must return (result, http_status),
+        and returns the new ScheduleJob.
+        """
+        job = ScheduleJob(owner)
+        with self._lock:
+            self._expire()
+            self._jobs[job.id] = job
+        self._pool.submit(self._run, job, function, args)
+        return job
+
+    def _run(self, job, function, args):
+        with job._lock:
+            job.status = "running"
+        try:
+            result, http_status = function(job, *args)
+        except Exception as error:
+            traceback.print_exc()
+            result, http_status = {"error": f"Scheduling failed: {error}"}, 500
+        job.finish(result, http_status)
+
+    def get(self, job_id, owner=None):
+        """Returns a job if it exists and belongs to `owner`, else None."""
+        with self._lock:
+            self._expire()
+            job = self._jobs.get(job_id)
+        if job is None or job.owner != owner:
+            return None
+        return job
+
+    def _expire(self):
+        cutoff = _now() - SCHEDULE_JOB_RETENTION
+        for job_id in [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at and job.finished_at < cutoff
+        ]:
+            del self._jobs[job_id]
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Returns the process-wide JobQueue, starting it on first use."""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue()
+        return _job_queue
@@ -0,0 +1,126 @@
+"""
+Request coalescing and thread-safe caching for upstream calls.
+
+Under a threaded server a burst of requests that all miss the same cache key
+would otherwise all call Google (or the LLM) at once. SingleFlight lets the
+first caller for a key do the call while the others wait for its result, and
+CoalescingCache puts a locked TTL cache in front of that, so each key costs
+one upstream call however many requests ask for it at the same time.
+"""
+import threading
+
+from cachetools import TTLCache
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time. Callers arriving while a call
+    for their key is running wait for it and get its result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.shared = 0  # Calls answered by joining another caller's
+
+    def do(self, key, function):
+        """
+        Returns function(), or the result of the call already running for
+        `key`.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+            return call.result
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class CoalescingCache:
+    """
+    TTL cache, safe to use from many threads, whose misses go through a
+    SingleFlight so concurrent misses for a key share one load.
+
+    Args:
+        maxsize: Number of entries kept
+        ttl: Seconds an entry is kept
+    """
+
+    def __init__(self, maxsize, ttl):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, loader, cache_if=None):
+        """
+        Returns the cached value for `key`, or loads it with loader().
+
+        Args:
+            cache_if: Optional predicate; a loaded value is only cached if
+                      cache_if(value) is true (e.g. to skip error fallbacks)
+        """
+        with self._lock:
+            try:
+                value = self._cache[key]
+            except KeyError:
+                self.misses += 1
+            else:
+                self.hits += 1
+                return value
+
+        def load():
+            # Another caller may have just finished loading it
+            with self._lock:
+                if key in self._cache:
+                    return self._cache[key]
+            value = loader()
+            if cache_if is None or cache_if(value):
+                with self._lock:
+                    self._cache[key] = value
+            return value
+
+        return self._flight.do(key, load)
+
+    def invalidate(self, key=None):
+        """Drops one entry, or every entry."""
+        with self._lock:
+            if key is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "shared": self._flight.shared,
+                "entries": len(self._cache),
+            }
@@ -790,6 +790,9 @@ document.addEventListener('DOMContentLoaded', () => {
         try {
             const response = await fetch('/tasks');
             const tasks = await response.json();
+            if (!response.ok) {
+                throw new Error(tasks.error || response.statusText);
+            }
 
             tasksUl.innerHTML = '';
 
@@ -925,6 +928,26 @@ document.addEventListener('DOMContentLoaded', () => {
         scheduleEvent(text, null);
     });
 
+    // Polls a scheduling job until it finishes; resolves with the /schedule
+    // response body and status code
+    const waitForScheduleJob = async (response) => {
+        const submitted = await response.json();
+        if (response.status !== 202) {
+            return { result: submitted, status: response.status };
+        }
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            const poll = await fetch(submitted.status_url);
+            const job = await poll.json();
+            if (!poll.ok) {
+                return { result: job, status: poll.status };
+            }
+            if (job.status === 'succeeded' || job.status === 'failed') {
+                return { result: job.result, status: job.http_status };
+            }
+        }
+    };
+
     // Function to actually schedule the event
     const scheduleEvent = async (text, recurrence) => {
         scheduleButton.disabled = true;
@@ -936,6 +959,8 @@ document.addEventListener('DOMContentLoaded', () => {
         showSchedulingOverlay();
 
         try {
+            // Run the scheduling as a background job and poll it, so a long
+            // plan doesn't hold a server thread or hit proxy timeouts
             const response = await fetch('/schedule', {
                 method: 'POST',
                 headers: {
@@ -943,17 +968,23 @@ document.addEventListener('DOMContentLoaded', () => {
                 },
                 body: JSON.stringify({ 
                     text: text,
-                    recurrence: recurrence 
+                    recurrence: recurrence,
+                    async: true,
+                    // Let the server move sessions it timed itself off conflicts
+                    auto_repair: true
                 }),
             });
 
-            const result = await response.json();
+            const { result, status } = await waitForScheduleJob(response);
             
             // Hide overlay after a brief moment to show completion
             setTimeout(() => hideSchedulingOverlay(), 300);
 
-            if (response.ok) {
-                showStatus(schedulerStatus, '🎉 Event scheduled successfully!', true);
+            if (status >= 200 && status < 300) {
+                const moved = (result && result.repaired_events) || [];
+                showStatus(schedulerStatus, moved.length
+                    ? `🎉 Scheduled! ${moved.length} event(s) moved to the nearest free time.`
+                    : '🎉 Event scheduled successfully!', true);
                 eventInput.value = '';
                 
                 // Add success animation to input
@@ -963,7 +994,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 // Refresh tasks and calendar with a small delay to ensure backend is updated
                 fetchTasks();
                 setTimeout(() => refreshCalendar(), 500);
-            } else if (response.status === 409) {
+            } else if (status === 409) {
                 handleConflicts(result);
             } else {
                 showStatus(schedulerStatus, `Error: ${result.error}`, false);
@@ -0,0 +1,168 @@
+import datetime
+import json
+import time
+import types
+
+import pytest
+
+import async_calendar_client
+import calendar_client
+import event_store
+from fake_calendar_server import FakeCalendarBackend, start_fake_server
+
+CALENDARS = ("primary", "work@example.com", "club@example.com")
+LATENCY = 0.2
+
+
+@pytest.fixture
+def fake_api():
+    backend = FakeCalendarBackend(seed=2, page_size=100)
+    for calendar_id in CALENDARS[1:]:
+        backend.add_calendar(calendar_id, calendar_id)
+    for calendar_id in CALENDARS:
+        backend.populate(calendar_id, 150, 30)
+    server, root = start_fake_server(backend)
+    yield backend, root
+    server.shutdown()
+
+
+@pytest.fixture
+def backend(fake_api, monkeypatch, tmp_path):
+    """The fake API's backend, with the shared async client and a throwaway store pointed at it."""
+    backend, root = fake_api
+    client = async_calendar_client.AsyncCalendarClient(api_root=root + "calendar/v3")
+    monkeypatch.setattr(async_calendar_client, "_client", client)
+    monkeypatch.setattr(calendar_client, "get_credentials", lambda: types.SimpleNamespace(token="test"))
+    monkeypatch.setattr(calendar_client, "acquire_quota", lambda calls=1: None)
+    monkeypatch.setattr(calendar_client, "get_selected_calendar_ids", lambda: list(CALENDARS))
+
+    store = event_store.EventStore(str(tmp_path / "events.db"))
+    engines = {}
+    monkeypatch.setattr(
+        calendar_client, "get_sync_engine",
+        lambda calendar_id: engines.setdefault(
+            calendar_id, calendar_client.CalendarSyncEngine(calendar_id, store=store, expand_recurrence=False)
+        ),
+    )
+    yield backend
+    async_calendar_client.run(client.close())
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def _insert(backend, calendar_id, summary, days, hours=1):
+    start = _now().replace(minute=0, second=0, microsecond=0) + datetime.timedelta(days=days)
+    return backend.handle("POST", f"/calendar/v3/calendars/{calendar_id}/events", {}, _body(summary, start, hours))[2]
+
+
+def _body(summary, start, hours=1):
+    return json.dumps({
+        "summary": summary,
+        "start": {"dateTime": start.isoformat()},
+        "end": {"dateTime": (start + datetime.timedelta(hours=hours)).isoformat()},
+    }).encode()
+
+
+def test_calendars_are_synced_concurrently_then_incrementally(backend):
+    backend.latency = LATENCY
+    started = time.monotonic()
+    events = async_calendar_client.sync_events(30)
+    elapsed = time.monotonic() - started
+
+    # Two pages per calendar; run one calendar after another this would take six round trips
+    assert elapsed < 4 * LATENCY
+    assert {event.calendar_id for event in events} == set(CALENDARS)
+    assert [event.start for event in events] == sorted(event.start for event in events)
+
+    _insert(backend, "work@example.com", "Standup", days=1)
+    started = time.monotonic()
+    events = async_calendar_client.sync_events(30)
+    assert time.monotonic() - started < 2 * LATENCY
+    assert [event.calendar_id for event in events if event.summary == "Standup"] == ["work@example.com"]
+
+
+def test_an_expired_sync_token_triggers_a_full_resync(backend, capsys):
+    async_calendar_client.sync_events(30)
+    backend.expire_sync_tokens("club@example.com")
+    _insert(backend, "club@example.com", "Rehearsal", days=2)
+
+    events = async_calendar_client.sync_events(30)
+
+    assert "Sync token expired" in capsys.readouterr().out
+    assert [event.summary for event in events if event.calendar_id == "club@example.com"].count("Rehearsal") == 1
+    state = calendar_client.get_sync_engine("club@example.com").store.get_sync_state("club@example.com")
+    assert state["sync_token"]
+
+
+def test_freebusy_spans_are_queried_concurrently(backend):
+    now = _now()
+    ranges = [(now + datetime.timedelta(days=days), now + datetime.timedelta(days=days, hours=8))
+              for days in (1, 70, 140)]
+    _insert(backend, "primary", "Far away", days=140, hours=30)
+    backend.latency = LATENCY
+
+    started = time.monotonic()
+    busy = async_calendar_client.run(async_calendar_client._query_busy_intervals(ranges, CALENDARS))
+    assert time.monotonic() - started < 2 * LATENCY
+    assert len(calendar_client.freebusy_spans(ranges)) == 3
+
+    expected = calendar_client.busy_events(ranges, [
+        backend.freebusy(calendar_client.freebusy_body(start, end, CALENDARS))
+        for start, end in calendar_client.freebusy_spans(ranges)
+    ])
+    assert sorted((event.start, event.end, event.calendar_id) for event in busy) == sorted(
+        (event.start, event.end, event.calendar_id) for event in expected
+    )
+    assert any(event.end - event.start >= 8 * 3600 for event in busy)
+
+
+def test_conflict_candidates_fail_closed_when_a_query_fails(backend):
+    backend.error_rate = 1.0
+    backend.error_status = 400
+    now = _now()
+    with pytest.raises(calendar_client.FreeBusyError):
+        async_calendar_client.get_conflict_candidates([(now, now + datetime.timedelta(hours=1))])
+
+
+def test_conflict_candidates_come_from_a_fresh_store(backend):
+    async_calendar_client.sync_events(30)
+    event = _insert(backend, "work@example.com", "Hidden", days=3)
+    start = datetime.datetime.fromisoformat(event["start"]["dateTime"])
+
+    # The store synced moments ago, so it answers without asking Google
+    candidates = async_calendar_client.get_conflict_candidates([(start, start + datetime.timedelta(hours=1))])
+    assert "Hidden" not in [candidate.summary for candidate in candidates]
+
+    candidates = async_calendar_client.get_conflict_candidates(
+        [(start, start + datetime.timedelta(days=60))], require_event_details=True
+    )
+    assert "Hidden" in [candidate.summary for candidate in candidates]
+
+
+def test_event_operations_round_trip(backend):
+    client = async_calendar_client.get_client()
+    start = _now().replace(microsecond=0) + datetime.timedelta(days=5)
+    body = {
+        "summary": "Office hours",
+        "start": {"dateTime": start.isoformat()},
+        "end": {"dateTime": (start + datetime.timedelta(hours=1)).isoformat()},
+    }
+
+    async def operations():
+        created = await client.insert_event(body, calendar_id="work@example.com")
+        fetched = await client.get_event(created["id"], "work@example.com", fields="id,etag,summary")
+        patched = await client.patch_event(created["id"], {"summary": "Moved"}, "work@example.com",
+                                           etag=fetched["etag"])
+        listed = await client.list_events(start.isoformat(), (start + datetime.timedelta(hours=1)).isoformat(),
+                                          "work@example.com", fields="id,summary")
+        await client.delete_event(created["id"], "work@example.com")
+        with pytest.raises(async_calendar_client.CalendarAPIError) as gone:
+            await client.get_event(created["id"], "work@example.com")
+        return fetched["summary"], patched["summary"], listed, created["id"], gone.value.status
+
+    fetched, patched, listed, event_id, status = async_calendar_client.run(operations())
+    assert (fetched, patched) == ("Office hours", "Moved")
+    assert {"id": event_id, "summary": "Moved"} in listed
+    assert status in (404, 410)
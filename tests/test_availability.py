@@ -0,0 +1,124 @@
+import datetime
+import random
+
+import numpy as np
+
+from availability import AvailabilityBitmap
+from event_model import Event
+
+UTC = datetime.timezone.utc
+
+
+def _at(day, hour, minute=0):
+    # October 13, 2025 is a Monday
+    return datetime.datetime(2025, 10, day, hour, minute, tzinfo=UTC)
+
+
+def _epoch(day, hour, minute=0):
+    return int(_at(day, hour, minute).timestamp())
+
+
+def _event(event_id, start, end, all_day=False):
+    return Event(event_id, event_id, int(start.timestamp()), int(end.timestamp()), all_day=all_day)
+
+
+def _overlaps(placement, events):
+    return any(placement[0] < event.end and event.start < placement[1] for event in events)
+
+
+def test_removing_events_matches_a_rebuild_without_them():
+    rng = random.Random(7)
+    time_min, time_max = _at(13, 0), _at(20, 0)
+    events = []
+    for number in range(200):
+        start = _epoch(12, 12) + rng.randrange(0, 8 * 96) * 900 + rng.choice((0, 300, 600))
+        events.append(Event(str(number), "", start, start + rng.randint(1, 16) * 600))
+    bitmap = AvailabilityBitmap.from_events(events, time_min, time_max)
+
+    removed = rng.sample(events, 80)
+    bitmap.remove(removed)
+    remaining = [event for event in events if event not in removed]
+
+    rebuilt = AvailabilityBitmap.from_events(remaining, time_min, time_max)
+    assert np.array_equal(bitmap.busy, rebuilt.busy)
+    assert bitmap.busy.min() >= 0
+
+
+def test_cells_stay_busy_while_any_event_covers_them():
+    lecture = _event("lecture", _at(13, 9), _at(13, 10, 10))
+    overlap = _event("overlap", _at(13, 10), _at(13, 11))
+    holiday = _event("holiday", _at(13, 0), _at(14, 0), all_day=True)
+    bitmap = AvailabilityBitmap.from_events([lecture, overlap, holiday], _at(13, 0), _at(14, 0))
+
+    busy = bitmap.busy > 0
+    # Partly covered cells count as busy; all-day events don't block time
+    assert busy[bitmap.cell_of(_at(13, 9)):bitmap.cell_of(_at(13, 11))].all()
+    assert busy.sum() == 8
+
+    bitmap.remove([overlap])
+    assert busy[bitmap.cell_of(_at(13, 10))] and bitmap.busy.sum() == 5
+
+    bitmap.reserve(_epoch(13, 14), _epoch(13, 14, 20))
+    assert bitmap.free_cells()[bitmap.cell_of(_at(13, 14)):bitmap.cell_of(_at(13, 14, 30))].tolist() == [False, False]
+    copy = bitmap.copy()
+    copy.reserve(_epoch(13, 15), _epoch(13, 16))
+    assert bitmap.busy.sum() == 7 and copy.busy.sum() == 11
+
+
+def test_place_takes_the_first_free_preferred_slot():
+    lecture = _event("lecture", _at(13, 8), _at(13, 10))
+    bitmap = AvailabilityBitmap.from_events([lecture], _at(13, 0), _at(15, 0))
+
+    [placement] = bitmap.place(60, UTC, not_before=_at(13, 0))
+
+    assert placement == (_epoch(13, 10), _epoch(13, 11))
+
+
+def test_place_aims_before_the_deadline_and_never_past_it():
+    bitmap = AvailabilityBitmap(_at(13, 0), _at(20, 0))
+
+    [placement] = bitmap.place(60, UTC, not_before=_at(13, 0), deadline=_at(17, 17))
+    assert placement == (_epoch(16, 8), _epoch(16, 9))
+
+    [placement] = bitmap.place(60, UTC, not_before=_at(13, 0), deadline=_at(13, 9))
+    assert placement == (_epoch(13, 8), _epoch(13, 9))
+    assert bitmap.place(60, UTC, not_before=_at(13, 0), deadline=_at(13, 7, 30)) == []
+
+
+def test_place_returns_non_overlapping_choices():
+    events = [_event("a", _at(13, 9), _at(13, 12)), _event("b", _at(14, 13), _at(14, 17))]
+    bitmap = AvailabilityBitmap.from_events(events, _at(13, 0), _at(16, 0))
+
+    placements = bitmap.place(90, UTC, not_before=_at(13, 0), count=6)
+    assert len(placements) == 6
+    for number, placement in enumerate(placements):
+        assert not _overlaps(placement, events)
+        assert placement[1] - placement[0] == 90 * 60
+        assert all(placement[1] <= other[0] or other[1] <= placement[0] for other in placements[number + 1:])
+
+    by_day = bitmap.place(90, UTC, not_before=_at(13, 0), count=6, distinct_days=True)
+    assert sorted(start // 86400 for start, _ in by_day) == [_epoch(13, 0) // 86400 + day for day in range(3)]
+
+
+def test_place_sessions_avoids_the_calendar_and_each_other():
+    events = [_event("a", _at(13, 8), _at(13, 12)), _event("b", _at(13, 14), _at(13, 22))]
+    bitmap = AvailabilityBitmap.from_events(events, _at(13, 0), _at(17, 0))
+
+    sessions = bitmap.place_sessions([60, 120, 60], UTC, not_before=_at(13, 0), deadline=_at(16, 0))
+    assert sessions == sorted(sessions)
+    assert sorted(end - start for start, end in sessions) == [3600, 3600, 7200]
+    for number, session in enumerate(sessions):
+        assert not _overlaps(session, events)
+        assert session[1] <= _epoch(16, 0)
+        assert all(session[1] <= other[0] for other in sessions[number + 1:])
+
+    spread = bitmap.place_sessions([60, 60, 60], UTC, not_before=_at(13, 0), distinct_days=True)
+    assert len({start // 86400 for start, _ in spread}) == 3
+    # Placing sessions doesn't reserve them in the bitmap
+    assert np.array_equal(bitmap.busy, AvailabilityBitmap.from_events(events, _at(13, 0), _at(17, 0)).busy)
+
+
+def test_place_sessions_fails_when_not_everything_fits():
+    bitmap = AvailabilityBitmap(_at(13, 0), _at(14, 0))
+    assert bitmap.place_sessions([600, 600], UTC, not_before=_at(13, 0)) is None
+    assert bitmap.place(16 * 60, UTC) == []
@@ -0,0 +1,163 @@
+import datetime
+
+import pytest
+
+import batch_planner
+import duration_feedback
+from availability import AvailabilityBitmap
+from event_model import Event
+
+UTC = datetime.timezone.utc
+MONDAY = datetime.datetime(2025, 10, 13, tzinfo=UTC)
+
+
+def _at(day, hour, minute=0):
+    return MONDAY + datetime.timedelta(days=day, hours=hour, minutes=minute)
+
+
+def _busy(*ranges):
+    return [Event(str(number), "busy", int(start.timestamp()), int(end.timestamp()))
+            for number, (start, end) in enumerate(ranges)]
+
+
+def _sessions(entry):
+    return [
+        (datetime.datetime.fromisoformat(event["start_time"]), datetime.datetime.fromisoformat(event["end_time"]))
+        for event in entry["events"]
+    ]
+
+
+@pytest.fixture(autouse=True)
+def learned(monkeypatch):
+    """Learned durations in hours by (class, assignment type); none by default."""
+    durations = {}
+    monkeypatch.setattr(duration_feedback, "get_duration_suggestion",
+                        lambda class_name=None, assignment_type=None: durations.get((class_name, assignment_type)))
+    return durations
+
+
+def test_split_duration():
+    assert batch_planner.split_duration(90) == (90,)
+    assert batch_planner.split_duration(300) == (105, 105, 105)
+    assert batch_planner.split_duration(240, 4) == (60, 60, 60, 60)
+    # Never shorter than the minimum block
+    assert batch_planner.split_duration(60, 3) == (45, 45, 45)
+
+
+def test_estimates_come_from_the_request_then_feedback_then_defaults(learned):
+    learned[("CS 101", "homework")] = 3
+    assert batch_planner.estimate_sessions({"summary": "CS 101 homework", "duration_hours": 1}) == ((60,), "request")
+    assert batch_planner.estimate_sessions({"summary": "CS 101 homework"}) == ((90, 90), "feedback")
+    assert batch_planner.estimate_sessions({"summary": "Physics quiz"}) == ((45,), "default")
+    assert batch_planner.estimate_sessions({"summary": "Groceries"}) == (batch_planner.DEFAULT_SESSION, "default")
+
+
+def test_plan_never_overlaps_itself_the_calendar_or_a_due_date():
+    calendar = _busy((_at(0, 9), _at(0, 17)), (_at(1, 8), _at(1, 12)), (_at(2, 13), _at(2, 18)))
+    bitmap = AvailabilityBitmap.from_events(calendar, MONDAY, _at(7, 0))
+    tasks = [
+        {"summary": "ECEN 380 project", "due": "2025-10-17", "duration_hours": 6},
+        {"summary": "Essay draft", "due": "2025-10-14T20:00:00+00:00", "duration_hours": 2},
+        {"summary": "Midterm review", "due": "2025-10-16", "sessions": 2},
+        {"summary": "Clean inbox"},
+    ]
+
+    result = batch_planner.plan_batch(tasks, bitmap, UTC, now=MONDAY)
+
+    assert result["unscheduled"] == []
+    assert [entry["summary"] for entry in result["plan"]] == [task["summary"] for task in tasks]
+    placed = []
+    for task, entry in zip(tasks, result["plan"]):
+        sessions = _sessions(entry)
+        if task.get("due"):
+            due = batch_planner.parse_due(task["due"], UTC)
+            assert entry["due"] == due.isoformat()
+            assert all(end <= due for _, end in sessions)
+        placed.extend(sessions)
+    placed.sort()
+    assert all(first[1] <= second[0] for first, second in zip(placed, placed[1:]))
+    assert not any(start.timestamp() < event.end and event.start < end.timestamp()
+                   for start, end in placed for event in calendar)
+
+    project, essay, review, _ = result["plan"]
+    assert [event["summary"] for event in project["events"]] == [
+        f"ECEN 380 project (Session {number} of 3)" for number in (1, 2, 3)
+    ]
+    assert essay["events"][0]["summary"] == "Essay draft"
+    # Exam sessions go on different days
+    assert len({start.date() for start, _ in _sessions(review)}) == 2
+
+
+def test_earliest_deadline_first_gets_the_scarce_time():
+    # Only two free hours before Tuesday's due date, on Monday
+    calendar = _busy((MONDAY, _at(0, 10)), (_at(0, 12), _at(4, 0)))
+    bitmap = AvailabilityBitmap.from_events(calendar, MONDAY, _at(6, 0))
+    tasks = [
+        {"summary": "Later report", "due": "2025-10-18", "duration_hours": 2},
+        {"summary": "Urgent homework", "due": "2025-10-14", "duration_hours": 2},
+    ]
+
+    result = batch_planner.plan_batch(tasks, bitmap, UTC, now=MONDAY)
+
+    later, urgent = result["plan"]
+    assert _sessions(urgent) == [(_at(0, 10), _at(0, 12))]
+    assert _sessions(later)[0][0] >= _at(4, 0)
+
+
+def test_falls_back_to_the_earliest_placement_when_aiming_at_the_due_date_leaves_no_room():
+    # Free: Monday 8-9 and Tuesday 8-10
+    calendar = _busy((MONDAY, _at(0, 8)), (_at(0, 9), _at(1, 8)), (_at(1, 10), _at(3, 0)))
+    bitmap = AvailabilityBitmap.from_events(calendar, MONDAY, _at(3, 0))
+    tasks = [
+        {"summary": "Reading notes", "due": "2025-10-15", "duration_hours": 1},
+        {"summary": "Lab report", "due": "2025-10-15", "duration_hours": 2},
+    ]
+
+    result = batch_planner.plan_batch(tasks, bitmap, UTC, now=MONDAY)
+
+    assert result["strategy"] == "earliest"
+    reading, lab = result["plan"]
+    assert _sessions(reading) == [(_at(0, 8), _at(0, 9))]
+    assert _sessions(lab) == [(_at(1, 8), _at(1, 10))]
+    # Planning doesn't touch the bitmap
+    assert bitmap.free_cells().sum() == 12
+
+
+def test_tasks_that_do_not_fit_are_reported():
+    bitmap = AvailabilityBitmap.from_events(_busy((MONDAY, _at(0, 20))), MONDAY, _at(1, 0))
+    tasks = [
+        {"summary": "Quick quiz prep", "due": "2025-10-13"},
+        {"summary": "Thesis", "due": "2025-10-13", "duration_hours": 20},
+        {"summary": "Someday", "duration_hours": 5},
+    ]
+
+    result = batch_planner.plan_batch(tasks, bitmap, UTC, now=MONDAY)
+
+    assert [entry["summary"] for entry in result["plan"]] == ["Quick quiz prep"]
+    assert result["unscheduled"] == [
+        {"summary": "Thesis", "reason": "No room for 10 session(s) totalling 20 hours before it is due"},
+        {"summary": "Someday", "reason": "No room for 3 session(s) totalling 5.25 hours"},
+    ]
+
+
+def test_tasks_need_a_summary():
+    bitmap = AvailabilityBitmap(MONDAY, _at(1, 0))
+    with pytest.raises(ValueError, match="Task 2 has no summary"):
+        batch_planner.plan_batch([{"summary": "Homework"}, {"due": "2025-10-14"}], bitmap, UTC, now=MONDAY)
+
+
+@pytest.mark.parametrize("field, value, message", [
+    ("duration_hours", 0, "more than 0"),
+    ("duration_hours", -2, "more than 0"),
+    ("duration_hours", "lots", "non-numeric"),
+    ("duration_hours", float("nan"), "more than 0"),
+    ("duration_hours", 1e9, "at most 100"),
+    ("sessions", 0, "more than 0"),
+    ("sessions", 10 ** 9, "at most 20"),
+    ("sessions", 2.5, "whole number"),
+    ("sessions", [2], "non-numeric"),
+])
+def test_durations_and_session_counts_are_validated(field, value, message):
+    bitmap = AvailabilityBitmap(MONDAY, _at(1, 0))
+    with pytest.raises(ValueError, match=f"Task 1 .*{message}"):
+        batch_planner.plan_batch([{"summary": "Homework", field: value}], bitmap, UTC, now=MONDAY)
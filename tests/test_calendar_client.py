@@ -0,0 +1,363 @@
+import datetime
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+import calendar_client
+
+
+def test_event_bounds_parses_utc_z_timestamps():
+    bounds = calendar_client._event_bounds({
+        "start": {"dateTime": "2025-10-05T14:00:00Z"},
+        "end": {"dateTime": "2025-10-05T15:30:00Z"},
+    })
+    assert bounds == (
+        datetime.datetime(2025, 10, 5, 14, tzinfo=datetime.timezone.utc),
+        datetime.datetime(2025, 10, 5, 15, 30, tzinfo=datetime.timezone.utc),
+    )
+
+
+def test_event_bounds_keeps_offsets_and_all_day_dates():
+    start, end = calendar_client._event_bounds({
+        "start": {"dateTime": "2025-10-05T14:00:00-06:00"},
+        "end": {"dateTime": "2025-10-05T15:00:00-06:00"},
+    })
+    assert start.utcoffset() == datetime.timedelta(hours=-6)
+    assert end - start == datetime.timedelta(hours=1)
+
+    start, end = calendar_client._event_bounds({
+        "start": {"date": "2025-10-05"}, "end": {"date": "2025-10-06"},
+    })
+    assert start.tzinfo is not None
+    assert (start.date(), end.date()) == (datetime.date(2025, 10, 5), datetime.date(2025, 10, 6))
+
+
+def test_event_bounds_rejects_missing_or_invalid_times():
+    assert calendar_client._event_bounds({"start": {}, "end": {}}) is None
+    assert calendar_client._event_bounds({
+        "start": {"dateTime": "soon"}, "end": {"dateTime": "later"},
+    }) is None
+
+
+def _http_error(status, content=b"{}", headers=None):
+    return HttpError(httplib2.Response({"status": status, **(headers or {})}), content)
+
+
+def test_iter_events_raises_instead_of_returning_a_partial_result(monkeypatch):
+    def pages(service, **params):
+        yield {"items": [{"id": "a"}, {"id": "b"}]}
+        raise _http_error(500)
+
+    monkeypatch.setattr(calendar_client, "get_calendar_service", lambda: object())
+    monkeypatch.setattr(calendar_client, "iter_event_pages", pages)
+
+    fetched = []
+    with pytest.raises(HttpError):
+        for event in calendar_client.iter_events("2025-10-05T00:00:00Z", "2025-10-06T00:00:00Z"):
+            fetched.append(event["id"])
+    assert fetched == ["a", "b"]
+    with pytest.raises(HttpError):
+        calendar_client.get_events_in_range(1)
+
+
+def test_new_event_ids_are_valid_base32hex():
+    ids = {calendar_client.new_event_id() for _ in range(100)}
+    assert len(ids) == 100
+    for event_id in ids:
+        assert 5 <= len(event_id) <= 1024
+        assert set(event_id) <= set("0123456789abcdefghijklmnopqrstuv")
+
+
+class _FlakyInsert:
+    """Commits the event, then loses the response, like a 503 after write."""
+
+    def __init__(self, store, body):
+        self.store = store
+        self.body = body
+
+    def execute(self):
+        if self.body["id"] in self.store:
+            raise _http_error(409)
+        self.store[self.body["id"]] = dict(self.body)
+        raise _http_error(503)
+
+
+class _Get:
+    def __init__(self, store, event_id):
+        self.store = store
+        self.event_id = event_id
+
+    def execute(self):
+        return self.store[self.event_id]
+
+
+class _FakeEvents:
+    def __init__(self, store):
+        self.store = store
+
+    def insert(self, calendarId, body):
+        return _FlakyInsert(self.store, body)
+
+    def get(self, calendarId, eventId):
+        return _Get(self.store, eventId)
+
+
+class _FakeService:
+    def __init__(self):
+        self.store = {}
+
+    def events(self):
+        return _FakeEvents(self.store)
+
+
+@pytest.fixture
+def no_waiting(monkeypatch):
+    monkeypatch.setattr(calendar_client, "acquire_quota", lambda *args: None)
+    monkeypatch.setattr(calendar_client.time, "sleep", lambda seconds: None)
+
+
+def test_retried_insert_that_gets_409_returns_the_created_event(monkeypatch, no_waiting):
+    service = _FakeService()
+    upserted = []
+    monkeypatch.setattr(calendar_client, "get_calendar_service", lambda: service)
+    monkeypatch.setattr(calendar_client, "get_primary_calendar_timezone", lambda *args: "UTC")
+    monkeypatch.setattr(
+        calendar_client, "get_sync_engine",
+        lambda calendar_id: type("Engine", (), {"upsert": lambda self, event: upserted.append(event)})(),
+    )
+
+    created = calendar_client.create_event(
+        "Study", "2025-10-05T14:00:00+00:00", "2025-10-05T15:00:00+00:00"
+    )
+
+    assert len(service.store) == 1
+    assert created == next(iter(service.store.values()))
+    assert upserted == [created]
+
+
+def test_409_on_the_first_attempt_is_still_an_error(no_waiting):
+    store = {"taken": {"id": "taken"}}
+    with pytest.raises(HttpError):
+        calendar_client.execute_request(
+            _FlakyInsert(store, {"id": "taken"}), on_conflict=lambda: store["taken"]
+        )
+
+
+def _utc(day, hour=0):
+    return datetime.datetime(2025, 1, 1, hour, tzinfo=datetime.timezone.utc) + datetime.timedelta(days=day)
+
+
+def test_freebusy_spans_stay_within_the_api_limit():
+    # Weekly occurrences for a year
+    ranges = [(_utc(day, 10), _utc(day, 11)) for day in range(0, 365, 7)]
+    spans = calendar_client.freebusy_spans(ranges)
+    assert 1 < len(spans) <= 365 // 60 + 1
+    assert all(end - start <= calendar_client.FREEBUSY_MAX_SPAN for start, end in spans)
+    for start, end in ranges:
+        assert any(span_start <= start and end <= span_end for span_start, span_end in spans)
+
+    # One range longer than the limit is cut up; far-apart ranges skip the gap
+    assert len(calendar_client.freebusy_spans([(_utc(0), _utc(150))])) == 3
+    assert calendar_client.freebusy_spans([(_utc(0), _utc(0, 1)), (_utc(300), _utc(300, 1))]) == [
+        [_utc(0), _utc(0, 1)], [_utc(300), _utc(300, 1)],
+    ]
+
+
+class _FreeBusyService:
+    def __init__(self, answer):
+        self.answer = answer
+        self.bodies = []
+
+    def freebusy(self):
+        return self
+
+    def query(self, body):
+        self.bodies.append(body)
+        answer = self.answer
+
+        class Request:
+            def execute(self):
+                if isinstance(answer, Exception):
+                    raise answer
+                return answer
+        return Request()
+
+
+def test_query_busy_intervals_queries_each_span(monkeypatch, no_waiting):
+    service = _FreeBusyService({"calendars": {"primary": {"busy": [
+        {"start": "2025-01-01T10:30:00Z", "end": "2025-01-01T12:00:00Z"},
+    ]}}})
+    monkeypatch.setattr(calendar_client, "get_calendar_service", lambda: service)
+
+    busy = calendar_client.query_busy_intervals([(_utc(0, 10), _utc(0, 11)), (_utc(200, 10), _utc(200, 11))])
+
+    assert len(service.bodies) == 2
+    assert [(event.summary, event.start) for event in busy] == [("Busy", int(_utc(0, 10).timestamp()) + 1800)]
+
+
+@pytest.mark.parametrize("answer", [
+    _http_error(500),
+    {"calendars": {"primary": {"errors": [{"domain": "global", "reason": "backendError"}], "busy": []}}},
+])
+def test_query_busy_intervals_fails_closed(monkeypatch, no_waiting, answer):
+    monkeypatch.setattr(calendar_client, "CALENDAR_MAX_RETRIES", 0)
+    monkeypatch.setattr(calendar_client, "get_calendar_service", lambda: _FreeBusyService(answer))
+    with pytest.raises((HttpError, calendar_client.FreeBusyError)):
+        calendar_client.query_busy_intervals([(_utc(0, 10), _utc(0, 11))])
+
+
+class _Responses:
+    """A request whose attempts raise or return the given outcomes in turn."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.attempts = 0
+
+    def execute(self):
+        self.attempts += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def test_execute_request_retries_transient_errors_with_backoff(monkeypatch, no_waiting):
+    sleeps = []
+    monkeypatch.setattr(calendar_client.time, "sleep", sleeps.append)
+    request = _Responses(_http_error(503), _http_error(429, headers={"retry-after": "7"}), {"id": "a"})
+
+    assert calendar_client.execute_request(request) == {"id": "a"}
+    assert request.attempts == 3
+    assert len(sleeps) == 2 and sleeps[1] >= 7
+
+
+@pytest.mark.parametrize("error", [
+    _http_error(400),
+    _http_error(404),
+    _http_error(403, b'{"error": {"errors": [{"reason": "forbidden"}]}}'),
+])
+def test_execute_request_does_not_retry_permanent_errors(no_waiting, error):
+    request = _Responses(error, {"id": "a"})
+    with pytest.raises(HttpError):
+        calendar_client.execute_request(request)
+    assert request.attempts == 1
+
+
+def test_execute_request_retries_403_rate_limits_until_it_gives_up(monkeypatch, no_waiting):
+    monkeypatch.setattr(calendar_client, "CALENDAR_MAX_RETRIES", 2)
+    rate_limited = _http_error(403, b'{"error": {"errors": [{"reason": "rateLimitExceeded"}]}}')
+    request = _Responses(rate_limited, rate_limited, rate_limited, {"id": "a"})
+    with pytest.raises(HttpError):
+        calendar_client.execute_request(request)
+    assert request.attempts == 3
+
+
+class _BatchService:
+    """
+    Runs batch sub-requests against an in-memory calendar. Each planned
+    failure (method, body id or event id) -> list of statuses is used up one
+    attempt at a time; "commit-503" stores the event and then fails.
+    """
+
+    def __init__(self, failures):
+        self.store = {}
+        self.failures = failures
+        self.batches = []
+
+    def events(self):
+        service = self
+
+        class Events:
+            def insert(self, calendarId, body):
+                return ("insert", body["id"], body)
+
+            def delete(self, calendarId, eventId):
+                return ("delete", eventId, None)
+
+            def get(self, calendarId, eventId):
+                return _Get(service.store, eventId)
+        return Events()
+
+    def _run(self, method, key, body):
+        planned = self.failures.get(key) or []
+        outcome = planned.pop(0) if planned else None
+        if method == "insert":
+            if key in self.store:
+                raise _http_error(409)
+            if outcome in (None, "commit-503"):
+                self.store[key] = dict(body)
+            if outcome == "commit-503":
+                raise _http_error(503)
+        elif key not in self.store:
+            raise _http_error(410)
+        if outcome is not None:
+            raise _http_error(outcome)
+        if method == "delete":
+            del self.store[key]
+            return None
+        return self.store[key]
+
+    def new_batch_http_request(self, callback):
+        service = self
+        requests = []
+
+        class Batch:
+            def add(self, request, request_id):
+                requests.append((request_id, request))
+
+            def execute(self):
+                service.batches.append([request_id for request_id, _ in requests])
+                for request_id, (method, key, body) in requests:
+                    try:
+                        callback(request_id, service._run(method, key, body), None)
+                    except HttpError as error:
+                        callback(request_id, None, error)
+        return Batch()
+
+
+def test_batch_mutate_retries_only_failed_operations(monkeypatch, no_waiting):
+    service = _BatchService({"b": [503], "c": [400]})
+    service.store["gone"] = {"id": "gone"}
+    monkeypatch.setattr(calendar_client, "get_calendar_service", lambda: service)
+
+    results = calendar_client.batch_mutate([
+        ("insert", {"body": {"id": "a"}}),
+        ("insert", {"body": {"id": "b"}}),
+        ("insert", {"body": {"id": "c"}}),
+        ("delete", {"eventId": "gone"}),
+        ("delete", {"eventId": "never-there"}),
+    ])
+
+    assert [result["ok"] for result in results] == [True, True, False, True, True]
+    assert service.batches == [["0", "1", "2", "3", "4"], ["1"]]
+    assert sorted(service.store) == ["a", "b"]
+
+
+def test_batch_insert_committed_before_a_lost_response_is_not_duplicated(monkeypatch, no_waiting):
+    service = _BatchService({"a": ["commit-503"]})
+    monkeypatch.setattr(calendar_client, "get_calendar_service", lambda: service)
+
+    [result] = calendar_client.batch_mutate([("insert", {"body": {"id": "a", "summary": "Study"}})])
+
+    assert result["ok"] and result["result"] == {"id": "a", "summary": "Study"}
+    assert list(service.store) == ["a"]
+    assert len(service.batches) == 2
+
+
+def test_create_events_gives_every_insert_its_own_id(monkeypatch, no_waiting):
+    service = _BatchService({})
+    monkeypatch.setattr(calendar_client, "get_calendar_service", lambda: service)
+    monkeypatch.setattr(calendar_client, "get_primary_calendar_timezone", lambda *args: "UTC")
+    monkeypatch.setattr(
+        calendar_client, "get_sync_engine",
+        lambda calendar_id: type("Engine", (), {"upsert": lambda self, event: None})(),
+    )
+
+    results = calendar_client.create_events([
+        {"summary": "A", "start_time": "2025-10-05T09:00:00+00:00", "end_time": "2025-10-05T10:00:00+00:00"},
+        {"summary": "A", "start_time": "2025-10-05T09:00:00+00:00", "end_time": "2025-10-05T10:00:00+00:00"},
+    ])
+
+    assert all(result["ok"] for result in results)
+    assert len(service.store) == 2
@@ -0,0 +1,64 @@
+import datetime
+
+import conflict_matrix
+import event_store
+from event_model import Event
+
+UTC = datetime.timezone.utc
+
+
+def test_from_google_parses_times_once():
+    event = Event.from_google({
+        "id": "a",
+        "summary": "Lecture",
+        "start": {"dateTime": "2025-10-05T09:00:00-06:00"},
+        "end": {"dateTime": "2025-10-05T10:00:00Z"},
+    })
+    assert (event.start, event.end) == (
+        int(datetime.datetime(2025, 10, 5, 15, tzinfo=UTC).timestamp()),
+        int(datetime.datetime(2025, 10, 5, 10, tzinfo=UTC).timestamp()),
+    )
+    assert event.utc_offset == -360
+    assert event.start_dt.utcoffset() == datetime.timedelta(hours=-6)
+    assert not event.all_day
+
+
+def test_from_google_rejects_events_without_times():
+    assert Event.from_google({"id": "a", "start": {}, "end": {}}) is None
+    assert Event.from_google({"id": "a", "start": {"dateTime": "soon"}, "end": {"dateTime": "later"}}) is None
+
+
+def test_untitled_events_keep_each_views_fallback_title():
+    untitled = {
+        "id": "a",
+        "start": {"dateTime": "2025-10-05T09:00:00Z"},
+        "end": {"dateTime": "2025-10-05T10:00:00Z"},
+    }
+    event = Event.from_google(untitled)
+    assert event.summary is None
+
+    planned = [{
+        "summary": "Study",
+        "occurrences": [(
+            datetime.datetime(2025, 10, 5, 9, 30, tzinfo=UTC),
+            datetime.datetime(2025, 10, 5, 10, 30, tzinfo=UTC),
+        )],
+    }]
+    [[conflict]] = conflict_matrix.plan_conflicts(planned, [event])
+    assert conflict["existing_event"]["summary"] == "Untitled Event"
+
+
+def test_store_keeps_missing_titles_missing(tmp_path):
+    store = event_store.EventStore(str(tmp_path / "events.db"))
+    event = {
+        "id": "a",
+        "start": {"dateTime": "2025-10-05T09:00:00Z"},
+        "end": {"dateTime": "2025-10-05T10:00:00Z"},
+    }
+    store.upsert("primary", [(
+        datetime.datetime(2025, 10, 5, 9, tzinfo=UTC), datetime.datetime(2025, 10, 5, 10, tzinfo=UTC), event,
+    )])
+    [stored] = store.events_in_range(
+        "primary", datetime.datetime(2025, 10, 5, tzinfo=UTC), datetime.datetime(2025, 10, 6, tzinfo=UTC)
+    )
+    assert stored.summary is None
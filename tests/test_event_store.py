@@ -0,0 +1,156 @@
+import datetime
+
+import pytest
+
+import event_store
+
+UTC = datetime.timezone.utc
+DAY = (datetime.datetime(2025, 10, 5, tzinfo=UTC), datetime.datetime(2025, 10, 6, tzinfo=UTC))
+
+
+def _at(hour, minute=0):
+    return datetime.datetime(2025, 10, 5, hour, minute, tzinfo=UTC)
+
+
+def _entry(event_id, start, end, **fields):
+    event = {
+        "id": event_id,
+        "summary": event_id,
+        "start": {"dateTime": start.isoformat()},
+        "end": {"dateTime": end.isoformat()},
+        **fields,
+    }
+    return start, end, event
+
+
+def _weekly_master(event_id="series"):
+    event = {
+        "id": event_id,
+        "summary": "Seminar",
+        "start": {"dateTime": _at(9).isoformat()},
+        "end": {"dateTime": _at(10).isoformat()},
+        "recurrence": ["RRULE:FREQ=WEEKLY;COUNT=4"],
+    }
+    return _at(9), None, event
+
+
+def _ids(events):
+    return [event.id for event in events]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return event_store.EventStore(str(tmp_path / "events.db"))
+
+
+def test_events_in_range_returns_overlapping_events_by_start(store):
+    store.upsert("primary", [
+        _entry("late", _at(15), _at(16)),
+        _entry("early", _at(8), _at(9)),
+        _entry("ends_at_noon", _at(11), _at(12)),
+        _entry("other_day", _at(8) + datetime.timedelta(days=2), _at(9) + datetime.timedelta(days=2)),
+    ])
+    store.upsert("work", [_entry("elsewhere", _at(8), _at(9))])
+
+    assert _ids(store.events_in_range("primary", *DAY)) == ["early", "ends_at_noon", "late"]
+    # Half-open: an event ending at time_min is not included
+    assert _ids(store.events_in_range("primary", _at(12), _at(15, 30))) == ["late"]
+    [late] = store.events_in_range("primary", _at(15), _at(16))
+    assert (late.start, late.end) == (int(_at(15).timestamp()), int(_at(16).timestamp()))
+    assert late.calendar_id == "primary"
+
+
+def test_long_events_are_found_after_a_sync_records_their_duration(store):
+    conference = _entry("conference", _at(0) - datetime.timedelta(days=3), _at(18))
+    store.replace_calendar("primary", [conference, _entry("short", _at(9), _at(10))],
+                           "token-1", *DAY, synced_at=_at(7))
+
+    assert _ids(store.events_in_range("primary", _at(17), _at(19))) == ["conference"]
+
+
+def test_replace_calendar_drops_events_missing_from_the_full_sync(store):
+    store.upsert("primary", [_entry("stale", _at(9), _at(10))])
+    store.replace_calendar("primary", [_entry("fresh", _at(11), _at(12))], "token-1",
+                           *DAY, synced_at=_at(7), expands_recurrence=True)
+
+    assert _ids(store.events_in_range("primary", *DAY)) == ["fresh"]
+    assert not store.contains("primary", "stale")
+    state = store.get_sync_state("primary")
+    assert state == {
+        "sync_token": "token-1",
+        "window_start": DAY[0],
+        "horizon": DAY[1],
+        "last_synced": _at(7),
+        "expands_recurrence": True,
+    }
+    assert store.get_sync_state("work") is None
+
+
+def test_apply_changes_upserts_deletes_and_advances_the_token(store):
+    store.replace_calendar("primary", [_entry("kept", _at(9), _at(10)), _entry("gone", _at(11), _at(12))],
+                           "token-1", *DAY, synced_at=_at(7))
+    store.apply_changes("primary", [_entry("kept", _at(13), _at(14)), _entry("new", _at(15), _at(16))],
+                        ["gone"], "token-2", synced_at=_at(8))
+
+    assert _ids(store.events_in_range("primary", *DAY)) == ["kept", "new"]
+    assert store.get_event("primary", "kept")["start"]["dateTime"] == _at(13).isoformat()
+    state = store.get_sync_state("primary")
+    assert (state["sync_token"], state["last_synced"]) == ("token-2", _at(8))
+    assert state["window_start"] == DAY[0]
+
+
+def test_cancelling_a_master_removes_its_exceptions(store):
+    moved = _entry("series_20251012T090000Z", _at(14) + datetime.timedelta(days=7),
+                   _at(15) + datetime.timedelta(days=7), recurringEventId="series",
+                   originalStartTime={"dateTime": "2025-10-12T09:00:00Z"})
+    store.replace_calendar("primary", [moved], "token-1", DAY[0], DAY[0] + datetime.timedelta(days=30),
+                           synced_at=_at(7), masters=[_weekly_master()],
+                           cancelled=[("series", _at(9).timestamp() + 14 * 86400)])
+    month = (DAY[0], DAY[0] + datetime.timedelta(days=30))
+    assert [master["id"] for master in store.masters_in_range("primary", *month)] == ["series"]
+    assert store.overridden_starts("primary", ["series"]) == {
+        "series": {_at(9).timestamp() + 7 * 86400, _at(9).timestamp() + 14 * 86400}
+    }
+
+    store.apply_changes("primary", [], ["series"], "token-2", synced_at=_at(8))
+
+    assert store.masters_in_range("primary", *month) == []
+    assert store.events_in_range("primary", *month) == []
+    assert store.overridden_starts("primary", ["series"]) == {"series": set()}
+
+
+def test_deleting_an_occurrence_records_it_as_cancelled(store):
+    store.upsert("primary", [], masters=[_weekly_master()])
+
+    store.delete("primary", "series_20251012T090000Z")
+    # Not an occurrence of a stored series: nothing to record
+    store.delete("primary", "unknown_20251012T090000Z")
+
+    assert store.overridden_starts("primary", ["series", "unknown"]) == {
+        "series": {_at(9).timestamp() + 7 * 86400},
+        "unknown": set(),
+    }
+    assert store.find_calendar("series_20251019T090000Z") == "primary"
+    assert store.find_calendar("missing") is None
+
+
+def test_reset_forgets_one_calendar_or_all(store):
+    for calendar_id in ("primary", "work"):
+        store.replace_calendar(calendar_id, [_entry("a", _at(9), _at(10))], "token",
+                               *DAY, synced_at=_at(7))
+
+    store.reset("work")
+    assert store.get_sync_state("work") is None
+    assert _ids(store.events_in_range("primary", *DAY)) == ["a"]
+
+    store.reset()
+    assert store.get_sync_state("primary") is None
+    assert store.events_in_range("primary", *DAY) == []
+
+
+def test_a_schema_change_rebuilds_the_database(tmp_path, monkeypatch):
+    path = str(tmp_path / "events.db")
+    event_store.EventStore(path).upsert("primary", [_entry("a", _at(9), _at(10))])
+
+    monkeypatch.setattr(event_store, "SCHEMA_VERSION", event_store.SCHEMA_VERSION + 1)
+    assert event_store.EventStore(path).events_in_range("primary", *DAY) == []
@@ -0,0 +1,155 @@
+import datetime
+import itertools
+import random
+
+import conflict_matrix
+import free_slots
+from event_model import Event
+from interval_index import IntervalIndex
+
+UTC = datetime.timezone.utc
+# Monday night, so the search starts on a working day
+MONDAY_NIGHT = datetime.datetime(2025, 10, 13, 23, tzinfo=UTC)
+
+
+def _at(day, hour, minute=0):
+    return datetime.datetime(2025, 10, day, hour, minute, tzinfo=UTC)
+
+
+def _event(event_id, start, end, all_day=False):
+    return Event(event_id, event_id, int(start.timestamp()), int(end.timestamp()), all_day=all_day)
+
+
+def _planned(start, end):
+    return {"summary": "Study", "occurrences": [(start, end)]}
+
+
+def test_nearest_free_slot_moves_to_the_closest_gap():
+    events = [_event("lecture", _at(14, 10), _at(14, 11)), _event("lab", _at(14, 11), _at(14, 13))]
+    slot = free_slots.nearest_free_slot(_at(14, 10), _at(14, 11), events, now=MONDAY_NIGHT)
+    assert slot == (_at(14, 9), _at(14, 10))
+
+    # The rest of the plan is avoided too
+    slot = free_slots.nearest_free_slot(
+        _at(14, 10), _at(14, 11), events, now=MONDAY_NIGHT,
+        extra_busy=[(_at(14, 8).timestamp(), _at(14, 10).timestamp())],
+    )
+    assert slot == (_at(14, 13), _at(14, 14))
+
+
+def test_nearest_free_slot_treats_all_day_events_as_busy_like_the_conflict_check():
+    essay_due = _event("Essay due", _at(14, 0), _at(15, 0), all_day=True)
+    index = IntervalIndex([essay_due])
+    [conflicts] = conflict_matrix.plan_conflicts([_planned(_at(14, 10), _at(14, 11))], [essay_due])
+    assert conflicts
+
+    start, end = free_slots.nearest_free_slot(_at(14, 10), _at(14, 11), index, now=MONDAY_NIGHT)
+
+    assert (start, end) != (_at(14, 10), _at(14, 11))
+    assert start >= _at(15, 0)
+    assert conflict_matrix.plan_conflicts([_planned(start, end)], [essay_due]) == [[]]
+
+
+def test_free_intervals_ignore_all_day_events_unless_asked():
+    essay_due = _event("Essay due", _at(14, 0), _at(15, 0), all_day=True)
+    day = (_at(14, 0), _at(15, 0))
+    assert free_slots.free_intervals([essay_due], *day) == [
+        (_at(14, 8).timestamp(), _at(14, 18).timestamp())
+    ]
+    assert free_slots.free_intervals([essay_due], *day, include_all_day=True) == []
+
+
+MINIMUM = free_slots.MIN_BLOCK_MINUTES * 60
+
+
+def _spread(first_start, last_end):
+    return max(0, free_slots._day_number(last_end - 1, UTC) - free_slots._day_number(first_start, UTC) - 1)
+
+
+def _brute_force_split(gaps, duration):
+    """(blocks, days spread, span) of the best split, trying every combination."""
+    usable = [gap for gap in gaps if gap[1] - gap[0] >= MINIMUM]
+    for blocks in range(2, free_slots.MAX_SPLIT_BLOCKS + 1):
+        best = None
+        for chosen in itertools.combinations(usable, blocks):
+            for lengths in itertools.product(*[range(MINIMUM, end - start + 1, 300) for start, end in chosen]):
+                if sum(lengths) != duration:
+                    continue
+                first_start = chosen[0][1] - lengths[0]
+                last_end = chosen[-1][0] + lengths[-1]
+                key = (_spread(chosen[0][0], chosen[-1][1]), last_end - first_start)
+                if best is None or key < best:
+                    best = key
+        if best:
+            return (blocks,) + best
+    return None
+
+
+def test_solve_split_matches_brute_force_on_small_gap_sets():
+    rng = random.Random(3)
+    for _ in range(150):
+        position = 0
+        gaps = []
+        for _ in range(rng.randint(2, 7)):
+            position += rng.randint(1, 40) * 900
+            length = rng.randint(1, 12) * 900
+            gaps.append((position, position + length))
+            position += length
+        duration = rng.randint(6, 24) * 900
+
+        found = free_slots.solve_split(gaps, duration, UTC, time_budget=5)
+        expected = _brute_force_split(gaps, duration)
+        if expected is None:
+            assert found is None
+            continue
+
+        assert found is not None
+        assert sum(end - start for start, end in found) == duration
+        assert all(end - start >= MINIMUM for start, end in found)
+        assert all(any(gap[0] <= start and end <= gap[1] for gap in gaps) for start, end in found)
+        blocks, spread, span = expected
+        assert len(found) == blocks
+        assert _spread(found[0][0], found[-1][1]) == spread
+        # The first block starts on a slot boundary, which can cost up to a slot
+        assert span <= found[-1][1] - found[0][0] < span + free_slots.SLOT_MINUTES * 60
+
+
+class TickingClock:
+    """Stands in for the time module: every monotonic() call takes a millisecond."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def monotonic(self):
+        self.calls += 1
+        return self.calls / 1000
+
+
+def test_solve_split_stays_within_its_time_budget(monkeypatch):
+    rng = random.Random(5)
+    gaps = []
+    position = 0
+    for _ in range(4000):
+        position += rng.randint(2, 8) * 900
+        gaps.append((position, position + rng.randint(3, 6) * 900))
+        position = gaps[-1][1]
+    clock = TickingClock()
+    monkeypatch.setattr(free_slots, "time", clock)
+
+    stats = {}
+    blocks = free_slots.solve_split(gaps, 4 * 3600, UTC, time_budget=0.02, stats=stats)
+
+    # Stops at the first check past the deadline, keeping the best split so far
+    assert clock.calls == 22
+    assert stats["budget_exhausted"] and stats["nodes"] > 0
+    assert blocks and sum(end - start for start, end in blocks) == 4 * 3600
+    assert all(end - start >= MINIMUM for start, end in blocks)
+
+
+def test_solve_split_returns_none_when_nothing_fits():
+    gaps = [(0, MINIMUM), (2 * MINIMUM, 3 * MINIMUM)]
+    stats = {}
+    assert free_slots.solve_split(gaps, 3 * MINIMUM, UTC, stats=stats) is None
+    # Too little free time in total, so no combination is tried
+    assert stats == {"nodes": 0, "budget_exhausted": False}
+    assert free_slots.solve_split(gaps, MINIMUM + 60, UTC) is None
@@ -0,0 +1,102 @@
+import datetime
+import random
+
+from event_cache import CachedWindow
+from event_model import Event
+from interval_index import IntervalIndex, LONG_EVENT_SECONDS
+
+DAY = 86400
+
+
+def _random_events(rng, count, span=30 * DAY):
+    events = []
+    for number in range(count):
+        start = rng.randrange(0, span, 300)
+        if rng.random() < 0.05:
+            length = rng.choice([DAY, 3 * DAY])  # all-day and multi-day
+        else:
+            length = rng.randrange(15, 240, 15) * 60
+        events.append(Event(f"e{number}", f"Event {number}", start, start + length))
+    return events
+
+
+def _scan(events, start, end):
+    return sorted(
+        (event.start, event.end, event.id) for event in events if event.start < end and event.end > start
+    )
+
+
+def _ids(matches):
+    return sorted((start, end, event.id) for start, end, event in matches)
+
+
+def test_overlapping_matches_a_linear_scan():
+    rng = random.Random(7)
+    events = _random_events(rng, 500)
+    index = IntervalIndex(events)
+    assert len(index) == 500
+    for _ in range(300):
+        start = rng.randrange(-DAY, 31 * DAY)
+        end = start + rng.randrange(60, 2 * DAY)
+        matches = index.overlapping(start, end)
+        assert _ids(matches) == _scan(events, start, end)
+        assert [match[0] for match in matches] == sorted(match[0] for match in matches)
+
+
+def test_add_and_remove_keep_queries_matching_a_scan():
+    rng = random.Random(11)
+    events = {event.id: event for event in _random_events(rng, 200)}
+    index = IntervalIndex(events.values())
+    for step in range(400):
+        if rng.random() < 0.5 and events:
+            event_id = rng.choice(sorted(events))
+            assert index.remove(event_id)
+            del events[event_id]
+        else:
+            event = _random_events(rng, 1)[0]
+            event.id = f"new{step}"
+            assert index.add(event)
+            events[event.id] = event
+        start = rng.randrange(0, 30 * DAY)
+        assert _ids(index.overlapping(start, start + DAY)) == _scan(events.values(), start, start + DAY)
+    assert len(index) == len(events)
+
+
+def test_boundaries_are_half_open_and_long_events_are_found():
+    long_event = Event("long", "Trip", 0, LONG_EVENT_SECONDS * 4)
+    index = IntervalIndex([Event("a", "A", 100, 200), long_event])
+    assert _ids(index.overlapping(200, 300)) == [(0, LONG_EVENT_SECONDS * 4, "long")]
+    assert _ids(index.overlapping(0, 100)) == [(0, LONG_EVENT_SECONDS * 4, "long")]
+    assert index.remove("long") and not index.remove("long")
+    assert index.overlapping(300, 400) == []
+
+
+def test_add_replaces_every_copy_of_an_id():
+    # The same event seen on two calendars
+    index = IntervalIndex([Event("a", "A", 0, 100), Event("a", "A", 0, 100, calendar_id="team")])
+    index.add(Event("a", "A", 500, 600))
+    assert _ids(index.overlapping(0, 1000)) == [(500, 600, "a")]
+
+
+def test_cached_window_patches_keep_its_index_in_step():
+    time_min = datetime.datetime(2025, 10, 1, tzinfo=datetime.timezone.utc)
+    time_max = time_min + datetime.timedelta(days=30)
+    base = int(time_min.timestamp())
+    rng = random.Random(3)
+    events = sorted(
+        (Event(event.id, event.summary, base + event.start, base + event.end)
+         for event in _random_events(rng, 100)),
+        key=lambda event: event.start,
+    )
+    window = CachedWindow(events, time_min, time_max, ["primary"], time_min)
+    index = window.index()
+
+    window.patch("e5", [])
+    window.patch("e6", [Event("e6", "Moved", base + 3600, base + 7200)])
+    window.patch("fresh", [Event("fresh", "New", base + DAY, base + DAY + 1800)])
+
+    assert window.index() is index
+    rebuilt = IntervalIndex(window.events)
+    for day in range(30):
+        start = base + day * DAY
+        assert _ids(index.overlapping(start, start + DAY)) == _ids(rebuilt.overlapping(start, start + DAY))
@@ -0,0 +1,105 @@
+import datetime
+import email.utils
+
+import pytest
+
+import rate_limiter
+
+
+class FakeClock:
+    """Stands in for the time module: sleeping advances monotonic()."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    return clock
+
+
+def test_bucket_allows_a_burst_then_paces_calls(clock):
+    # Delays in binary fractions keep the fake clock exact
+    bucket = rate_limiter.TokenBucket(rate=4, capacity=10)
+    assert [bucket.acquire() for _ in range(10)] == [0.0] * 10
+    assert clock.sleeps == []
+
+    waited = [bucket.acquire() for _ in range(4)]
+    assert waited == [0.25] * 4
+    assert clock.now == pytest.approx(1001.0)
+
+
+def test_bucket_refills_while_idle_but_not_past_capacity(clock):
+    bucket = rate_limiter.TokenBucket(rate=2, capacity=4)
+    for _ in range(4):
+        bucket.acquire()
+    clock.now += 1.0  # Two tokens back
+    assert bucket.acquire(2) == 0.0
+    assert bucket.acquire() == pytest.approx(0.5)
+
+    clock.now += 3600
+    assert [bucket.acquire() for _ in range(4)] == [0.0] * 4
+    assert bucket.acquire() == pytest.approx(0.5)
+
+
+def test_requests_larger_than_the_capacity_wait_for_every_token(clock):
+    bucket = rate_limiter.TokenBucket(rate=4, capacity=3)
+    assert bucket.acquire(50) == (50 - 3) / 4
+    assert clock.now == 1000 + (50 - 3) / 4
+    # The debt is repaid, not carried over to the next caller
+    assert bucket.acquire(1) == 0.25
+
+
+def test_a_large_request_waits_for_a_full_bucket_first(clock):
+    bucket = rate_limiter.TokenBucket(rate=4, capacity=3)
+    bucket.acquire(3)
+    assert bucket.acquire(11) == 3 / 4 + (11 - 3) / 4
+    assert clock.now == 1000 + 11 / 4
+
+
+def test_backoff_grows_exponentially_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(rate_limiter.random, "uniform", lambda low, high: high)
+    delays = [rate_limiter.backoff_delay(attempt, base=0.5, cap=32.0) for attempt in range(9)]
+    assert delays == [0.5, 1, 2, 4, 8, 16, 32, 32, 32]
+
+
+def test_backoff_jitters_and_honours_retry_after():
+    for attempt in range(6):
+        assert 0 <= rate_limiter.backoff_delay(attempt) <= min(32.0, 0.5 * 2 ** attempt)
+    assert rate_limiter.backoff_delay(0, retry_after=7) == 7
+    assert rate_limiter.backoff_delay(10, retry_after=0) <= 32.0
+
+
+def test_parse_retry_after():
+    assert rate_limiter.parse_retry_after("12") == 12.0
+    assert rate_limiter.parse_retry_after("-3") == 0.0
+    assert rate_limiter.parse_retry_after(None) is None
+    assert rate_limiter.parse_retry_after("soon") is None
+
+    later = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=30)
+    seconds = rate_limiter.parse_retry_after(email.utils.format_datetime(later))
+    assert 25 < seconds <= 30
+
+
+def test_call_stats_counts_errors_by_status():
+    stats = rate_limiter.CallStats()
+    stats.increment("calls", 3)
+    stats.record_error(503)
+    stats.record_error(503)
+    stats.record_error(429)
+    snapshot = stats.snapshot()
+    assert snapshot["calls"] == 3
+    assert snapshot["errors_by_status"] == {"503": 2, "429": 1}
+    # Snapshots are copies
+    snapshot["errors_by_status"]["500"] = 1
+    assert "500" not in stats.snapshot()["errors_by_status"]
@@ -0,0 +1,92 @@
+import datetime
+import zoneinfo
+
+import pytest
+
+import recurrence
+
+DENVER = zoneinfo.ZoneInfo("America/Denver")
+
+
+def _master(recurrence_lines, start="2025-10-27T09:00:00-06:00", end="2025-10-27T10:00:00-06:00"):
+    return {
+        "id": "master",
+        "summary": "Lecture",
+        "start": {"dateTime": start, "timeZone": "America/Denver"},
+        "end": {"dateTime": end, "timeZone": "America/Denver"},
+        "recurrence": recurrence_lines,
+    }
+
+
+def _starts(series, time_min, time_max):
+    return [start for start, _, _ in series.entries_in_range(time_min, time_max)]
+
+
+def test_weekly_series_keeps_wall_clock_time_across_dst():
+    # DST ends in Denver on 2025-11-02
+    series = recurrence.RecurringSeries(_master(["RRULE:FREQ=WEEKLY;BYDAY=MO;COUNT=3"]))
+    starts = _starts(
+        series,
+        datetime.datetime(2025, 10, 1, tzinfo=datetime.timezone.utc),
+        datetime.datetime(2025, 12, 1, tzinfo=datetime.timezone.utc),
+    )
+    assert [start.astimezone(DENVER).hour for start in starts] == [9, 9, 9]
+    assert [start.utcoffset() for start in starts] == [
+        datetime.timedelta(hours=-6), datetime.timedelta(hours=-7), datetime.timedelta(hours=-7),
+    ]
+
+
+def test_exdate_and_skip_starts_leave_out_occurrences():
+    series = recurrence.RecurringSeries(_master([
+        "RRULE:FREQ=DAILY;COUNT=5",
+        "EXDATE;TZID=America/Denver:20251028T090000",
+    ]))
+    window = (
+        datetime.datetime(2025, 10, 27, tzinfo=DENVER),
+        datetime.datetime(2025, 11, 3, tzinfo=DENVER),
+    )
+    days = [start.day for start in _starts(series, *window)]
+    assert days == [27, 29, 30, 31]
+
+    moved = datetime.datetime(2025, 10, 29, 9, tzinfo=DENVER).timestamp()
+    entries = series.entries_in_range(*window, skip_starts={moved})
+    assert [start.day for start, _, _ in entries] == [27, 30, 31]
+
+
+def test_instances_carry_google_style_ids():
+    series = recurrence.RecurringSeries(_master(["RRULE:FREQ=DAILY;COUNT=2"]))
+    _, _, event = series.entries_in_range(
+        datetime.datetime(2025, 10, 27, tzinfo=DENVER), datetime.datetime(2025, 10, 28, tzinfo=DENVER)
+    )[0]
+    assert event["id"] == "master_20251027T150000Z"
+    assert event["recurringEventId"] == "master"
+    assert recurrence.parse_instance_id(event["id"]) == (
+        "master", datetime.datetime(2025, 10, 27, 9, tzinfo=DENVER).timestamp()
+    )
+
+
+@pytest.mark.parametrize("lines, expected", [
+    (["RRULE:FREQ=DAILY;COUNT=3"], datetime.datetime(2025, 10, 29, 10, tzinfo=DENVER)),
+    (["RRULE:FREQ=WEEKLY;UNTIL=20251110T235959Z"], datetime.datetime(2025, 11, 10, 10, tzinfo=DENVER)),
+    # UNTIL without a zone is local to the event, and dateutil needs it in UTC
+    (["RRULE:FREQ=WEEKLY;UNTIL=20251103"], datetime.datetime(2025, 11, 3, 10, tzinfo=DENVER)),
+    (["RRULE:FREQ=DAILY"], None),
+    (["RRULE:FREQ=DAILY;COUNT=2", "RRULE:FREQ=WEEKLY"], None),
+])
+def test_last_end(lines, expected):
+    last_end = recurrence.RecurringSeries(_master(lines)).last_end()
+    assert last_end == expected
+
+
+def test_all_day_series_expands_to_local_days():
+    series = recurrence.RecurringSeries({
+        "id": "holiday",
+        "start": {"date": "2025-12-24"},
+        "end": {"date": "2025-12-25"},
+        "recurrence": ["RRULE:FREQ=YEARLY;COUNT=2"],
+    })
+    assert series.last_end() == datetime.datetime(2026, 12, 25).astimezone()
+    entries = series.entries_in_range(
+        datetime.datetime(2026, 1, 1).astimezone(), datetime.datetime(2027, 1, 1).astimezone()
+    )
+    assert [event["id"] for _, _, event in entries] == ["holiday_20261224"]
@@ -0,0 +1,93 @@
+import datetime
+import threading
+import time
+
+import pytest
+
+import schedule_jobs
+
+
+def _wait(job):
+    deadline = time.monotonic() + 5
+    while job.to_dict()["finished_at"] is None:
+        assert time.monotonic() < deadline, "job did not finish"
+        time.sleep(0.005)
+    return job.to_dict()
+
+
+@pytest.fixture
+def queue():
+    return schedule_jobs.JobQueue(workers=2)
+
+
+def test_jobs_are_only_visible_to_their_owner(queue):
+    job = queue.submit("a@example.com", lambda job: ({}, 200))
+
+    assert queue.get(job.id, "a@example.com") is job
+    assert queue.get(job.id, "b@example.com") is None
+    assert queue.get(job.id) is None
+    assert queue.get("missing", "a@example.com") is None
+
+
+def test_a_job_reports_its_stages_events_and_result(queue):
+    release = threading.Event()
+
+    def plan(job, request):
+        job.start_stage("context")
+        job.finish_stage("context", events=3)
+        job.start_stage("planning")
+        release.wait(5)
+        job.finish_stage("planning")
+        job.record_event({"summary": request, "start_time": "s", "end_time": "e"}, "created")
+        job.record_event({"summary": "Review"}, "conflict", conflicts=["Lecture"])
+        return {"success": True}, 200
+
+    job = queue.submit("owner", plan, "Homework")
+    while job.to_dict()["stages"]["planning"]["status"] != "running":
+        time.sleep(0.005)
+    running = job.to_dict()
+    assert running["status"] == "running"
+    assert running["stages"]["context"]["status"] == "done"
+    assert running["stages"]["context"]["events"] == 3
+    assert running["result"] is None
+
+    release.set()
+    done = _wait(job)
+
+    assert (done["status"], done["http_status"], done["result"]) == ("succeeded", 200, {"success": True})
+    assert [stage["status"] for stage in done["stages"].values()] == ["done", "done", "skipped", "skipped"]
+    assert done["events"] == [
+        {"summary": "Homework", "start_time": "s", "end_time": "e", "outcome": "created"},
+        {"summary": "Review", "start_time": None, "end_time": None, "outcome": "conflict",
+         "conflicts": ["Lecture"]},
+    ]
+
+
+def test_a_failing_job_reports_the_error_and_the_stage_it_stopped_in(queue):
+    def plan(job):
+        job.start_stage("context")
+        raise RuntimeError("calendar unavailable")
+
+    done = _wait(queue.submit("owner", plan))
+
+    assert done["status"] == "failed"
+    assert done["http_status"] == 500
+    assert done["result"] == {"error": "Scheduling failed: calendar unavailable"}
+    assert done["stages"]["context"]["status"] == "failed"
+    assert done["stages"]["planning"]["status"] == "skipped"
+
+
+def test_client_errors_still_count_as_finished_jobs():
+    job = schedule_jobs.ScheduleJob("owner")
+    job.finish({"error": "No events to schedule"}, 400)
+    assert (job.status, job.http_status) == ("succeeded", 400)
+
+
+def test_finished_jobs_expire_after_the_retention_period(queue, monkeypatch):
+    job = queue.submit("owner", lambda job: ({}, 200))
+    _wait(job)
+    assert queue.get(job.id, "owner") is job
+
+    later = job.finished_at + schedule_jobs.SCHEDULE_JOB_RETENTION + datetime.timedelta(seconds=1)
+    monkeypatch.setattr(schedule_jobs, "_now", lambda: later)
+    assert queue.get(job.id, "owner") is None
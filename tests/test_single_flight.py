@@ -0,0 +1,127 @@
+import threading
+
+import pytest
+
+from single_flight import CoalescingCache, SingleFlight
+
+WAITERS = 8
+
+
+def _run_together(count, target):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert not any(thread.is_alive() for thread in threads)
+
+
+def _joined(flight, count):
+    """Waits until `count` callers have joined a running call."""
+    while True:
+        with flight._lock:
+            if flight.shared >= count:
+                return
+        threading.Event().wait(0.001)
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def load():
+        calls.append(1)
+        release.wait(5)
+        return "value"
+
+    def caller():
+        results.append(flight.do("key", load))
+
+    leader = threading.Thread(target=caller)
+    leader.start()
+    while not calls:
+        threading.Event().wait(0.001)
+    followers = [threading.Thread(target=caller) for _ in range(WAITERS)]
+    for thread in followers:
+        thread.start()
+    _joined(flight, WAITERS)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == ["value"] * (WAITERS + 1)
+    assert flight.shared == WAITERS
+
+
+def test_waiters_get_the_leaders_exception_and_the_key_is_freed():
+    flight = SingleFlight()
+    release = threading.Event()
+    started = threading.Event()
+    errors = []
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("upstream down")
+
+    def caller():
+        try:
+            flight.do("key", failing)
+        except RuntimeError as error:
+            errors.append(str(error))
+
+    leader = threading.Thread(target=caller)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=caller)
+    follower.start()
+    _joined(flight, 1)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert errors == ["upstream down"] * 2
+    # The next call runs again rather than reusing the failure
+    assert flight.do("key", lambda: "recovered") == "recovered"
+
+
+def test_different_keys_do_not_wait_for_each_other():
+    flight = SingleFlight()
+    assert [flight.do(key, lambda key=key: key * 2) for key in (1, 2, 3)] == [2, 4, 6]
+    assert flight.shared == 0
+
+
+def test_cache_loads_each_key_once_under_concurrent_misses():
+    cache = CoalescingCache(maxsize=10, ttl=60)
+    loads = []
+    lock = threading.Lock()
+
+    def loader():
+        with lock:
+            loads.append(1)
+        threading.Event().wait(0.05)
+        return {"timeZone": "UTC"}
+
+    results = []
+    _run_together(WAITERS, lambda: results.append(cache.get("primary", loader)))
+
+    assert len(loads) == 1
+    assert results == [{"timeZone": "UTC"}] * WAITERS
+    stats = cache.stats()
+    assert stats["entries"] == 1
+    assert stats["hits"] + stats["misses"] == WAITERS
+
+
+def test_cache_if_skips_fallback_values_and_invalidate_drops_entries():
+    cache = CoalescingCache(maxsize=10, ttl=60)
+    assert cache.get("a", lambda: None, cache_if=lambda value: value is not None) is None
+    assert cache.get("a", lambda: "loaded", cache_if=lambda value: value is not None) == "loaded"
+    assert cache.get("a", lambda: pytest.fail("should be cached")) == "loaded"
+
+    cache.invalidate("a")
+    assert cache.get("a", lambda: "reloaded") == "reloaded"
+    cache.invalidate()
+    assert cache.stats()["entries"] == 0